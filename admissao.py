@@ -0,0 +1,296 @@
+"""
+Controle de admissão (sala de espera) para o início dos quizzes
+
+Quando centenas de pessoas iniciam o quiz no mesmo segundo, os workers
+saturam e quem já está respondendo sente a demora. O controle limita
+quantos quizzes ficam em andamento ao mesmo tempo: acima do limite, quem
+chega recebe um ticket com a posição na fila e consulta /fila até a vez
+dele, sem ocupar as rotas do quiz.
+
+O limite se ajusta pela latência das rotas de quem já está no meio do quiz
+(AIMD): se o p90 de uma janela passa do alvo, o limite cai
+multiplicativamente; se fica abaixo e o limite está quase todo em uso, sobe
+de forma aditiva. Cada vaga expira sozinha após a duração máxima do quiz,
+para que um abandono não a prenda. Há dois backends, como no limite de
+requisições: memória (um único worker) e SQLite, compartilhado pelos
+workers do host.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from armazenamento import BancoSQLite
+
+logger = logging.getLogger(__name__)
+
+
+class ControleAdmissao:
+    """Limite adaptativo de quizzes em andamento e fila de espera (interface comum)"""
+
+    # Ajuste do limite: fator na sobrecarga; aumento só se pelo menos esta fração estiver em uso
+    REDUCAO = 0.75
+    OCUPACAO_PARA_AUMENTAR = 0.9
+    AMOSTRAS_MINIMAS = 20
+    # Ticket não consultado por este tempo (s) sai da fila
+    ABANDONO_S = 60
+    # Intervalo sugerido (s) entre consultas à fila: cresce com a posição
+    ESPERA_MINIMA = 2
+    ESPERA_MAXIMA = 30
+
+    def __init__(self, inicial=200, minimo=20, maximo=1000, alvo_s=0.3, janela_s=5.0, aumento=5):
+        self.inicial = inicial
+        self.minimo = minimo
+        self.maximo = maximo
+        self.alvo_s = alvo_s
+        self.janela_s = janela_s
+        self.aumento = aumento
+        self._lock_amostras = threading.Lock()
+        self._amostras = []
+        self._inicio_janela = time.monotonic()
+
+    def admitir(self, chave, ticket, duracao, anterior=None):
+        """(admitido, ticket, posição na fila)
+
+        Se houver vaga e ninguém na frente do ticket, `chave` (o quiz_id)
+        ocupa a vaga por até `duracao` segundos. Senão o ticket entra (ou
+        continua) na fila; sem ticket válido, um novo é criado no fim dela.
+        Quem recomeça na mesma sessão herda a vaga do quiz `anterior`.
+        """
+        raise NotImplementedError
+
+    def consultar(self, ticket):
+        """(posição, liberado): posição do ticket na fila (None se não estiver) e se já há vaga para ele"""
+        raise NotImplementedError
+
+    def liberar(self, chave):
+        """Devolve a vaga de um quiz encerrado"""
+        raise NotImplementedError
+
+    def situacao(self):
+        """(limite, quizzes em andamento, tickets na fila)"""
+        raise NotImplementedError
+
+    def _ajustar(self, calcular):
+        """Aplica calcular(limite, em andamento) -> novo limite de forma atômica; retorna o novo limite"""
+        raise NotImplementedError
+
+    def _limitar(self, limite):
+        return max(self.minimo, min(self.maximo, int(limite)))
+
+    def espera(self, posicao):
+        """Segundos sugeridos até a próxima consulta de quem está na posição"""
+        return min(self.ESPERA_MAXIMA, self.ESPERA_MINIMA + (posicao or 0) // 10)
+
+    def observar(self, segundos):
+        """Registra a latência de uma rota de quem já está no quiz
+
+        Retorna as amostras da janela quando ela se fecha (para reavaliar()),
+        senão None. Separado para que o modo ASGI faça o ajuste, que grava
+        no armazenamento, fora do event loop.
+        """
+        agora = time.monotonic()
+        with self._lock_amostras:
+            self._amostras.append(segundos)
+            if agora - self._inicio_janela < self.janela_s or len(self._amostras) < self.AMOSTRAS_MINIMAS:
+                return None
+            amostras = self._amostras
+            self._amostras = []
+            self._inicio_janela = agora
+        return amostras
+
+    def reavaliar(self, amostras):
+        """Ajusta o limite pelo p90 das amostras de uma janela (uma falha só é registrada no log)"""
+        amostras = sorted(amostras)
+        p90 = amostras[int(len(amostras) * 0.9) - 1]
+        try:
+            if p90 > self.alvo_s:
+                novo = self._ajustar(lambda limite, _: self._limitar(limite * self.REDUCAO))
+            else:
+                novo = self._ajustar(lambda limite, em_andamento: self._limitar(
+                    limite + self.aumento if em_andamento >= limite * self.OCUPACAO_PARA_AUMENTAR else limite))
+        except Exception as e:
+            logger.error(f"Erro ao ajustar o limite de admissão: {e}")
+            return
+        logger.debug('Limite de admissão reavaliado p90_ms=%.0f amostras=%d limite=%d',
+                     p90 * 1000, len(amostras), novo)
+
+
+class MemoriaControleAdmissao(ControleAdmissao):
+    """Vagas e fila em memória (apenas um worker)"""
+
+    def __init__(self, **parametros):
+        super().__init__(**parametros)
+        self._lock = threading.Lock()
+        self._limite = self._limitar(self.inicial)
+        # quiz_id -> instante em que a vaga expira
+        self._vagas = {}
+        # ticket -> última consulta, na ordem de chegada
+        self._fila = OrderedDict()
+
+    def _limpar(self, agora):
+        for chave in [chave for chave, expira in self._vagas.items() if expira < agora]:
+            del self._vagas[chave]
+        for ticket in [ticket for ticket, visto in self._fila.items() if visto < agora - self.ABANDONO_S]:
+            del self._fila[ticket]
+
+    def _a_frente(self, ticket):
+        if ticket in self._fila:
+            return list(self._fila).index(ticket)
+        return len(self._fila)
+
+    def admitir(self, chave, ticket, duracao, anterior=None):
+        agora = time.monotonic()
+        with self._lock:
+            self._limpar(agora)
+            if anterior in self._vagas:
+                del self._vagas[anterior]
+                self._vagas[chave] = agora + duracao
+                return True, None, 0
+            a_frente = self._a_frente(ticket)
+            if a_frente < self._limite - len(self._vagas):
+                self._fila.pop(ticket, None)
+                self._vagas[chave] = agora + duracao
+                return True, None, 0
+            if ticket not in self._fila:
+                ticket = uuid.uuid4().hex
+            # Atualizar um ticket existente não muda a ordem de chegada
+            self._fila[ticket] = agora
+            return False, ticket, a_frente + 1
+
+    def consultar(self, ticket):
+        agora = time.monotonic()
+        with self._lock:
+            self._limpar(agora)
+            if ticket not in self._fila:
+                return None, True
+            self._fila[ticket] = agora
+            a_frente = self._a_frente(ticket)
+            return a_frente + 1, a_frente < self._limite - len(self._vagas)
+
+    def liberar(self, chave):
+        with self._lock:
+            self._vagas.pop(chave, None)
+
+    def situacao(self):
+        with self._lock:
+            return self._limite, len(self._vagas), len(self._fila)
+
+    def _ajustar(self, calcular):
+        with self._lock:
+            self._limite = calcular(self._limite, len(self._vagas))
+            return self._limite
+
+
+class SQLiteControleAdmissao(BancoSQLite, ControleAdmissao):
+    """Vagas, fila e limite em SQLite (WAL), compartilhados pelos workers do host"""
+
+    def __init__(self, caminho, **parametros):
+        BancoSQLite.__init__(self, caminho)
+        ControleAdmissao.__init__(self, **parametros)
+        with self._transacao() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS vagas (
+                    chave TEXT PRIMARY KEY,
+                    expira REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_vagas_expira ON vagas (expira)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS fila (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ticket TEXT NOT NULL UNIQUE,
+                    visto REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_fila_visto ON fila (visto)')
+            conn.execute('CREATE TABLE IF NOT EXISTS controle (chave TEXT PRIMARY KEY, valor REAL NOT NULL)')
+            conn.execute("INSERT OR IGNORE INTO controle (chave, valor) VALUES ('limite', ?)",
+                         (self._limitar(self.inicial),))
+
+    def _limpar(self, conn, agora):
+        conn.execute('DELETE FROM vagas WHERE expira < ?', (agora,))
+        conn.execute('DELETE FROM fila WHERE visto < ?', (agora - self.ABANDONO_S,))
+
+    def _ocupacao(self, conn):
+        limite = conn.execute("SELECT valor FROM controle WHERE chave = 'limite'").fetchone()[0]
+        em_andamento = conn.execute('SELECT COUNT(*) FROM vagas').fetchone()[0]
+        return self._limitar(limite), em_andamento
+
+    def _posicao(self, conn, ticket):
+        """(id na fila ou None, quantos estão na frente)"""
+        linha = conn.execute('SELECT id FROM fila WHERE ticket = ?', (ticket,)).fetchone() if ticket else None
+        if linha is None:
+            return None, conn.execute('SELECT COUNT(*) FROM fila').fetchone()[0]
+        return linha[0], conn.execute('SELECT COUNT(*) FROM fila WHERE id < ?', (linha[0],)).fetchone()[0]
+
+    def admitir(self, chave, ticket, duracao, anterior=None):
+        agora = time.time()
+        with self._transacao() as conn:
+            self._limpar(conn, agora)
+            if anterior is not None and conn.execute('UPDATE vagas SET chave = ?, expira = ? WHERE chave = ?',
+                                                     (chave, agora + duracao, anterior)).rowcount:
+                return True, None, 0
+            limite, em_andamento = self._ocupacao(conn)
+            id_fila, a_frente = self._posicao(conn, ticket)
+            if a_frente < limite - em_andamento:
+                if id_fila is not None:
+                    conn.execute('DELETE FROM fila WHERE id = ?', (id_fila,))
+                conn.execute('INSERT OR REPLACE INTO vagas (chave, expira) VALUES (?, ?)', (chave, agora + duracao))
+                return True, None, 0
+            if id_fila is None:
+                ticket = uuid.uuid4().hex
+                conn.execute('INSERT INTO fila (ticket, visto) VALUES (?, ?)', (ticket, agora))
+            else:
+                conn.execute('UPDATE fila SET visto = ? WHERE id = ?', (agora, id_fila))
+            return False, ticket, a_frente + 1
+
+    def consultar(self, ticket):
+        agora = time.time()
+        with self._transacao() as conn:
+            self._limpar(conn, agora)
+            id_fila, a_frente = self._posicao(conn, ticket)
+            if id_fila is None:
+                return None, True
+            conn.execute('UPDATE fila SET visto = ? WHERE id = ?', (agora, id_fila))
+            limite, em_andamento = self._ocupacao(conn)
+            return a_frente + 1, a_frente < limite - em_andamento
+
+    def liberar(self, chave):
+        self._conexao().execute('DELETE FROM vagas WHERE chave = ?', (chave,))
+
+    def situacao(self):
+        conn = self._conexao()
+        limite, em_andamento = self._ocupacao(conn)
+        return limite, em_andamento, conn.execute('SELECT COUNT(*) FROM fila').fetchone()[0]
+
+    def _ajustar(self, calcular):
+        with self._transacao() as conn:
+            limite, em_andamento = self._ocupacao(conn)
+            novo = calcular(limite, em_andamento)
+            if novo != limite:
+                conn.execute("UPDATE controle SET valor = ? WHERE chave = 'limite'", (novo,))
+        return novo
+
+
+def criar_controle_admissao(backend=None):
+    """Cria o controle de admissão configurado; None desliga a sala de espera"""
+    backend = backend or os.environ.get('ADMISSAO_BACKEND', 'sqlite')
+    if backend == 'desligado':
+        return None
+    parametros = {
+        'inicial': int(os.environ.get('ADMISSAO_LIMITE', 200)),
+        'minimo': int(os.environ.get('ADMISSAO_MINIMO', 20)),
+        'maximo': int(os.environ.get('ADMISSAO_MAXIMO', 1000)),
+        'alvo_s': int(os.environ.get('ADMISSAO_ALVO_MS', 300)) / 1000,
+        'janela_s': float(os.environ.get('ADMISSAO_JANELA_S', 5)),
+        'aumento': int(os.environ.get('ADMISSAO_AUMENTO', 5)),
+    }
+    if backend == 'memoria':
+        return MemoriaControleAdmissao(**parametros)
+    if backend == 'sqlite':
+        return SQLiteControleAdmissao(os.environ.get('ADMISSAO_DB', 'admissao.db'), **parametros)
+    raise ValueError(f"Backend de admissão desconhecido: {backend}")
@@ -0,0 +1,81 @@
+"""
+Estatísticas acumuladas do ranking
+
+Em vez de percorrer o ranking a cada exibição (maior pontuação, taxa de
+acerto, média), o armazenamento mantém somas e máximos que são atualizados
+em O(1) a cada quiz finalizado. Os totais cobrem todos os resultados, não
+só o top-K exibido, e usam o número real de perguntas de cada resultado.
+"""
+
+
+class Agregados:
+    """Somas, máximos e acertos por pergunta de todos os resultados gravados"""
+
+    __slots__ = ('participantes', 'soma_pontuacao', 'maior_pontuacao', 'soma_acertos',
+                 'soma_perguntas', 'por_pergunta')
+
+    def __init__(self, dados=None):
+        dados = dados or {}
+        self.participantes = dados.get('participantes', 0)
+        self.soma_pontuacao = dados.get('soma_pontuacao', 0)
+        self.maior_pontuacao = dados.get('maior_pontuacao')
+        self.soma_acertos = dados.get('soma_acertos', 0)
+        self.soma_perguntas = dados.get('soma_perguntas', 0)
+        # [respostas, acertos] por pergunta (índice 0 = primeira pergunta)
+        self.por_pergunta = [list(par) for par in dados.get('por_pergunta', [])]
+
+    @classmethod
+    def de_resultados(cls, resultados):
+        agregados = cls()
+        for resultado in resultados:
+            agregados.adicionar(resultado)
+        return agregados
+
+    def adicionar(self, resultado):
+        """Inclui um resultado nos totais"""
+        pontuacao = resultado.get('pontuacao', 0)
+        self.participantes += 1
+        self.soma_pontuacao += pontuacao
+        if self.maior_pontuacao is None or pontuacao > self.maior_pontuacao:
+            self.maior_pontuacao = pontuacao
+        self.soma_acertos += resultado.get('acertos', 0)
+        # Resultados antigos não têm total_perguntas: o quiz tinha 10 perguntas
+        self.soma_perguntas += resultado.get('total_perguntas', 10)
+
+        # Acertos por pergunta (resultados gravados antes deste campo ficam de fora)
+        for indice, acertou in enumerate(resultado.get('acertos_pergunta') or ()):
+            while len(self.por_pergunta) <= indice:
+                self.por_pergunta.append([0, 0])
+            self.por_pergunta[indice][0] += 1
+            self.por_pergunta[indice][1] += 1 if acertou else 0
+
+    def para_dict(self):
+        """Forma persistida (JSON)"""
+        return {
+            'participantes': self.participantes,
+            'soma_pontuacao': self.soma_pontuacao,
+            'maior_pontuacao': self.maior_pontuacao,
+            'soma_acertos': self.soma_acertos,
+            'soma_perguntas': self.soma_perguntas,
+            'por_pergunta': self.por_pergunta
+        }
+
+    def resumo(self):
+        """Números prontos para exibição e para /api/ranking/stats"""
+        return {
+            'participantes': self.participantes,
+            'maior_pontuacao': self.maior_pontuacao or 0,
+            'media_pontuacao': round(self.soma_pontuacao / self.participantes, 1) if self.participantes else 0.0,
+            'total_acertos': self.soma_acertos,
+            'total_perguntas': self.soma_perguntas,
+            'taxa_acerto': round(self.soma_acertos / self.soma_perguntas * 100, 1) if self.soma_perguntas else 0.0,
+            'por_pergunta': [
+                {
+                    'pergunta': indice + 1,
+                    'respostas': respostas,
+                    'acertos': acertos,
+                    'taxa_acerto': round(acertos / respostas * 100, 1) if respostas else 0.0
+                }
+                for indice, (respostas, acertos) in enumerate(self.por_pergunta)
+            ]
+        }
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Análise por pergunta das respostas gravadas pelo Quiz
+
+Lê o log de respostas (uma linha JSON por resposta, acrescentada quando o
+quiz é finalizado) em uma única passada e com memória limitada: cada
+pergunta guarda apenas contadores e um histograma de tempos de resposta em
+faixas fixas, de onde saem os percentis. O tamanho do log não influencia o
+uso de memória.
+
+Uso pela linha de comando:
+    python analise_respostas.py [--quiz medsenior] [--log respostas.log] [--desde 2024-01-01]
+                                [--formato csv|json] [--saida analise_respostas.csv]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from armazenamento import caminho_particionado
+from historico import LogAppend
+from quizzes import Quiz
+
+# Faixas do histograma de tempos: 100 ms até 2 minutos (acima disso, uma faixa de excedentes)
+FAIXA_MS = 100
+LIMITE_MS = 120000
+
+PERCENTIS = (50, 90, 99)
+
+
+class EstatisticaPergunta:
+    """Contadores e histograma de tempos de uma pergunta"""
+
+    __slots__ = ('respostas', 'acertos', 'sem_resposta', 'distribuicao', 'faixas', 'soma_ms', 'maximo_ms')
+
+    def __init__(self):
+        self.respostas = 0
+        self.acertos = 0
+        self.sem_resposta = 0
+        # Alternativa escolhida (índice) -> quantidade
+        self.distribuicao = {}
+        self.faixas = [0] * (LIMITE_MS // FAIXA_MS + 1)
+        self.soma_ms = 0
+        self.maximo_ms = 0
+
+    def adicionar(self, registro):
+        tempo_ms = max(0, registro.get('tempo_ms', 0))
+        resposta = registro.get('resposta', -1)
+        self.respostas += 1
+        if registro.get('acertou'):
+            self.acertos += 1
+        if resposta < 0:
+            self.sem_resposta += 1
+        else:
+            self.distribuicao[resposta] = self.distribuicao.get(resposta, 0) + 1
+        self.faixas[min(tempo_ms // FAIXA_MS, len(self.faixas) - 1)] += 1
+        self.soma_ms += tempo_ms
+        self.maximo_ms = max(self.maximo_ms, tempo_ms)
+
+    def percentil(self, p):
+        """Tempo (ms) abaixo do qual estão p% das respostas, com a resolução de uma faixa"""
+        if not self.respostas:
+            return 0
+        posicao = max(1, -(-self.respostas * p // 100))
+        acumulado = 0
+        for indice, quantidade in enumerate(self.faixas):
+            acumulado += quantidade
+            if acumulado >= posicao:
+                return min((indice + 1) * FAIXA_MS, self.maximo_ms)
+        return self.maximo_ms
+
+    def resumo(self, indice, pergunta=None):
+        resumo = {
+            'pergunta': indice + 1,
+            'texto': pergunta.texto if pergunta else '',
+            'respostas': self.respostas,
+            'acertos': self.acertos,
+            'taxa_acerto': round(self.acertos / self.respostas * 100, 1) if self.respostas else 0.0,
+            'sem_resposta': self.sem_resposta,
+            'tempo_medio_ms': round(self.soma_ms / self.respostas) if self.respostas else 0,
+        }
+        for p in PERCENTIS:
+            resumo[f'p{p}_ms'] = self.percentil(p)
+        resumo['distribuicao'] = {alternativa + 1: quantidade
+                                  for alternativa, quantidade in sorted(self.distribuicao.items())}
+        if pergunta is not None:
+            resumo['alternativa_correta'] = pergunta.resposta_correta + 1
+        return resumo
+
+
+def analisar(caminho_log, desde=None):
+    """Agrega o log de respostas em uma passada; retorna ({índice: EstatisticaPergunta}, tentativas)"""
+    estatisticas = {}
+    tentativas = 0
+    for registro, _ in LogAppend(caminho_log).ler():
+        if desde and registro.get('data_hora', '') < desde:
+            continue
+        indice = registro.get('pergunta', 0)
+        if indice == 0:
+            tentativas += 1
+        estatistica = estatisticas.get(indice)
+        if estatistica is None:
+            estatistica = estatisticas[indice] = EstatisticaPergunta()
+        estatistica.adicionar(registro)
+    return estatisticas, tentativas
+
+
+def resumir(estatisticas, catalogo=None):
+    """Lista de resumos por pergunta, na ordem do quiz"""
+    resumos = []
+    for indice in sorted(estatisticas):
+        pergunta = catalogo[indice] if catalogo is not None and indice < len(catalogo) else None
+        resumos.append(estatisticas[indice].resumo(indice, pergunta))
+    return resumos
+
+
+def exportar_csv(resumos, saida):
+    """Uma linha por pergunta; a distribuição vira uma coluna por alternativa"""
+    alternativas = max((max(r['distribuicao'], default=0) for r in resumos), default=0)
+    campos = ['pergunta', 'texto', 'respostas', 'acertos', 'taxa_acerto', 'sem_resposta',
+              'tempo_medio_ms'] + [f'p{p}_ms' for p in PERCENTIS] + ['alternativa_correta']
+    campos += [f'alternativa_{n}' for n in range(1, alternativas + 1)]
+    with open(saida, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=campos, extrasaction='ignore')
+        escritor.writeheader()
+        for resumo in resumos:
+            linha = dict(resumo)
+            for n in range(1, alternativas + 1):
+                linha[f'alternativa_{n}'] = resumo['distribuicao'].get(n, 0)
+            escritor.writerow(linha)
+
+
+def exportar_json(resumos, tentativas, saida):
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump({'tentativas': tentativas, 'perguntas': resumos}, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Análise por pergunta das respostas do Quiz')
+    parser.add_argument('--quiz', default=os.environ.get('QUIZ_PADRAO', 'medsenior'),
+                        help='slug do quiz (define o log e os textos das perguntas)')
+    parser.add_argument('--log', help='log de respostas (padrão: RESPOSTAS_LOG particionado pelo quiz)')
+    parser.add_argument('--quizzes-dir', default=os.environ.get(
+        'QUIZZES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quizzes')))
+    parser.add_argument('--desde', help='considera apenas respostas a partir desta data (AAAA-MM-DD)')
+    parser.add_argument('--formato', choices=['csv', 'json'], default='csv')
+    parser.add_argument('--saida')
+    args = parser.parse_args(argv)
+
+    caminho_log = args.log
+    if caminho_log is None:
+        # Mesma convenção do app: o quiz padrão usa o nome original do arquivo
+        particao = None if args.quiz == os.environ.get('QUIZ_PADRAO', 'medsenior') else args.quiz
+        caminho_log = caminho_particionado(os.environ.get('RESPOSTAS_LOG', 'respostas.log'), particao)
+
+    catalogo = None
+    caminho_quiz = os.path.join(args.quizzes_dir, f'{args.quiz}.json')
+    if os.path.exists(caminho_quiz):
+        catalogo = Quiz.de_arquivo(args.quiz, caminho_quiz).catalogo
+
+    inicio = time.perf_counter()
+    estatisticas, tentativas = analisar(caminho_log, args.desde)
+    resumos = resumir(estatisticas, catalogo)
+
+    saida = args.saida or f'analise_respostas.{args.formato}'
+    if args.formato == 'csv':
+        exportar_csv(resumos, saida)
+    else:
+        exportar_json(resumos, tentativas, saida)
+
+    for resumo in resumos:
+        print(f"  Pergunta {resumo['pergunta']:>2}: {resumo['taxa_acerto']:5.1f}% de acerto, "
+              f"p50 {resumo['p50_ms'] / 1000:.1f}s, p90 {resumo['p90_ms'] / 1000:.1f}s "
+              f"({resumo['respostas']} respostas)")
+    print(f"✅ {tentativas} tentativas analisadas de {caminho_log} em "
+          f"{time.perf_counter() - inicio:.2f}s; resultado em {saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,43 @@
-from flask import Flask, render_template, request, jsonify, session
-import json
+from flask import Flask, render_template, request, jsonify, session, g
 import os
-from datetime import datetime
-import uuid
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import math
+from datetime import date, datetime
 import secrets
 import logging
+import queue
+import re
+import threading
+import time
+import uuid
+
+import metricas
+from admissao import criar_controle_admissao
+from armazenamento import LIMITE_RANKING, EscritaAdiada, caminho_particionado, criar_ranking_store
+from ativos import CACHE_IMUTAVEL, CACHE_REVALIDAR, Ativos, aceita_codificacao
+from estado_quiz import EstadoQuiz, relogio
+from historico import LogAppend
+from limites import Balde, criar_limite_taxa
+from placar import Placar
+from publicacao import PublicadorRanking
+from quizzes import BancoQuizzes
+from sessoes import criar_sessao_store
+from transmissao import TransmissorRanking, formatar_evento
+
+_INICIO_IMPORTACAO = time.perf_counter()
 
-app = Flask(__name__)
+# /static é servido pela rota arquivo_estatico (nomes versionados e pré-comprimidos)
+app = Flask(__name__, static_folder=None)
 # Usar uma chave secreta mais segura
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 
 # Configurar logging
-logging.basicConfig(level=logging.INFO)
+# LOG_LEVEL=DEBUG inclui os eventos de cada requisição (desligados em INFO para não custar no caminho quente)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
 # Configurações de sessão e segurança
@@ -20,193 +46,930 @@ app.config['SESSION_COOKIE_SECURE'] = os.environ.get('FLASK_ENV') == 'production
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hora
 
+# Estado do quiz no servidor (SESSAO_BACKEND=sqlite|memoria); com "cookie" ele viaja na sessão assinada
+sessao_store = criar_sessao_store(app.config['PERMANENT_SESSION_LIFETIME'])
+if sessao_store is not None:
+    # O cookie passa a conter só o quiz_id: não precisa ser reemitido a cada requisição
+    app.config['SESSION_REFRESH_EACH_REQUEST'] = False
+    metricas.SESSOES_ATIVAS.adicionar_fonte(sessao_store.total_ativas)
+
 # Não há mais lista pré-definida de participantes
 # Os usuários podem inserir seu próprio nome e sobrenome
 
-# Perguntas do quiz sobre Medsenior
-PERGUNTAS = [
-    {
-        "pergunta": "Qual é o tempo de carência normal para internações clínicas, cirúrgicas e UTI na Medsenior?",
-        "alternativas": [
-            "180 dias",
-            "120 dias",
-            "90 dias",
-            "60 dias"
-        ],
-        "resposta_correta": 0
-    },
-    {
-        "pergunta": "Qual é a especialidade principal da Medsenior?",
-        "alternativas": [
-            "Planos de saúde para empresas",
-            "Consultoria médica",
-            "Planos de saúde para idosos",
-            "Medicina preventiva"
-        ],
-        "resposta_correta": 2
-    },
-    {
-        "pergunta": "A partir de qual idade é possível contratar um plano Medsenior?",
-        "alternativas": [
-            "50 anos",
-            "55 anos",
-            "60 anos",
-            "65 anos"
-        ],
-        "resposta_correta": 1
-    },
-    {
-        "pergunta": "Qual é o principal diferencial da Medsenior no mercado?",
-        "alternativas": [
-            "Preços mais baixos",
-            "Atendimento especializado para a terceira idade",
-            "Cobertura internacional",
-            "Consultas online"
-        ],
-        "resposta_correta": 1
-    },
-    {
-        "pergunta": "Qual é o tempo de carência para consultas médicas na Medsenior?",
-        "alternativas": [
-            "Não há carência",
-            "30 dias",
-            "60 dias",
-            "90 dias"
-        ],
-        "resposta_correta": 0
-    },
-    {
-        "pergunta": "A Medsenior oferece cobertura para:",
-        "alternativas": [
-            "Apenas consultas",
-            "Consultas e exames",
-            "Cobertura hospitalar completa",
-            "Apenas emergências"
-        ],
-        "resposta_correta": 2
-    },
-    {
-        "pergunta": "Qual é o tempo de carência para partos na Medsenior?",
-        "alternativas": [
-            "180 dias",
-            "240 dias",
-            "300 dias",
-            "Não se aplica ao público-alvo"
-        ],
-        "resposta_correta": 3
-    },
-    {
-        "pergunta": "A Medsenior possui rede própria ou credenciada?",
-        "alternativas": [
-            "Apenas rede própria",
-            "Apenas rede credenciada",
-            "Ambas - rede própria e credenciada",
-            "Não possui rede"
-        ],
-        "resposta_correta": 2
-    },
-    {
-        "pergunta": "Qual é o foco principal dos serviços da Medsenior?",
-        "alternativas": [
-            "Medicina esportiva",
-            "Pediatria",
-            "Geriatria e cuidados com idosos",
-            "Medicina do trabalho"
-        ],
-        "resposta_correta": 2
-    },
-    {
-        "pergunta": "A Medsenior oferece cobertura para procedimentos de alta complexidade?",
-        "alternativas": [
-            "Não oferece",
-            "Apenas para emergências",
-            "Sim, conforme ANS",
-            "Apenas com coparticipação"
-        ],
-        "resposta_correta": 2
+DIRETORIO_APP = os.path.dirname(os.path.abspath(__file__))
+
+# CSS/JS versionados pelo hash do conteúdo; nos templates: {{ ativo('css/base.css') }}
+ativos = Ativos(os.path.join(DIRETORIO_APP, 'static'))
+app.jinja_env.globals['ativo'] = ativos.url
+
+# Respostas dinâmicas (JSON/HTML) a partir deste tamanho (bytes) vão com gzip; 0 desliga
+COMPRESSAO_MINIMA = int(os.environ.get('COMPRESSAO_MINIMA', 1024))
+COMPRESSAO_NIVEL = int(os.environ.get('COMPRESSAO_NIVEL', 6))
+TIPOS_COMPRIMIVEIS = ('application/json', 'text/html')
+
+# Quiz servido pelas rotas sem prefixo (/pergunta, /ranking...)
+QUIZ_PADRAO = os.environ.get('QUIZ_PADRAO', 'medsenior')
+
+# Folga (segundos) para a latência de rede antes de considerar uma resposta fora do prazo
+TOLERANCIA_RESPOSTA = float(os.environ.get('TOLERANCIA_RESPOSTA', 3))
+
+# Tempo (segundos) em que o cliente exibe o resultado antes da próxima pergunta em /proximo
+ATRASO_EXIBICAO = float(os.environ.get('ATRASO_EXIBICAO', 3))
+
+# Se definido, /metrics exige o header "Authorization: Bearer <token>"
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+
+# Nome e sobrenome: apenas letras (com acentos) e espaços
+NOME_VALIDO = re.compile(r'^[a-zA-ZÀ-ÿ\s]+$')
+TAMANHO_MAXIMO_NOME = 100
+
+# Templates renderizados pelas rotas (compilados no aquecimento)
+TEMPLATES = ('base_novo.html', 'index_novo.html', 'ranking_novo.html')
+
+# Log de respostas individuais para análise por pergunta (RESPOSTAS_LOG= vazio desliga)
+RESPOSTAS_LOG = os.environ.get('RESPOSTAS_LOG', 'respostas.log')
+
+# Snapshot estático do ranking (ranking.json/ranking.html) para um proxy servir sem o app; vazio desliga
+RANKING_PUBLICAR_DIR = os.environ.get('RANKING_PUBLICAR_DIR', '')
+
+# Tamanho de página do /api/ranking paginado (padrão e máximo)
+PAGINA_PADRAO = 20
+PAGINA_MAXIMA = 100
+
+# Início do evento em andamento (ISO 8601) para /api/ranking?janela=evento
+EVENTO_INICIO = os.environ.get('EVENTO_INICIO')
+
+# Parâmetros que ativam a resposta paginada de /api/ranking (sem eles, a lista top-K de sempre)
+PARAMETROS_PAGINACAO = ('limit', 'cursor', 'janela', 'quiz_id')
+
+# ?modo= do ranking: todas as tentativas ou só a melhor de cada participante
+MODOS_RANKING = ('todos', 'melhores')
+
+# Limite de requisições nas rotas de escrita (LIMITE_BACKEND=sqlite|memoria|desligado)
+limite_taxa = criar_limite_taxa()
+
+# Baldes (rajada, fichas/s): /iniciar_quiz por navegador e, com um teto bem mais alto, por IP
+# (redes de eventos e proxies põem muitos participantes atrás do mesmo IP); as demais escritas por
+# quiz em andamento
+BALDES = {
+    'iniciar': Balde(int(os.environ.get('LIMITE_INICIAR_RAJADA', 20)),
+                     float(os.environ.get('LIMITE_INICIAR_POR_MIN', 20)) / 60),
+    'iniciar_ip': Balde(int(os.environ.get('LIMITE_INICIAR_IP_RAJADA', 500)),
+                        float(os.environ.get('LIMITE_INICIAR_IP_POR_MIN', 1000)) / 60),
+    'escrita': Balde(int(os.environ.get('LIMITE_ESCRITA_RAJADA', 30)),
+                     float(os.environ.get('LIMITE_ESCRITA_POR_S', 2)))
+}
+ROTAS_LIMITADAS = {
+    'iniciar_quiz': 'iniciar',
+    'responder_pergunta': 'escrita',
+    'proximo': 'escrita',
+    'submeter_lote': 'escrita',
+    'finalizar_quiz': 'escrita'
+}
+
+# Atrás de um proxy reverso (Render, nginx), o IP do cliente vem do X-Forwarded-For
+CONFIAR_PROXY = os.environ.get('LIMITE_CONFIAR_PROXY', '0') == '1'
+
+# Sala de espera: limite adaptativo de quizzes em andamento (ADMISSAO_BACKEND=sqlite|memoria|desligado)
+controle_admissao = criar_controle_admissao()
+
+# Rotas de quem já está no quiz: a latência delas ajusta o limite de admissão
+ROTAS_EM_ANDAMENTO = ('obter_pergunta', 'responder_pergunta', 'proximo', 'finalizar_quiz',
+                      'obter_catalogo', 'submeter_lote')
+
+# Aquecimento na inicialização (AQUECER=0 desliga, por exemplo em scripts)
+AQUECER = os.environ.get('AQUECER', '1') != '0'
+
+# Detalhes por pergunta: ficam no armazenamento (estatísticas), fora das respostas públicas do ranking
+CAMPOS_INTERNOS = ('acertos_pergunta', 'tempos_resposta')
+
+def resultado_publico(resultado):
+    """Resultado como aparece no ranking (API, stream, página e snapshot estático)"""
+    if not any(campo in resultado for campo in CAMPOS_INTERNOS):
+        return resultado
+    return {chave: valor for chave, valor in resultado.items() if chave not in CAMPOS_INTERNOS}
+
+class RankingCache:
+    """Cache em memória do ranking ordenado, invalidado pela versão do armazenamento
+
+    Cada worker mantém seu próprio Placar (top-K); a versão (contador no
+    SQLite ou mtime do JSON) é consultada a cada acesso e, quando muda,
+    apenas os resultados novos são inseridos no placar. A lista retornada
+    é compartilhada: não deve ser alterada.
+    """
+
+    _SEM_VERSAO = object()
+
+    def __init__(self, store, k=LIMITE_RANKING):
+        self.store = store
+        self.k = k
+        self._lock = threading.Lock()
+        self._versao = self._SEM_VERSAO
+        self._placar = Placar(k)
+        self._cursor = None
+        self._dados = []
+        self._corpo_json = None
+        self._corpo_gzip = None
+        self._agregados = None
+        # Valores derivados do ranking (página renderizada), descartados a cada versão nova
+        self._derivados = {}
+        self.acertos = 0
+        self.falhas = 0
+
+    def _atualizar(self):
+        versao = self.store.versao()
+        with self._lock:
+            if versao == self._versao:
+                self.acertos += 1
+                return
+            # A versão foi obtida antes da leitura; no pior caso a próxima
+            # consulta encontra a versão nova e lê de novo (sem perder dados)
+            alteracoes = self.store.alteracoes_desde(self._cursor)
+            if alteracoes is None:
+                itens, self._cursor = self.store.carregar_placar(self.k)
+                self._placar = Placar(self.k, map(resultado_publico, itens))
+            else:
+                novos, self._cursor = alteracoes
+                for resultado in novos:
+                    self._placar.inserir(resultado_publico(resultado))
+            self._versao = versao
+            self._dados = self._placar.itens()
+            self._corpo_json = None
+            self._corpo_gzip = None
+            self._agregados = None
+            self._derivados = {}
+            self.falhas += 1
+
+    def obter(self):
+        """Retorna o ranking ordenado"""
+        self._atualizar()
+        return self._dados
+
+    def obter_json(self):
+        """Retorna o ranking já serializado em JSON (bytes)"""
+        self._atualizar()
+        with self._lock:
+            if self._corpo_json is None:
+                self._corpo_json = app.json.dumps(self._dados).encode('utf-8')
+            return self._corpo_json
+
+    def obter_json_gzip(self):
+        """Ranking serializado e comprimido com gzip, calculado uma vez por versão"""
+        corpo = self.obter_json()
+        with self._lock:
+            if self._corpo_gzip is None or self._corpo_gzip[0] is not corpo:
+                self._corpo_gzip = (corpo, gzip.compress(corpo, compresslevel=COMPRESSAO_NIVEL))
+            return self._corpo_gzip[1]
+
+    def obter_agregados(self):
+        """Estatísticas de todos os resultados (mantidas pelo armazenamento), lidas uma vez por versão"""
+        self._atualizar()
+        with self._lock:
+            if self._agregados is None:
+                self._agregados = self.store.agregados().resumo()
+            return self._agregados
+
+    def obter_melhores(self):
+        """Melhor tentativa de cada participante (top-K), lida do índice uma vez por versão"""
+        return self.memorizar('melhores', lambda: [resultado_publico(r) for r in self.store.melhores(self.k)])
+
+    def obter_participante(self, nome):
+        """{'tentativas', 'melhor'} do participante, ou None
+
+        No SQLite é uma consulta pela chave primária; nos backends JSON e log,
+        um acesso ao índice em memória, que só aplica os resultados novos.
+        Nos demais, o índice inteiro é lido uma vez por versão.
+        """
+        if self.store.consulta_participante_indexada:
+            return self.store.participante(nome)
+        return self.memorizar('participantes', self.store.participantes).obter(nome)
+
+    def memorizar(self, chave, calcular):
+        """Valor derivado do ranking, calculado uma vez por versão
+
+        `calcular` roda fora do lock (pode consultar o próprio cache); se a
+        versão mudar no meio do cálculo, o valor é devolvido mas não guardado.
+        """
+        self._atualizar()
+        with self._lock:
+            versao = self._versao
+            valor = self._derivados.get(chave)
+        if valor is not None:
+            return valor
+        valor = calcular()
+        with self._lock:
+            if self._versao is versao:
+                self._derivados[chave] = valor
+        return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._versao = self._SEM_VERSAO
+            self._derivados = {}
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / total, 4) if total else 0.0,
+                'registros': len(self._dados)
+            }
+
+def _preparar_quiz(quiz):
+    """Cria o ranking particionado do quiz: armazenamento, cache e transmissão ao vivo"""
+    # O quiz padrão mantém os arquivos originais (ranking.db, ranking.json)
+    particao = None if quiz.slug == QUIZ_PADRAO else quiz.slug
+    quiz.ranking_store = criar_ranking_store(slug=particao)
+    quiz.respostas_log = LogAppend(caminho_particionado(RESPOSTAS_LOG, particao)) if RESPOSTAS_LOG else None
+    quiz.ranking_cache = RankingCache(quiz.ranking_store)
+    # Deltas do ranking ao vivo (SSE); a verificação da versão é compartilhada por todos os espectadores
+    quiz.transmissor = TransmissorRanking(
+        quiz.ranking_cache.obter,
+        intervalo=float(os.environ.get('RANKING_STREAM_INTERVALO', 1.0))
+    )
+    # Snapshot estático: mesmos caminhos das rotas (/ranking -> ranking.html, /q/<slug>/ranking -> q/<slug>/...)
+    quiz.publicador = None
+    if RANKING_PUBLICAR_DIR:
+        quiz.publicador = PublicadorRanking(
+            os.path.join(RANKING_PUBLICAR_DIR, *(('q', particao) if particao else ())),
+            lambda: arquivos_publicados(quiz, particao),
+            intervalo=int(os.environ.get('RANKING_PUBLICAR_MS', 500)) / 1000
+        )
+    if isinstance(quiz.ranking_store, EscritaAdiada):
+        # Com escrita adiada, o resultado só aparece no ranking quando o lote é gravado
+        quiz.ranking_store.ao_gravar = lambda: notificar_ranking(quiz)
+    # Métricas: duração das leituras/gravações, eficiência do cache e espectadores
+    metricas.instrumentar(quiz.ranking_store, ('adicionar', 'versao', 'carregar_placar', 'alteracoes_desde',
+                                               'agregados', 'pagina', 'posicao', 'participante',
+                                               'participantes', 'melhores'),
+                          metricas.RANKING_OPERACOES, quiz.slug)
+    metricas.CACHE_ACERTOS.adicionar_fonte(lambda: quiz.ranking_cache.acertos, quiz.slug)
+    metricas.CACHE_FALHAS.adicionar_fonte(lambda: quiz.ranking_cache.falhas, quiz.slug)
+    metricas.ESPECTADORES.adicionar_fonte(quiz.transmissor.total_assinantes, quiz.slug)
+
+if controle_admissao is not None:
+    metricas.ADMISSAO_LIMITE.adicionar_fonte(lambda: controle_admissao.situacao()[0])
+    metricas.ADMISSAO_FILA.adicionar_fonte(lambda: controle_admissao.situacao()[2])
+    if sessao_store is None:
+        # Com SESSAO_BACKEND=cookie não há sessões no servidor: as vagas ocupadas contam os quizzes em andamento
+        metricas.SESSOES_ATIVAS.adicionar_fonte(lambda: controle_admissao.situacao()[1])
+
+# Bancos de quizzes (quizzes/<slug>.json), carregados sob demanda
+banco_quizzes = BancoQuizzes(
+    os.environ.get('QUIZZES_DIR', os.path.join(DIRETORIO_APP, 'quizzes')),
+    preparar=_preparar_quiz
+)
+
+quiz_padrao = banco_quizzes.obter(QUIZ_PADRAO)
+if quiz_padrao is None:
+    raise RuntimeError(f"Quiz padrão '{QUIZ_PADRAO}' não encontrado em {banco_quizzes.diretorio}")
+
+# Atalhos do quiz padrão (compatibilidade com scripts de verificação)
+PERGUNTAS = quiz_padrao.catalogo
+ranking_store = quiz_padrao.ranking_store
+ranking_cache = quiz_padrao.ranking_cache
+transmissor_ranking = quiz_padrao.transmissor
+
+def aquecer():
+    """Deixa o worker pronto antes da primeira requisição e retorna a duração de cada etapa (ms)
+
+    Carrega todos os quizzes (catálogo, armazenamento e placar do ranking),
+    compila os templates e as rotas, de modo que a primeira requisição após
+    o serviço acordar custe o mesmo que as seguintes.
+    """
+    tempos = {}
+
+    inicio = time.perf_counter()
+    quizzes = [quiz for quiz in map(banco_quizzes.obter, banco_quizzes.slugs()) if quiz is not None]
+    tempos['quizzes'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    for quiz in quizzes:
+        quiz.ranking_cache.obter_json()
+        if quiz.publicador is not None:
+            # Publica o snapshot atual sem esperar o primeiro resultado novo
+            quiz.publicador.notificar()
+    tempos['ranking'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    ativos.carregar()
+    tempos['estaticos'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    for nome in TEMPLATES:
+        app.jinja_env.get_template(nome)
+    tempos['templates'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    app.url_map.update()
+    app.session_interface.get_signing_serializer(app)
+    tempos['rotas'] = (time.perf_counter() - inicio) * 1000
+
+    for etapa, ms in tempos.items():
+        metricas.INICIALIZACAO.definir(ms / 1000, etapa)
+    return tempos
+
+_aquecido = False
+
+def criar_app():
+    """Fábrica usada pelo servidor (gunicorn 'app:criar_app()'): retorna o app já aquecido"""
+    global _aquecido
+    if AQUECER and not _aquecido:
+        tempos = aquecer()
+        _aquecido = True
+        detalhes = ' '.join(f'{etapa}={ms:.1f}ms' for etapa, ms in tempos.items())
+        logger.info(f"Aquecimento concluído em {sum(tempos.values()):.1f}ms ({detalhes}); "
+                    f"importação em {(time.perf_counter() - _INICIO_IMPORTACAO) * 1000:.1f}ms")
+    return app
+
+def obter_quiz(slug):
+    """Quiz da rota atual (o padrão quando a URL não tem /q/<slug>)"""
+    return quiz_padrao if slug is None else banco_quizzes.obter(slug)
+
+def urls_do_quiz(slug):
+    """Prefixos de URL usados pelos templates para falar com o quiz certo"""
+    if slug is None:
+        return {'base_url': '', 'api_url': '/api'}
+    return {'base_url': f'/q/{slug}', 'api_url': f'/api/q/{slug}'}
+
+# As funções de estado recebem a sessão explicitamente quando chamadas fora
+# de uma requisição Flask (modo ASGI); por padrão usam a sessão do Flask
+
+def carregar_estado(quiz, sessao=None):
+    """Estado do quiz em andamento nesta sessão (None se não houver ou for de outro quiz)"""
+    sessao = session if sessao is None else sessao
+    if sessao_store is None:
+        dados = sessao.get('q')
+    else:
+        quiz_id = sessao.get('quiz_id')
+        dados = sessao_store.obter(quiz_id) if quiz_id else None
+    estado = EstadoQuiz.decodificar(dados)
+    if estado is None or estado.slug != quiz.slug:
+        return None
+    return estado
+
+def salvar_estado(estado, sessao=None):
+    """Grava o estado compacto (só é chamado quando algo mudou)"""
+    sessao = session if sessao is None else sessao
+    if sessao_store is None:
+        sessao['q'] = estado.codificar()
+    else:
+        sessao_store.salvar(estado.quiz_id, estado.codificar())
+    # Também no cookie: chave do limite das escritas e busca do resultado em /finalizar_quiz repetido
+    if sessao.get('quiz_id') != estado.quiz_id:
+        sessao['quiz_id'] = estado.quiz_id
+
+def limpar_sessao(sessao, quiz_id=None):
+    """Esvazia a sessão, mantendo o id do navegador (limite de /iniciar_quiz) e o quiz_id informado"""
+    cliente = sessao.get('cliente')
+    sessao.clear()
+    if cliente:
+        sessao['cliente'] = cliente
+    if quiz_id:
+        sessao['quiz_id'] = quiz_id
+
+def encerrar_estado(estado, sessao=None):
+    """Descarta o estado do quiz ao finalizar (o quiz_id fica para repetições de /finalizar_quiz)"""
+    sessao = session if sessao is None else sessao
+    limpar_sessao(sessao, estado.quiz_id)
+    if sessao_store is not None:
+        sessao_store.remover(estado.quiz_id)
+    liberar_vaga(estado.quiz_id)
+
+def iniciar_estado(quiz, participante, sessao=None, quiz_id=None):
+    """Começa um quiz novo nesta sessão (instantes medidos pelo relógio do servidor, ver estado_quiz.relogio)"""
+    sessao = session if sessao is None else sessao
+    estado = EstadoQuiz.novo(quiz.slug, participante, relogio(), quiz_id)
+    limpar_sessao(sessao)
+    # Equivale a session.permanent = True (também na sessão do modo ASGI)
+    sessao['_permanent'] = True
+    salvar_estado(estado, sessao)
+    metricas.QUIZZES_INICIADOS.incrementar(quiz.slug)
+    logger.info('Quiz iniciado quiz=%s id=%s', quiz.slug, estado.quiz_id)
+    return estado
+
+def duracao_maxima(quiz):
+    """Tempo máximo (s) de um quiz em andamento; depois disso a vaga da admissão expira sozinha"""
+    return len(quiz.catalogo) * (quiz.tempo_por_pergunta + TOLERANCIA_RESPOSTA + ATRASO_EXIBICAO) + 60
+
+def admitir_quiz(quiz, data, sessao=None):
+    """Reserva uma vaga para um quiz novo: (quiz_id, None) ou (None, (corpo, headers) da resposta 503)
+
+    Quem está na fila envia de volta o ticket recebido. Se o controle de
+    admissão falhar, o quiz começa normalmente.
+    """
+    quiz_id = str(uuid.uuid4())
+    if controle_admissao is None:
+        return quiz_id, None
+    try:
+        # Recomeçar na mesma sessão (recarregar a página) reaproveita a vaga do quiz anterior
+        anterior = carregar_estado(quiz, sessao)
+        admitido, ticket, posicao = controle_admissao.admitir(quiz_id, str(data.get('ticket') or '')[:64],
+                                                              duracao_maxima(quiz),
+                                                              anterior.quiz_id if anterior else None)
+    except Exception as e:
+        logger.error(f"Erro no controle de admissão: {e}")
+        return quiz_id, None
+    if admitido:
+        return quiz_id, None
+    metricas.INICIOS_ENFILEIRADOS.incrementar(quiz.slug)
+    espera = controle_admissao.espera(posicao)
+    logger.debug('Início enfileirado quiz=%s posicao=%d espera_s=%d', quiz.slug, posicao, espera)
+    return None, ({'fila': True, 'ticket': ticket, 'posicao': posicao, 'retry_after': espera,
+                   'mensagem': 'Muitas pessoas começando agora. Você entrará automaticamente.'},
+                  {'Retry-After': str(espera)})
+
+def liberar_vaga(quiz_id):
+    if controle_admissao is None:
+        return
+    try:
+        controle_admissao.liberar(quiz_id)
+    except Exception as e:
+        logger.error(f"Erro ao liberar vaga da admissão: {e}")
+
+def situacao_fila(ticket):
+    """Resposta de /fila: posição do ticket e se ele já pode iniciar o quiz"""
+    if controle_admissao is None:
+        return {'posicao': None, 'liberado': True, 'retry_after': 0}
+    posicao, liberado = controle_admissao.consultar(ticket)
+    return {'posicao': posicao, 'liberado': liberado,
+            'retry_after': 0 if liberado else controle_admissao.espera(posicao)}
+
+def validar_participante(participante):
+    """Mensagem de erro para um nome inválido, ou None se o nome for aceito"""
+    if not participante:
+        return 'Nome completo é obrigatório'
+    
+    # Validar se o nome tem pelo menos nome e sobrenome
+    palavras = participante.split()
+    if len(palavras) < 2:
+        return 'Por favor, informe nome e sobrenome completos'
+    
+    # Validar se contém apenas letras, espaços e acentos
+    if not NOME_VALIDO.match(participante):
+        return 'Nome deve conter apenas letras'
+    
+    # Validar tamanho mínimo e máximo
+    if len(participante) < 5:
+        return 'Nome muito curto'
+    if len(participante) > TAMANHO_MAXIMO_NOME:
+        return 'Nome muito longo'
+    return None
+
+class RespostaInvalida(Exception):
+    """Erro de validação no fluxo de respostas, com o status HTTP para o cliente"""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+def exigir_online(estado):
+    """Depois que o catálogo inteiro foi entregue, as rotas pergunta a pergunta não valem mais"""
+    if estado.offline:
+        raise RespostaInvalida('Quiz em modo offline: envie as respostas por /submeter_lote', 409)
+
+def corrigir_resposta(quiz, estado, resposta, latencia_ms=None):
+    """Corrige a resposta da pergunta atual, registra no estado e retorna o resultado
+
+    Sem latência explícita, o tempo de resposta é medido pelo relógio do
+    servidor desde a entrega da pergunta.
+    """
+    if latencia_ms is None:
+        exigir_online(estado)
+    # Validar resposta (-1 indica que o tempo acabou sem resposta)
+    if resposta is None or isinstance(resposta, bool) or not isinstance(resposta, int):
+        raise RespostaInvalida('Resposta inválida')
+    
+    pergunta_atual = estado.pergunta_atual
+    if pergunta_atual >= len(quiz.catalogo):
+        raise RespostaInvalida('Quiz já finalizado')
+    
+    pergunta = quiz.catalogo[pergunta_atual]
+    resposta_correta = pergunta.resposta_correta
+    
+    # Validar índice da resposta
+    if resposta < -1 or resposta >= len(pergunta.alternativas):
+        raise RespostaInvalida('Índice de resposta inválido')
+    
+    if latencia_ms is None:
+        agora = relogio()
+        # Depois de /proximo o relógio só começa após ATRASO_EXIBICAO: uma resposta antes
+        # disso viria de um cliente que não esperou a exibição e não pode valer pontuação máxima
+        if estado.emitida_em is None or agora < estado.emitida_em:
+            raise RespostaInvalida('Pergunta ainda não foi exibida', 409)
+        # Tempo de resposta medido pelo servidor; o valor enviado pelo cliente é ignorado
+        latencia_ms = round((agora - estado.emitida_em) * 1000)
+    tempo_resposta = latencia_ms / 1000
+    no_prazo = tempo_resposta <= quiz.tempo_por_pergunta + TOLERANCIA_RESPOSTA
+    
+    acertou = no_prazo and resposta == resposta_correta
+    if acertou:
+        # Pontuação baseada no tempo restante (regras do quiz)
+        pontos = quiz.calcular_pontos(quiz.tempo_por_pergunta - tempo_resposta)
+    else:
+        pontos = 0
+    
+    # Registrar resposta e avançar para a próxima pergunta
+    estado.registrar(resposta, acertou, pontos, latencia_ms)
+    
+    logger.debug('Resposta processada id=%s pergunta=%d acertou=%s latencia_ms=%d',
+                 estado.quiz_id, pergunta_atual + 1, acertou, latencia_ms)
+    
+    return {
+        'acertou': acertou,
+        'resposta_correta': resposta_correta,
+        'alternativa_correta': pergunta.alternativas[resposta_correta],
+        'pontos_ganhos': pontos,
+        'pontuacao_total': estado.pontuacao
+    }
+
+def avancar_quiz(quiz, estado, data):
+    """Passo do /proximo: corrige a resposta (se enviada) e prepara a próxima pergunta
+
+    Retorna (resultado, pergunta); pergunta é None quando o quiz acabou.
+    O estado é salvo pelo chamador.
+    """
+    exigir_online(estado)
+    resultado = {}
+    atraso = 0
+    if 'resposta' in data:
+        resultado = corrigir_resposta(quiz, estado, data['resposta'])
+        atraso = ATRASO_EXIBICAO
+    
+    if estado.pergunta_atual >= len(quiz.catalogo):
+        resultado['quiz_finalizado'] = True
+        return resultado, None
+    
+    estado.emitir(relogio() + atraso)
+    resultado['exibir_em_ms'] = int(atraso * 1000)
+    return resultado, quiz.catalogo[estado.pergunta_atual]
+
+def ip_cliente(remoto, encaminhado=''):
+    if CONFIAR_PROXY and encaminhado:
+        return encaminhado.split(',')[0].strip()
+    return remoto or 'desconhecido'
+
+def baldes_da_requisicao(grupo, ip, sessao):
+    """(balde, identificador) consumidos pela requisição
+
+    /iniciar_quiz conta por navegador (id guardado na sessão pela página
+    inicial) e, com um teto bem mais alto, por IP; as demais rotas contam
+    pelo quiz_id da sessão ou, sem ele, pelo IP.
+    """
+    if grupo == 'iniciar':
+        baldes = [('iniciar_ip', ip)]
+        if sessao.get('cliente'):
+            baldes.append(('iniciar', sessao['cliente']))
+        return baldes
+    return [(grupo, sessao.get('quiz_id') or ip)]
+
+def verificar_limite(grupo, ip, sessao, dados=None):
+    """Consome uma ficha dos baldes do grupo; retorna os segundos de espera se o limite estourou
+
+    Quem está na sala de espera e volta com o ticket não conta no limite de
+    /iniciar_quiz. Se o armazenamento do limite falhar, a requisição segue
+    normalmente.
+    """
+    if limite_taxa is None:
+        return None
+    try:
+        if grupo == 'iniciar' and ticket_na_fila(dados):
+            return None
+        for balde, identificador in baldes_da_requisicao(grupo, ip, sessao):
+            permitido, espera = limite_taxa.permitir(f'{balde}:{identificador}', BALDES[balde])
+            if not permitido:
+                break
+    except Exception as e:
+        logger.error(f"Erro ao verificar limite de requisições: {e}")
+        return None
+    if permitido:
+        return None
+    metricas.REQUISICOES_LIMITADAS.incrementar(balde)
+    logger.debug('Requisição limitada grupo=%s chave=%s espera_s=%.1f', balde, identificador, espera)
+    return espera
+
+def ticket_na_fila(dados):
+    """Se a requisição traz o ticket de alguém que está na sala de espera"""
+    ticket = dados.get('ticket') if isinstance(dados, dict) else None
+    if controle_admissao is None or not ticket or not isinstance(ticket, str):
+        return False
+    return controle_admissao.consultar(ticket[:64])[0] is not None
+
+def resposta_limitada(espera):
+    """Corpo e headers da resposta 429"""
+    return ({'erro': 'Muitas requisições. Aguarde alguns segundos e tente novamente.'},
+            {'Retry-After': str(max(1, math.ceil(espera)))})
+
+def resumo_resultado(resultado):
+    """Resposta de /finalizar_quiz a partir do resultado gravado"""
+    return {
+        'pontuacao_final': resultado['pontuacao'],
+        'acertos': resultado['acertos'],
+        'total_perguntas': resultado['total_perguntas'],
+        # Permite ao cliente consultar a própria posição (/api/ranking?quiz_id=...)
+        'quiz_id': resultado['quiz_id']
+    }
+
+def resultado_anterior(quiz, sessao=None):
+    """Resumo de um quiz já finalizado nesta sessão (repetição de /finalizar_quiz), ou None"""
+    sessao = session if sessao is None else sessao
+    quiz_id = sessao.get('quiz_id')
+    if not quiz_id:
+        return None
+    resultado = quiz.ranking_store.buscar(quiz_id)
+    return resumo_resultado(resultado) if resultado else None
+
+def notificar_ranking(quiz):
+    """Avisa quem reage a resultados novos: o ranking ao vivo e o snapshot estático"""
+    quiz.transmissor.notificar()
+    if quiz.publicador is not None:
+        quiz.publicador.notificar()
+
+def registrar_resultado(quiz, estado):
+    """Grava o resultado final no ranking do quiz e retorna o resumo para o cliente
+
+    Idempotente por quiz_id: uma repetição devolve o mesmo resumo sem gravar
+    nem notificar nada.
+    """
+    resultado = {
+        'participante': estado.participante,
+        'pontuacao': estado.pontuacao,
+        'data_hora': datetime.now().isoformat(),
+        'acertos': estado.total_acertos,
+        'total_perguntas': len(quiz.catalogo),
+        'quiz_id': estado.quiz_id,
+        # Duração total e latências medidas no servidor
+        'duracao_segundos': round(max(0.0, relogio() - estado.inicio), 3),
+        'tempos_resposta': [ms / 1000 for ms in estado.latencias_ms],
+        # Acerto (1) ou erro (0) em cada pergunta, para as estatísticas por pergunta
+        'acertos_pergunta': [estado.acertos >> i & 1 for i in range(estado.pergunta_atual)]
     }
-]
+    
+    # Salvar resultado no ranking do quiz (inserção atômica de um único registro)
+    if not quiz.ranking_store.adicionar(resultado):
+        logger.debug('Resultado repetido ignorado quiz=%s id=%s', quiz.slug, estado.quiz_id)
+        return resumo_resultado(resultado)
+    notificar_ranking(quiz)
+    registrar_respostas(quiz, estado, resultado['data_hora'])
+    metricas.QUIZZES_FINALIZADOS.incrementar(quiz.slug)
+    
+    logger.info('Quiz finalizado quiz=%s id=%s acertos=%d/%d pontos=%d', quiz.slug, estado.quiz_id,
+                resultado['acertos'], resultado['total_perguntas'], resultado['pontuacao'])
+    
+    return resumo_resultado(resultado)
+
+def registrar_respostas(quiz, estado, data_hora):
+    """Acrescenta uma linha por resposta ao log de análise (analise_respostas.py)
+
+    Uma falha aqui não impede o resultado de ser gravado no ranking.
+    """
+    if quiz.respostas_log is None:
+        return
+    try:
+        quiz.respostas_log.registrar_lote([
+            {
+                'quiz': quiz.slug,
+                'quiz_id': estado.quiz_id,
+                'data_hora': data_hora,
+                'pergunta': detalhe['pergunta'],
+                'resposta': detalhe['resposta_usuario'],
+                'resposta_correta': detalhe['resposta_correta'],
+                'acertou': detalhe['acertou'],
+                'pontos': detalhe['pontos'],
+                'tempo_ms': estado.latencias_ms[detalhe['pergunta']]
+            }
+            for detalhe in estado.respostas(quiz)
+        ])
+    except OSError as e:
+        logger.error(f"Erro ao gravar respostas no log de análise: {e}")
+
+def json_com_payload(dados, chave, payload):
+    """Serializa `dados` acrescentando um JSON já serializado (bytes) sob `chave`"""
+    corpo = app.json.dumps(dados).encode('utf-8')
+    separador = b',' if dados else b''
+    return corpo[:-1] + separador + app.json.dumps(chave).encode('utf-8') + b':' + payload + b'}'
+
+def inicio_janela(janela):
+    """Início (ISO 8601) da janela de tempo do ranking, ou None para todos os resultados"""
+    if janela in (None, '', 'todos'):
+        return None
+    if janela == 'hoje':
+        return date.today().isoformat()
+    if janela == 'evento':
+        if not EVENTO_INICIO:
+            raise RespostaInvalida('Janela "evento" não configurada')
+        return EVENTO_INICIO
+    raise RespostaInvalida('Janela inválida (use hoje, evento ou todos)')
+
+def codificar_cursor(cursor):
+    dados = json.dumps(cursor, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(dados).decode('ascii').rstrip('=')
+
+def decodificar_cursor(token):
+    try:
+        return json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, binascii.Error):
+        raise RespostaInvalida('Cursor inválido')
+
+def consultar_ranking(quiz, parametros):
+    """Ranking paginado: página por cursor, janela de tempo e posição de um quiz_id
+
+    Cada chamada lê no máximo uma página (e uma contagem para a posição)
+    do índice do armazenamento, independentemente do total de resultados.
+    """
+    try:
+        limite = int(parametros.get('limit', PAGINA_PADRAO))
+    except ValueError:
+        raise RespostaInvalida('limit inválido')
+    if not 1 <= limite <= PAGINA_MAXIMA:
+        raise RespostaInvalida(f'limit deve estar entre 1 e {PAGINA_MAXIMA}')
+    desde = inicio_janela(parametros.get('janela'))
+    if (parametros.get('cursor') or parametros.get('quiz_id')) and not quiz.ranking_store.historico_completo:
+        # Só o top-K está disponível: não há páginas além dele nem posição para quem saiu dele
+        raise RespostaInvalida('cursor e quiz_id exigem RANKING_BACKEND=sqlite ou log', 501)
+    apos = decodificar_cursor(parametros['cursor']) if parametros.get('cursor') else None
+
+    try:
+        itens, proximo = quiz.ranking_store.pagina(limite, apos=apos, desde=desde)
+    except ValueError:
+        raise RespostaInvalida('Cursor inválido')
+    resposta = {'itens': [resultado_publico(r) for r in itens],
+                'proximo_cursor': codificar_cursor(proximo) if proximo else None}
+
+    quiz_id = parametros.get('quiz_id')
+    if quiz_id:
+        encontrado = quiz.ranking_store.posicao(quiz_id, desde=desde)
+        resposta['minha_posicao'] = (
+            {'posicao': encontrado[0], 'resultado': resultado_publico(encontrado[1])} if encontrado else None
+        )
+    return resposta
+
+def quiz_nao_encontrado():
+    return jsonify({'erro': 'Quiz não encontrado'}), 404
 
 def carregar_ranking():
-    """Carrega o ranking do arquivo JSON com tratamento de erro"""
+    """Carrega o ranking (via cache) com tratamento de erro"""
     try:
-        if os.path.exists('ranking.json'):
-            with open('ranking.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                logger.info(f"Ranking carregado com {len(data)} registros")
-                return data
-    except (json.JSONDecodeError, IOError) as e:
+        return ranking_cache.obter()
+    except Exception as e:
         logger.error(f"Erro ao carregar ranking: {e}")
     return []
 
 def salvar_ranking(dados):
-    """Salva o ranking no arquivo JSON com tratamento de erro"""
+    """Substitui todo o ranking armazenado com tratamento de erro"""
     try:
-        # Criar backup do arquivo existente
-        if os.path.exists('ranking.json'):
-            import shutil
-            shutil.copy2('ranking.json', 'ranking_backup.json')
-        
-        with open('ranking.json', 'w', encoding='utf-8') as f:
-            json.dump(dados, f, ensure_ascii=False, indent=2)
+        ranking_store.substituir(dados)
+        ranking_cache.invalidar()
         logger.info(f"Ranking salvo com {len(dados)} registros")
-    except IOError as e:
+    except Exception as e:
         logger.error(f"Erro ao salvar ranking: {e}")
         raise
 
+# Headers de segurança de todas as respostas (também usados pelo modo ASGI)
+HEADERS_SEGURANCA = {
+    'Access-Control-Allow-Credentials': 'true',
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'DENY',
+    'X-XSS-Protection': '1; mode=block',
+    'Referrer-Policy': 'strict-origin-when-cross-origin'
+}
+
+def modo_ranking(modo):
+    """Valida o parâmetro ?modo= do ranking ('todos' quando ausente)"""
+    if modo in (None, ''):
+        return 'todos'
+    if modo not in MODOS_RANKING:
+        raise RespostaInvalida('Modo inválido (use todos ou melhores)')
+    return modo
+
+def ranking_json(quiz, accept_encoding, modo='todos'):
+    """(corpo, headers) do ranking completo; a versão gzip é comprimida uma vez por versão do ranking
+
+    No modo 'melhores', a melhor tentativa de cada participante.
+    """
+    if modo == 'melhores':
+        # Corpo e versão gzip memorizados juntos: sempre da mesma versão do ranking
+        corpo, comprimido = quiz.ranking_cache.memorizar('melhores_json', lambda: corpos_melhores(quiz))
+    else:
+        corpo, comprimido = quiz.ranking_cache.obter_json(), None
+    if not COMPRESSAO_MINIMA or len(corpo) < COMPRESSAO_MINIMA:
+        return corpo, {}
+    if not aceita_codificacao(accept_encoding, 'gzip'):
+        return corpo, {'Vary': 'Accept-Encoding'}
+    if comprimido is None:
+        comprimido = quiz.ranking_cache.obter_json_gzip()
+    return comprimido, {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'}
+
+def corpos_melhores(quiz):
+    """(json, json com gzip ou None) do ranking com a melhor tentativa de cada participante"""
+    corpo = app.json.dumps(quiz.ranking_cache.obter_melhores()).encode('utf-8')
+    comprimido = None
+    if COMPRESSAO_MINIMA and len(corpo) >= COMPRESSAO_MINIMA:
+        comprimido = gzip.compress(corpo, compresslevel=COMPRESSAO_NIVEL)
+    return corpo, comprimido
+
+def consultar_participante(quiz, nome):
+    """Tentativas e melhor resultado de um participante (nome comparado sem acentos/maiúsculas)"""
+    nome = (nome or '').strip()
+    if not nome or len(nome) > TAMANHO_MAXIMO_NOME:
+        raise RespostaInvalida('Nome inválido')
+    encontrado = quiz.ranking_cache.obter_participante(nome)
+    if encontrado is None:
+        raise RespostaInvalida('Participante não encontrado', 404)
+    return {'participante': encontrado['melhor'].get('participante'), 'tentativas': encontrado['tentativas'],
+            'melhor': resultado_publico(encontrado['melhor'])}
+
+@app.before_request
+def iniciar_cronometro():
+    g.inicio_requisicao = time.perf_counter()
+
+@app.before_request
+def aplicar_limite():
+    grupo = ROTAS_LIMITADAS.get(request.endpoint)
+    if grupo is None:
+        return None
+    espera = verificar_limite(grupo, ip_cliente(request.remote_addr, request.headers.get('X-Forwarded-For', '')),
+                              session, request.get_json(silent=True) if grupo == 'iniciar' else None)
+    if espera is not None:
+        corpo, headers = resposta_limitada(espera)
+        return jsonify(corpo), 429, headers
+
+def comprimir_json(corpo, accept_encoding):
+    """(corpo, headers): o corpo com gzip se o cliente aceitar e ele for grande o suficiente"""
+    if not COMPRESSAO_MINIMA or len(corpo) < COMPRESSAO_MINIMA:
+        return corpo, {}
+    if not aceita_codificacao(accept_encoding, 'gzip'):
+        return corpo, {'Vary': 'Accept-Encoding'}
+    return (gzip.compress(corpo, compresslevel=COMPRESSAO_NIVEL),
+            {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+
+def comprimir_resposta(response):
+    """Aplica gzip às respostas JSON/HTML já montadas (não às em stream nem às já comprimidas)"""
+    if (response.mimetype not in TIPOS_COMPRIMIVEIS or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return
+    corpo, headers = comprimir_json(response.get_data(), request.headers.get('Accept-Encoding', ''))
+    if 'Content-Encoding' in headers:
+        response.set_data(corpo)
+        # A mesma entidade em outra codificação: o ETag passa a ser fraco
+        etag, fraco = response.get_etag()
+        if etag and not fraco:
+            response.set_etag(etag, weak=True)
+    response.headers.update(headers)
+
 @app.after_request
 def after_request(response):
-    """Adiciona headers de segurança"""
-    response.headers['Access-Control-Allow-Credentials'] = 'true'
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
+    """Adiciona headers de segurança, comprime o corpo e registra a latência da requisição"""
+    response.headers.update(HEADERS_SEGURANCA)
+    comprimir_resposta(response)
+    inicio = g.get('inicio_requisicao')
+    if inicio is not None:
+        duracao = time.perf_counter() - inicio
+        metricas.REQUISICOES.observar(duracao, request.endpoint or 'nenhum',
+                                      request.method, str(response.status_code))
+        if controle_admissao is not None and request.endpoint in ROTAS_EM_ANDAMENTO:
+            amostras = controle_admissao.observar(duracao)
+            if amostras:
+                controle_admissao.reavaliar(amostras)
     return response
 
 @app.route('/')
-def index():
-    return render_template('index_novo.html')
+@app.route('/q/<slug>/')
+def index(slug=None):
+    quiz = obter_quiz(slug)
+    if quiz is None:
+        return render_template('base_novo.html'), 404
+    # Identifica o navegador para o limite de /iniciar_quiz (em vez do IP, compartilhado em redes de eventos)
+    session.setdefault('cliente', uuid.uuid4().hex[:16])
+    return render_template('index_novo.html', quiz=quiz, **urls_do_quiz(slug))
 
 @app.route('/iniciar_quiz', methods=['POST'])
-def iniciar_quiz():
+@app.route('/q/<slug>/iniciar_quiz', methods=['POST'])
+def iniciar_quiz(slug=None):
     try:
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
+        
         data = request.get_json()
         if not data:
             return jsonify({'erro': 'Dados não fornecidos'}), 400
             
         participante = data.get('participante', '').strip()
-        logger.info(f"Tentativa de iniciar quiz: {participante}")
-        
-        if not participante:
-            return jsonify({'erro': 'Nome completo é obrigatório'}), 400
-        
-        # Validar se o nome tem pelo menos nome e sobrenome
-        palavras = participante.split()
-        if len(palavras) < 2:
-            return jsonify({'erro': 'Por favor, informe nome e sobrenome completos'}), 400
-        
-        # Validar se contém apenas letras, espaços e acentos
-        import re
-        if not re.match(r'^[a-zA-ZÀ-ÿ\s]+$', participante):
-            return jsonify({'erro': 'Nome deve conter apenas letras'}), 400
-        
-        # Validar tamanho mínimo e máximo
-        if len(participante) < 5:
-            return jsonify({'erro': 'Nome muito curto'}), 400
-        if len(participante) > 100:
-            return jsonify({'erro': 'Nome muito longo'}), 400
-        
-        # Inicializar sessão
-        session.permanent = True
-        session['participante'] = participante
-        session['pergunta_atual'] = 0
-        session['pontuacao'] = 0
-        session['respostas'] = []
-        session['quiz_id'] = str(uuid.uuid4())
-        session['inicio_quiz'] = datetime.now().isoformat()
-        
-        logger.info(f"Quiz iniciado para: {participante} - ID: {session['quiz_id']}")
+        
+        erro = validar_participante(participante)
+        if erro:
+            logger.debug('Nome recusado quiz=%s motivo=%s', quiz.slug, erro)
+            return jsonify({'erro': erro}), 400
+        
+        quiz_id, fila = admitir_quiz(quiz, data)
+        if fila is not None:
+            corpo, headers = fila
+            return jsonify(corpo), 503, headers
+        
+        iniciar_estado(quiz, participante, quiz_id=quiz_id)
         
         return jsonify({'sucesso': True})
         
@@ -215,137 +978,214 @@ def iniciar_quiz():
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @app.route('/pergunta')
-def obter_pergunta():
+@app.route('/q/<slug>/pergunta')
+def obter_pergunta(slug=None):
     try:
-        if 'participante' not in session:
-            logger.warning("Tentativa de acesso sem sessão válida")
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
+        
+        estado = carregar_estado(quiz)
+        if estado is None:
+            logger.debug('Pergunta solicitada sem sessão válida quiz=%s', quiz.slug)
             return jsonify({'erro': 'Sessão não iniciada'}), 401
         
-        pergunta_atual = session.get('pergunta_atual', 0)
-        logger.info(f"Solicitando pergunta {pergunta_atual + 1} para {session['participante']}")
+        exigir_online(estado)
+        pergunta_atual = estado.pergunta_atual
+        logger.debug('Pergunta solicitada id=%s pergunta=%d', estado.quiz_id, pergunta_atual + 1)
         
-        if pergunta_atual >= len(PERGUNTAS):
+        if pergunta_atual >= len(quiz.catalogo):
             return jsonify({'quiz_finalizado': True})
         
-        pergunta = PERGUNTAS[pergunta_atual].copy()
-        # Remove a resposta correta do retorno
-        pergunta.pop('resposta_correta', None)
-        pergunta['numero'] = pergunta_atual + 1
-        pergunta['total'] = len(PERGUNTAS)
+        # O tempo da pergunta começa a contar quando ela é entregue pela primeira vez;
+        # buscá-la de novo não reinicia o relógio (nem reescreve o cookie)
+        if estado.emitir(relogio()):
+            salvar_estado(estado)
         
-        return jsonify(pergunta)
+        pergunta = quiz.catalogo[pergunta_atual]
+        # Payload já serializado (sem a resposta correta); ETag permite responder 304
+        resposta = app.response_class(pergunta.payload, mimetype='application/json')
+        resposta.set_etag(pergunta.etag)
+        resposta.headers['Cache-Control'] = 'private, no-cache'
+        return resposta.make_conditional(request)
         
+    except RespostaInvalida as e:
+        return jsonify({'erro': str(e)}), e.status
     except Exception as e:
         logger.error(f"Erro ao obter pergunta: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @app.route('/responder', methods=['POST'])
-def responder_pergunta():
+@app.route('/q/<slug>/responder', methods=['POST'])
+def responder_pergunta(slug=None):
     try:
-        if 'participante' not in session:
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
+        
+        estado = carregar_estado(quiz)
+        if estado is None:
             return jsonify({'erro': 'Sessão não iniciada'}), 401
         
         data = request.get_json()
         if not data:
             return jsonify({'erro': 'Dados não fornecidos'}), 400
-            
-        resposta = data.get('resposta')
-        tempo_restante = data.get('tempo_restante', 0)
         
-        # Validar resposta
-        if resposta is None or not isinstance(resposta, int):
-            return jsonify({'erro': 'Resposta inválida'}), 400
+        resultado = corrigir_resposta(quiz, estado, data.get('resposta'))
+        salvar_estado(estado)
         
-        pergunta_atual = session.get('pergunta_atual', 0)
+        return jsonify(resultado)
         
-        if pergunta_atual >= len(PERGUNTAS):
-            return jsonify({'erro': 'Quiz já finalizado'}), 400
+    except RespostaInvalida as e:
+        return jsonify({'erro': str(e)}), e.status
+    except Exception as e:
+        logger.error(f"Erro ao processar resposta: {e}")
+        return jsonify({'erro': 'Erro interno do servidor'}), 500
+
+@app.route('/proximo', methods=['POST'])
+@app.route('/q/<slug>/proximo', methods=['POST'])
+def proximo(slug=None):
+    """Corrige a resposta atual (se enviada) e já devolve a próxima pergunta
+
+    Substitui o par /responder + /pergunta por uma única requisição. O
+    relógio da próxima pergunta começa após ATRASO_EXIBICAO segundos,
+    tempo em que o cliente mostra o resultado da resposta.
+    """
+    try:
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
         
-        pergunta = PERGUNTAS[pergunta_atual]
-        resposta_correta = pergunta['resposta_correta']
-        
-        # Validar índice da resposta
-        if resposta < 0 or resposta >= len(pergunta['alternativas']):
-            return jsonify({'erro': 'Índice de resposta inválido'}), 400
-        
-        acertou = resposta == resposta_correta
-        if acertou:
-            # Pontuação baseada no tempo restante (máximo 100 pontos)
-            pontos = max(10, int(tempo_restante * 1.5))
-            session['pontuacao'] += pontos
-        else:
-            pontos = 0
-        
-        # Salvar resposta
-        session['respostas'].append({
-            'pergunta': pergunta_atual,
-            'resposta_usuario': resposta,
-            'resposta_correta': resposta_correta,
-            'acertou': acertou,
-            'pontos': pontos,
-            'tempo_resposta': 60 - tempo_restante
-        })
+        estado = carregar_estado(quiz)
+        if estado is None:
+            return jsonify({'erro': 'Sessão não iniciada'}), 401
         
-        resultado = {
-            'acertou': acertou,
-            'resposta_correta': resposta_correta,
-            'alternativa_correta': pergunta['alternativas'][resposta_correta],
-            'pontos_ganhos': pontos,
-            'pontuacao_total': session['pontuacao']
-        }
+        resultado, pergunta = avancar_quiz(quiz, estado, request.get_json(silent=True) or {})
+        salvar_estado(estado)
+        
+        if pergunta is None:
+            return jsonify(resultado)
+        return app.response_class(json_com_payload(resultado, 'proxima', pergunta.payload),
+                                  mimetype='application/json')
+        
+    except RespostaInvalida as e:
+        return jsonify({'erro': str(e)}), e.status
+    except Exception as e:
+        logger.error(f"Erro ao avançar no quiz: {e}")
+        return jsonify({'erro': 'Erro interno do servidor'}), 500
+
+@app.route('/catalogo')
+@app.route('/q/<slug>/catalogo')
+def obter_catalogo(slug=None):
+    """Modo offline: todas as perguntas (sem respostas) de uma só vez
+
+    A primeira entrega marca o início no relógio do servidor, que mede o
+    tempo total usado em /submeter_lote, e encerra o modo pergunta a
+    pergunta (/pergunta, /responder e /proximo passam a responder 409).
+    """
+    try:
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
         
-        # Avançar para próxima pergunta
-        session['pergunta_atual'] += 1
+        estado = carregar_estado(quiz)
+        if estado is None:
+            return jsonify({'erro': 'Sessão não iniciada'}), 401
         
-        logger.info(f"Resposta processada para {session['participante']}: P{pergunta_atual + 1} - {'Correto' if acertou else 'Incorreto'}")
+        if estado.entrar_offline(relogio()):
+            salvar_estado(estado)
         
-        return jsonify(resultado)
+        resposta = app.response_class(quiz.catalogo.payload_completo, mimetype='application/json')
+        resposta.set_etag(quiz.catalogo.etag_completo)
+        resposta.headers['Cache-Control'] = 'private, no-cache'
+        return resposta.make_conditional(request)
         
     except Exception as e:
-        logger.error(f"Erro ao processar resposta: {e}")
+        logger.error(f"Erro ao obter catálogo: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
-@app.route('/finalizar_quiz', methods=['POST'])
-def finalizar_quiz():
+@app.route('/submeter_lote', methods=['POST'])
+@app.route('/q/<slug>/submeter_lote', methods=['POST'])
+def submeter_lote(slug=None):
+    """Modo offline: corrige de uma vez todas as respostas restantes
+
+    Espera {"respostas": [{"resposta": int, "tempo_ms": int}, ...]}. A
+    pontuação vem do tempo medido pelo servidor desde /catalogo, dividido
+    igualmente entre as perguntas; um tempo declarado maior que essa parte
+    vale para a pergunta, um menor não (o cliente não concentra o tempo
+    em uma pergunta para pontuar mais nas outras).
+    """
     try:
-        if 'participante' not in session:
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
+        
+        estado = carregar_estado(quiz)
+        if estado is None:
             return jsonify({'erro': 'Sessão não iniciada'}), 401
         
-        # Salvar resultado no ranking
-        ranking = carregar_ranking()
+        data = request.get_json()
+        if not data or not isinstance(data.get('respostas'), list):
+            return jsonify({'erro': 'Dados não fornecidos'}), 400
         
-        resultado = {
-            'participante': session['participante'],
-            'pontuacao': session['pontuacao'],
-            'data_hora': datetime.now().isoformat(),
-            'acertos': sum(1 for r in session['respostas'] if r['acertou']),
-            'total_perguntas': len(PERGUNTAS),
-            'quiz_id': session.get('quiz_id', ''),
-            'duracao_quiz': datetime.now().isoformat()  # Poderia calcular tempo total
-        }
+        respostas = data['respostas']
+        if len(respostas) != len(quiz.catalogo) - estado.pergunta_atual:
+            return jsonify({'erro': 'Quantidade de respostas não corresponde às perguntas restantes'}), 400
+        if not estado.offline or estado.emitida_em is None:
+            return jsonify({'erro': 'Catálogo ainda não foi obtido'}), 409
+        if not respostas:
+            return jsonify({'erro': 'Quiz já finalizado'}), 400
         
-        ranking.append(resultado)
+        limite_ms = quiz.tempo_por_pergunta * 1000
+        declarados = []
+        for item in respostas:
+            tempo_ms = item.get('tempo_ms') if isinstance(item, dict) else None
+            if not isinstance(tempo_ms, (int, float)):
+                return jsonify({'erro': 'Tempo de resposta inválido'}), 400
+            declarados.append(min(max(tempo_ms, 0), limite_ms))
+        # Parte igual do tempo total medido no servidor como mínimo de cada pergunta
+        parte_ms = max(0, (relogio() - estado.emitida_em) * 1000) / len(declarados)
+        latencias = [round(max(parte_ms, declarado)) for declarado in declarados]
         
-        # Ordenar ranking por pontuação (decrescente)
-        ranking.sort(key=lambda x: x['pontuacao'], reverse=True)
+        resultados = [
+            corrigir_resposta(quiz, estado, item.get('resposta'), latencia_ms)
+            for item, latencia_ms in zip(respostas, latencias)
+        ]
+        salvar_estado(estado)
         
-        # Limitar ranking a últimos 100 resultados para evitar arquivo muito grande
-        if len(ranking) > 100:
-            ranking = ranking[:100]
+        return jsonify({
+            'resultados': resultados,
+            'pontuacao_total': estado.pontuacao,
+            'acertos': estado.total_acertos,
+            'quiz_finalizado': True
+        })
         
-        salvar_ranking(ranking)
+    except RespostaInvalida as e:
+        return jsonify({'erro': str(e)}), e.status
+    except Exception as e:
+        logger.error(f"Erro ao corrigir lote de respostas: {e}")
+        return jsonify({'erro': 'Erro interno do servidor'}), 500
+
+@app.route('/finalizar_quiz', methods=['POST'])
+@app.route('/q/<slug>/finalizar_quiz', methods=['POST'])
+def finalizar_quiz(slug=None):
+    try:
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
         
-        logger.info(f"Quiz finalizado para {session['participante']}: {resultado['acertos']}/{resultado['total_perguntas']} - {resultado['pontuacao']} pontos")
+        estado = carregar_estado(quiz)
+        if estado is None:
+            # Repetição de um /finalizar_quiz já concluído (ex.: resposta perdida na rede)
+            anterior = resultado_anterior(quiz)
+            if anterior is not None:
+                return jsonify(anterior)
+            return jsonify({'erro': 'Sessão não iniciada'}), 401
         
-        # Dados para retorno (antes de limpar sessão)
-        resultado_retorno = {
-            'pontuacao_final': resultado['pontuacao'],
-            'acertos': resultado['acertos'],
-            'total_perguntas': resultado['total_perguntas']
-        }
+        resultado_retorno = registrar_resultado(quiz, estado)
         
         # Limpar sessão
-        session.clear()
+        encerrar_estado(estado)
         
         return jsonify(resultado_retorno)
         
@@ -354,19 +1194,173 @@ def finalizar_quiz():
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @app.route('/ranking')
-def ver_ranking():
-    ranking = carregar_ranking()
-    return render_template('ranking_novo.html', ranking=ranking)
+@app.route('/q/<slug>/ranking')
+def ver_ranking(slug=None):
+    quiz = obter_quiz(slug)
+    if quiz is None:
+        return render_template('base_novo.html'), 404
+    # Modo desconhecido na página: mostra o ranking de sempre
+    modo = 'melhores' if request.args.get('modo') == 'melhores' else 'todos'
+    html, etag, comprimido = pagina_ranking(quiz, slug, modo)
+    resposta = app.response_class(html, mimetype='text/html')
+    if comprimido is not None:
+        resposta.vary.add('Accept-Encoding')
+        if aceita_codificacao(request.headers.get('Accept-Encoding', ''), 'gzip'):
+            resposta.set_data(comprimido)
+            resposta.headers['Content-Encoding'] = 'gzip'
+    # Fraco: o mesmo ETag vale para a versão comprimida e a original
+    resposta.set_etag(etag, weak=True)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta.make_conditional(request)
+
+def pagina_ranking(quiz, slug, modo='todos'):
+    """Mesma página para todos os visitantes: renderizada uma vez por versão do ranking (e modo)"""
+    return quiz.ranking_cache.memorizar(('pagina', slug, modo), lambda: renderizar_ranking(quiz, slug, modo))
+
+def arquivos_publicados(quiz, slug):
+    """Conteúdo do snapshot estático do ranking (chamado pela thread do publicador)"""
+    with app.app_context():
+        html, _, _ = pagina_ranking(quiz, slug)
+    return {'ranking.json': quiz.ranking_cache.obter_json(), 'ranking.html': html}
+
+def renderizar_ranking(quiz, slug, modo='todos'):
+    """(html, etag, html com gzip ou None) da página do ranking"""
+    ranking = quiz.ranking_cache.obter_melhores() if modo == 'melhores' else quiz.ranking_cache.obter()
+    html = render_template('ranking_novo.html', ranking=ranking, modo=modo,
+                           estatisticas=quiz.ranking_cache.obter_agregados(), quiz=quiz,
+                           **urls_do_quiz(slug)).encode('utf-8')
+    comprimido = None
+    if COMPRESSAO_MINIMA and len(html) >= COMPRESSAO_MINIMA:
+        comprimido = gzip.compress(html, compresslevel=COMPRESSAO_NIVEL)
+    return html, hashlib.sha256(html).hexdigest()[:20], comprimido
 
 @app.route('/api/ranking')
-def api_ranking():
+@app.route('/api/q/<slug>/ranking')
+def api_ranking(slug=None):
     try:
-        ranking = carregar_ranking()
-        return jsonify(ranking)
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
+        if any(parametro in request.args for parametro in PARAMETROS_PAGINACAO):
+            return jsonify(consultar_ranking(quiz, request.args))
+        corpo, headers = ranking_json(quiz, request.headers.get('Accept-Encoding', ''),
+                                      modo_ranking(request.args.get('modo')))
+        return app.response_class(corpo, mimetype='application/json', headers=headers)
+    except RespostaInvalida as e:
+        return jsonify({'erro': str(e)}), e.status
     except Exception as e:
         logger.error(f"Erro ao obter ranking via API: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
+@app.route('/api/ranking/participante')
+@app.route('/api/q/<slug>/ranking/participante')
+def api_ranking_participante(slug=None):
+    """Tentativas e melhor resultado de um participante, pelo nome (sem acentos/maiúsculas)"""
+    try:
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
+        return jsonify(consultar_participante(quiz, request.args.get('nome')))
+    except RespostaInvalida as e:
+        return jsonify({'erro': str(e)}), e.status
+    except Exception as e:
+        logger.error(f"Erro ao consultar participante do ranking: {e}")
+        return jsonify({'erro': 'Erro interno do servidor'}), 500
+
+@app.route('/api/ranking/stats')
+@app.route('/api/q/<slug>/ranking/stats')
+def api_ranking_stats(slug=None):
+    """Estatísticas acumuladas de todos os resultados (inclusive fora do top-K)"""
+    try:
+        quiz = obter_quiz(slug)
+        if quiz is None:
+            return quiz_nao_encontrado()
+        return jsonify(quiz.ranking_cache.obter_agregados())
+    except Exception as e:
+        logger.error(f"Erro ao obter estatísticas do ranking: {e}")
+        return jsonify({'erro': 'Erro interno do servidor'}), 500
+
+@app.route('/api/ranking/stream')
+@app.route('/api/q/<slug>/ranking/stream')
+def api_ranking_stream(slug=None):
+    """Stream SSE do ranking: um snapshot inicial seguido apenas de deltas"""
+    quiz = obter_quiz(slug)
+    if quiz is None:
+        return quiz_nao_encontrado()
+    transmissor = quiz.transmissor
+    fila, snapshot = transmissor.assinar()
+
+    def eventos():
+        try:
+            yield 'retry: 3000\n\n'
+            yield formatar_evento('snapshot', snapshot)
+            while True:
+                try:
+                    evento = fila.get(timeout=15)
+                except queue.Empty:
+                    # Mantém a conexão viva através de proxies
+                    yield ': ping\n\n'
+                    continue
+                if evento is None:
+                    break
+                yield evento
+        finally:
+            transmissor.cancelar(fila)
+
+    return app.response_class(eventos(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/ranking/cache')
+@app.route('/api/q/<slug>/ranking/cache')
+def api_ranking_cache(slug=None):
+    """Contadores de acerto/falha do cache de ranking (monitoramento)"""
+    quiz = obter_quiz(slug)
+    if quiz is None:
+        return quiz_nao_encontrado()
+    return jsonify(quiz.ranking_cache.estatisticas())
+
+@app.route('/metrics')
+def exportar_metricas():
+    """Métricas deste worker no formato do Prometheus"""
+    if METRICAS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICAS_TOKEN}':
+        return jsonify({'erro': 'Não autorizado'}), 401
+    return app.response_class(metricas.registro.exportar(),
+                              content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/fila')
+@app.route('/q/<slug>/fila')
+def consultar_fila(slug=None):
+    """Consulta leve da sala de espera (sem sessão): posição do ticket e se já pode iniciar"""
+    try:
+        return jsonify(situacao_fila(request.args.get('ticket', '')[:64]))
+    except Exception as e:
+        logger.error(f"Erro ao consultar a fila: {e}")
+        # Na dúvida, libera: /iniciar_quiz decide de novo
+        return jsonify({'posicao': None, 'liberado': True, 'retry_after': 0})
+
+@app.route('/api/quizzes')
+def api_quizzes():
+    """Quizzes disponíveis neste servidor"""
+    return jsonify(banco_quizzes.slugs())
+
+@app.route('/static/<path:arquivo>')
+def arquivo_estatico(arquivo):
+    """CSS/JS pré-comprimidos; pelo nome versionado podem ficar um ano no cache do navegador"""
+    ativo, imutavel = ativos.obter(arquivo)
+    if ativo is None:
+        return '', 404
+    codificacao = ativo.codificacao_para(request.headers.get('Accept-Encoding', ''))
+    resposta = app.response_class(ativo.corpos[codificacao], mimetype=ativo.tipo)
+    if codificacao != 'identity':
+        resposta.headers['Content-Encoding'] = codificacao
+    if len(ativo.corpos) > 1:
+        resposta.vary.add('Accept-Encoding')
+    resposta.headers['Cache-Control'] = CACHE_IMUTAVEL if imutavel else CACHE_REVALIDAR
+    resposta.set_etag(f'{ativo.etag}-{codificacao}')
+    return resposta.make_conditional(request)
+
 # Handlers de erro globais
 @app.errorhandler(404)
 def not_found(error):
@@ -384,7 +1378,7 @@ def handle_exception(e):
 
 if __name__ == '__main__':
     # Configuração para produção
-    import os
+    criar_app()
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
     app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,1168 @@
+"""
+Backends de armazenamento do ranking do Quiz
+
+O ranking era um único arquivo JSON reescrito por inteiro a cada quiz
+finalizado. Este módulo isola a persistência atrás de uma interface comum
+para que vários workers do gunicorn possam gravar resultados ao mesmo tempo
+sem perder registros.
+"""
+
+import atexit
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import historico
+from agregados import Agregados
+from participantes import IndiceParticipantes, normalizar_nome
+from placar import SEM_DURACAO, Placar, chave_ordenacao, duracao
+
+try:
+    import fcntl
+except ImportError:  # Windows (desenvolvimento local)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de registros exibidos no ranking (top-K)
+LIMITE_RANKING = int(os.environ.get('RANKING_TOP_K', 100))
+
+# Mesma ordem de Placar/chave_ordenacao, expressa em SQL
+ORDEM_SQL = 'pontuacao DESC, acertos DESC, duracao_segundos, data_hora, id'
+
+# Colunas da ordem acima e o operador que significa "vem depois" em cada uma (paginação por cursor)
+COLUNAS_CURSOR = (('pontuacao', '<'), ('acertos', '<'), ('duracao_segundos', '>'),
+                  ("COALESCE(data_hora, '')", '>'), ('id', '>'))
+
+
+def condicao_cursor(valores, depois=True):
+    """WHERE de keyset: linhas depois (ou antes) da posição `valores` na ordem do ranking"""
+    inverso = {'<': '>', '>': '<'}
+    sql, parametros = None, []
+    # Monta de dentro para fora: a OR (a = ? AND (b ...))
+    for (coluna, operador), valor in reversed(list(zip(COLUNAS_CURSOR, valores))):
+        operador = operador if depois else inverso[operador]
+        if sql is None:
+            sql, parametros = f'{coluna} {operador} ?', [valor]
+        else:
+            sql = f'({coluna} {operador} ? OR ({coluna} = ? AND {sql}))'
+            parametros = [valor, valor] + parametros
+    return sql, parametros
+
+
+def _validar_cursor(cursor, tipos):
+    """Confere o formato de um cursor vindo do cliente; ValueError se inválido"""
+    if (not isinstance(cursor, list) or len(cursor) != len(tipos)
+            or not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(cursor, tipos))):
+        raise ValueError('Cursor inválido')
+    return cursor
+
+
+class RankingStore:
+    """Interface comum dos backends de ranking"""
+
+    def adicionar(self, resultado):
+        """Grava um novo resultado de forma atômica
+
+        Retorna False (sem gravar nada) quando já existe um resultado com o
+        mesmo quiz_id: repetições de /finalizar_quiz não duplicam o ranking.
+        """
+        raise NotImplementedError
+
+    def adicionar_lote(self, resultados):
+        """Grava vários resultados (repetições ignoradas) e retorna quantos foram gravados"""
+        return sum(1 for resultado in resultados if self.adicionar(resultado))
+
+    def buscar(self, quiz_id):
+        """Resultado gravado para o quiz_id, ou None"""
+        for resultado in self.listar(limite=None):
+            if resultado.get('quiz_id') == quiz_id:
+                return resultado
+        return None
+
+    def listar(self, limite=LIMITE_RANKING):
+        """Retorna os resultados ordenados por pontuação (decrescente)"""
+        raise NotImplementedError
+
+    def substituir(self, dados):
+        """Substitui todo o conteúdo do ranking (uso administrativo)"""
+        raise NotImplementedError
+
+    def versao(self):
+        """Token que muda sempre que o conteúdo do ranking muda"""
+        raise NotImplementedError
+
+    def carregar_placar(self, k=LIMITE_RANKING):
+        """Retorna (top-K ordenado, cursor) para leituras incrementais"""
+        return self.listar(k), None
+
+    def alteracoes_desde(self, cursor):
+        """Resultados gravados depois do cursor, como (novos, novo_cursor)
+
+        Retorna None quando o backend não suporta leitura incremental ou o
+        ranking foi substituído; nesse caso o placar deve ser recarregado.
+        """
+        return None
+
+    def agregados(self):
+        """Estatísticas acumuladas (Agregados) de todos os resultados gravados"""
+        return Agregados.de_resultados(self.listar(limite=None))
+
+    # Se participante() é uma consulta barata (por índice) a cada chamada; senão o índice inteiro é lido
+    consulta_participante_indexada = False
+
+    def participantes(self):
+        """Índice (IndiceParticipantes) de todos os resultados gravados, pelo nome normalizado"""
+        return IndiceParticipantes.de_resultados(self.listar(limite=None))
+
+    def participante(self, nome):
+        """{'tentativas', 'melhor'} do participante (nome comparado sem acentos/maiúsculas), ou None"""
+        return self.participantes().obter(nome)
+
+    def melhores(self, k=LIMITE_RANKING):
+        """Ranking com a melhor tentativa de cada participante (top-K)"""
+        return self.participantes().melhores(k)
+
+    # Se pagina/posicao enxergam todos os resultados gravados (o JSON guarda só o top-K)
+    historico_completo = True
+
+    def pagina(self, limite, apos=None, desde=None):
+        """Página do ranking ordenado: (resultados, cursor da próxima página ou None)
+
+        `apos` é o cursor devolvido pela página anterior e `desde` restringe
+        a resultados com data_hora a partir desse instante (ISO 8601). Esta
+        implementação percorre o ranking inteiro; o SQLite usa o índice.
+
+        O cursor é a chave de ordenação do último item mais quantos itens
+        com essa mesma chave já foram entregues: empates na chave caem na
+        ordem estável da listagem e nenhum fica de fora na troca de página.
+        """
+        chave_apos, entregues = None, 0
+        if apos is not None:
+            _validar_cursor(apos, ((int, float),) * 3 + (str, int))
+            chave_apos, entregues = tuple(apos[:4]), apos[4]
+        itens, posicoes = [], []
+        anterior, empates = None, 0
+        for resultado in self.listar(limite=None):
+            if desde and (resultado.get('data_hora') or '') < desde:
+                continue
+            chave = chave_ordenacao(resultado)
+            empates = empates + 1 if chave == anterior else 1
+            anterior = chave
+            if chave_apos is not None and (chave < chave_apos or (chave == chave_apos and empates <= entregues)):
+                continue
+            itens.append(resultado)
+            posicoes.append((chave, empates))
+            if len(itens) > limite:
+                break
+        if len(itens) > limite:
+            chave, empates = posicoes[limite - 1]
+            return itens[:limite], list(chave) + [empates]
+        return itens, None
+
+    def posicao(self, quiz_id, desde=None):
+        """(posição, resultado) do quiz_id no ranking (1 = primeiro), ou None"""
+        posicao = 0
+        for resultado in self.listar(limite=None):
+            if desde and (resultado.get('data_hora') or '') < desde:
+                continue
+            posicao += 1
+            if resultado.get('quiz_id') == quiz_id:
+                return posicao, resultado
+        return None
+
+
+class BancoSQLite:
+    """Conexão SQLite (WAL) por thread, com transações de escrita explícitas"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+
+    def _conexao(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: as transações são controladas explicitamente
+            conn = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transacao(self):
+        """Transação de escrita (BEGIN IMMEDIATE evita deadlock entre workers)"""
+        conn = self._conexao()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+
+class SQLiteRankingStore(BancoSQLite, RankingStore):
+    """Ranking em SQLite (modo WAL) compartilhado entre os workers
+
+    Cada resultado é uma linha; gravar um quiz insere apenas essa linha
+    dentro de uma transação, em vez de reescrever o ranking inteiro.
+    """
+
+    def __init__(self, caminho='ranking.db', importar_de=None):
+        super().__init__(caminho)
+        self._criar_esquema(importar_de)
+
+    def _criar_esquema(self, importar_de):
+        with self._transacao() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS resultados (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    quiz_id TEXT,
+                    participante TEXT,
+                    pontuacao INTEGER NOT NULL DEFAULT 0,
+                    acertos INTEGER NOT NULL DEFAULT 0,
+                    data_hora TEXT,
+                    dados TEXT NOT NULL
+                )
+            ''')
+            self._garantir_coluna(conn, 'resultados', 'duracao_segundos', f'REAL NOT NULL DEFAULT {SEM_DURACAO}')
+            conn.execute('DROP INDEX IF EXISTS idx_resultados_ordem')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_resultados_classificacao
+                ON resultados (pontuacao DESC, acertos DESC, duracao_segundos, data_hora, id)
+            ''')
+            # Janelas de tempo (?janela=hoje) e consulta da posição por quiz_id
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_resultados_data_hora ON resultados (data_hora)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_resultados_quiz_id ON resultados (quiz_id)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ranking_meta (
+                    chave TEXT PRIMARY KEY,
+                    valor INTEGER NOT NULL
+                )
+            ''')
+            conn.execute("INSERT OR IGNORE INTO ranking_meta (chave, valor) VALUES ('versao', 0)")
+            # 'geracao' muda apenas quando o ranking é substituído por inteiro
+            conn.execute("INSERT OR IGNORE INTO ranking_meta (chave, valor) VALUES ('geracao', 0)")
+            # Estatísticas acumuladas, atualizadas na mesma transação de cada gravação
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ranking_agregados (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    dados TEXT NOT NULL
+                )
+            ''')
+            # Índice de participantes (nome normalizado): tentativas e melhor resultado de cada um
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS participantes (
+                    nome TEXT PRIMARY KEY,
+                    tentativas INTEGER NOT NULL,
+                    melhor_id INTEGER NOT NULL,
+                    pontuacao INTEGER NOT NULL,
+                    acertos INTEGER NOT NULL,
+                    duracao_segundos REAL NOT NULL,
+                    data_hora TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_participantes_classificacao
+                ON participantes (pontuacao DESC, acertos DESC, duracao_segundos, data_hora, melhor_id)
+            ''')
+
+            # Migração do ranking.json legado na primeira execução
+            vazio = conn.execute('SELECT 1 FROM resultados LIMIT 1').fetchone() is None
+            if vazio and importar_de and os.path.exists(importar_de):
+                dados = JSONRankingStore(importar_de).listar(limite=None)
+                for resultado in dados:
+                    self._inserir(conn, resultado)
+                self._incrementar_versao(conn)
+                logger.info(f"Ranking legado importado de {importar_de}: {len(dados)} registros")
+
+            # Bancos de versões anteriores: calcula as estatísticas uma única vez
+            if conn.execute('SELECT 1 FROM ranking_agregados').fetchone() is None:
+                linhas = conn.execute('SELECT dados FROM resultados ORDER BY id').fetchall()
+                self._gravar_agregados(conn, Agregados.de_resultados(json.loads(d) for (d,) in linhas))
+            # Idem para o índice de participantes
+            if conn.execute('SELECT 1 FROM participantes LIMIT 1').fetchone() is None:
+                for id_resultado, dados in conn.execute('SELECT id, dados FROM resultados ORDER BY id').fetchall():
+                    self._registrar_participante(conn, json.loads(dados), id_resultado)
+
+    @staticmethod
+    def _garantir_coluna(conn, tabela, coluna, definicao):
+        """Migração simples: adiciona a coluna em bancos criados por versões anteriores"""
+        colunas = {linha[1] for linha in conn.execute(f'PRAGMA table_info({tabela})')}
+        if coluna not in colunas:
+            conn.execute(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}')
+
+    @staticmethod
+    def _inserir(conn, resultado):
+        """Insere o resultado e retorna o id da linha"""
+        return conn.execute(
+            'INSERT INTO resultados (quiz_id, participante, pontuacao, acertos, duracao_segundos, data_hora, dados) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (
+                resultado.get('quiz_id'),
+                resultado.get('participante'),
+                resultado.get('pontuacao', 0),
+                resultado.get('acertos', 0),
+                duracao(resultado),
+                resultado.get('data_hora'),
+                json.dumps(resultado, ensure_ascii=False),
+            )
+        ).lastrowid
+
+    @staticmethod
+    def _incrementar_versao(conn):
+        conn.execute("UPDATE ranking_meta SET valor = valor + 1 WHERE chave = 'versao'")
+
+    @staticmethod
+    def _ler_agregados(conn):
+        linha = conn.execute('SELECT dados FROM ranking_agregados WHERE id = 1').fetchone()
+        return Agregados(json.loads(linha[0]) if linha else None)
+
+    @staticmethod
+    def _gravar_agregados(conn, agregados):
+        conn.execute(
+            'INSERT INTO ranking_agregados (id, dados) VALUES (1, ?) '
+            'ON CONFLICT (id) DO UPDATE SET dados = excluded.dados',
+            (json.dumps(agregados.para_dict()),)
+        )
+
+    @staticmethod
+    def _registrar_participante(conn, resultado, id_resultado):
+        """Conta a tentativa no índice de participantes e troca o melhor resultado, se este for melhor"""
+        nome = normalizar_nome(resultado.get('participante'))
+        atual = conn.execute(
+            "SELECT -pontuacao, -acertos, duracao_segundos, COALESCE(data_hora, '') FROM participantes WHERE nome = ?",
+            (nome,)
+        ).fetchone()
+        if atual is not None and chave_ordenacao(resultado) >= tuple(atual):
+            conn.execute('UPDATE participantes SET tentativas = tentativas + 1 WHERE nome = ?', (nome,))
+            return
+        conn.execute(
+            'INSERT INTO participantes (nome, tentativas, melhor_id, pontuacao, acertos, duracao_segundos, data_hora) '
+            'VALUES (?, 1, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (nome) DO UPDATE SET tentativas = tentativas + 1, melhor_id = excluded.melhor_id, '
+            'pontuacao = excluded.pontuacao, acertos = excluded.acertos, '
+            'duracao_segundos = excluded.duracao_segundos, data_hora = excluded.data_hora',
+            (nome, id_resultado, resultado.get('pontuacao', 0), resultado.get('acertos', 0),
+             duracao(resultado), resultado.get('data_hora'))
+        )
+
+    def adicionar(self, resultado):
+        return self.adicionar_lote((resultado,)) == 1
+
+    def adicionar_lote(self, resultados):
+        # Uma transação para o lote inteiro: um único commit (e fsync do WAL) para N resultados
+        with self._transacao() as conn:
+            agregados = None
+            gravados = 0
+            for resultado in resultados:
+                # A transação de escrita (BEGIN IMMEDIATE) torna a verificação e a inserção atômicas entre workers
+                quiz_id = resultado.get('quiz_id')
+                if quiz_id and conn.execute('SELECT 1 FROM resultados WHERE quiz_id = ? LIMIT 1',
+                                            (quiz_id,)).fetchone():
+                    continue
+                self._registrar_participante(conn, resultado, self._inserir(conn, resultado))
+                if agregados is None:
+                    agregados = self._ler_agregados(conn)
+                agregados.adicionar(resultado)
+                gravados += 1
+            if gravados:
+                self._gravar_agregados(conn, agregados)
+                self._incrementar_versao(conn)
+        return gravados
+
+    def buscar(self, quiz_id):
+        linha = self._conexao().execute(
+            'SELECT dados FROM resultados WHERE quiz_id = ? ORDER BY id LIMIT 1', (quiz_id,)
+        ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def listar(self, limite=LIMITE_RANKING):
+        sql = f'SELECT dados FROM resultados ORDER BY {ORDEM_SQL}'
+        parametros = ()
+        if limite is not None:
+            sql += ' LIMIT ?'
+            parametros = (limite,)
+        linhas = self._conexao().execute(sql, parametros).fetchall()
+        return [json.loads(dados) for (dados,) in linhas]
+
+    def pagina(self, limite, apos=None, desde=None):
+        condicoes, parametros = [], []
+        if apos is not None:
+            _validar_cursor(apos, (int, int, (int, float), str, int))
+            # O primeiro termo permite ao SQLite começar a leitura do índice já na posição do cursor
+            sql, valores = condicao_cursor(apos)
+            condicoes.append(f'pontuacao <= ? AND {sql}')
+            parametros += [apos[0]] + valores
+        if desde:
+            condicoes.append('data_hora >= ?')
+            parametros.append(desde)
+        where = f"WHERE {' AND '.join(condicoes)} " if condicoes else ''
+        linhas = self._conexao().execute(
+            f"SELECT pontuacao, acertos, duracao_segundos, COALESCE(data_hora, ''), id, dados "
+            f'FROM resultados {where}ORDER BY {ORDEM_SQL} LIMIT ?',
+            parametros + [limite + 1]
+        ).fetchall()
+        itens = [json.loads(linha[5]) for linha in linhas[:limite]]
+        proximo = list(linhas[limite - 1][:5]) if len(linhas) > limite else None
+        return itens, proximo
+
+    def posicao(self, quiz_id, desde=None):
+        conn = self._conexao()
+        # Leitura consistente: o resultado e a contagem de quem está à frente
+        conn.execute('BEGIN')
+        try:
+            linha = conn.execute(
+                "SELECT pontuacao, acertos, duracao_segundos, COALESCE(data_hora, ''), id, dados "
+                'FROM resultados WHERE quiz_id = ? ORDER BY id LIMIT 1',
+                (quiz_id,)
+            ).fetchone()
+            if linha is None or (desde and linha[3] < desde):
+                return None
+            sql, parametros = condicao_cursor(linha[:5], depois=False)
+            sql = f'pontuacao >= ? AND {sql}'
+            parametros = [linha[0]] + parametros
+            if desde:
+                sql += ' AND data_hora >= ?'
+                parametros.append(desde)
+            a_frente = conn.execute(f'SELECT COUNT(*) FROM resultados WHERE {sql}', parametros).fetchone()[0]
+        finally:
+            conn.execute('COMMIT')
+        return a_frente + 1, json.loads(linha[5])
+
+    def substituir(self, dados):
+        with self._transacao() as conn:
+            conn.execute('DELETE FROM resultados')
+            conn.execute('DELETE FROM participantes')
+            for resultado in dados:
+                self._registrar_participante(conn, resultado, self._inserir(conn, resultado))
+            self._gravar_agregados(conn, Agregados.de_resultados(dados))
+            self._incrementar_versao(conn)
+            conn.execute("UPDATE ranking_meta SET valor = valor + 1 WHERE chave = 'geracao'")
+
+    def agregados(self):
+        return self._ler_agregados(self._conexao())
+
+    consulta_participante_indexada = True
+
+    def participante(self, nome):
+        # Chave primária do índice + o melhor resultado pelo id
+        linha = self._conexao().execute(
+            'SELECT p.tentativas, r.dados FROM participantes p JOIN resultados r ON r.id = p.melhor_id '
+            'WHERE p.nome = ?',
+            (normalizar_nome(nome),)
+        ).fetchone()
+        return {'tentativas': linha[0], 'melhor': json.loads(linha[1])} if linha else None
+
+    def melhores(self, k=LIMITE_RANKING):
+        linhas = self._conexao().execute(
+            'SELECT r.dados FROM participantes p JOIN resultados r ON r.id = p.melhor_id '
+            'ORDER BY p.pontuacao DESC, p.acertos DESC, p.duracao_segundos, p.data_hora, p.melhor_id LIMIT ?',
+            (k,)
+        ).fetchall()
+        return [json.loads(dados) for (dados,) in linhas]
+
+    def participantes(self):
+        linhas = self._conexao().execute(
+            'SELECT p.nome, p.tentativas, r.dados FROM participantes p JOIN resultados r ON r.id = p.melhor_id'
+        ).fetchall()
+        return IndiceParticipantes({
+            nome: {'tentativas': tentativas, 'melhor': json.loads(dados)} for nome, tentativas, dados in linhas
+        })
+
+    def versao(self):
+        linha = self._conexao().execute(
+            "SELECT valor FROM ranking_meta WHERE chave = 'versao'"
+        ).fetchone()
+        return linha[0] if linha else 0
+
+    def _cursor_atual(self, conn):
+        geracao = conn.execute("SELECT valor FROM ranking_meta WHERE chave = 'geracao'").fetchone()[0]
+        ultimo_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM resultados').fetchone()[0]
+        return (geracao, ultimo_id)
+
+    def carregar_placar(self, k=LIMITE_RANKING):
+        conn = self._conexao()
+        # Leitura consistente: top-K e cursor do mesmo snapshot
+        conn.execute('BEGIN')
+        try:
+            itens = self.listar(k)
+            cursor = self._cursor_atual(conn)
+        finally:
+            conn.execute('COMMIT')
+        return itens, cursor
+
+    def alteracoes_desde(self, cursor):
+        if cursor is None:
+            return None
+        conn = self._conexao()
+        conn.execute('BEGIN')
+        try:
+            atual = self._cursor_atual(conn)
+            if atual[0] != cursor[0]:
+                return None
+            linhas = conn.execute(
+                'SELECT dados FROM resultados WHERE id > ? AND id <= ? ORDER BY id',
+                (cursor[1], atual[1])
+            ).fetchall()
+        finally:
+            conn.execute('COMMIT')
+        return [json.loads(dados) for (dados,) in linhas], atual
+
+
+class _IndiceAcompanhado:
+    """Índice de participantes em memória, atualizado pelo fim de um log de resultados
+
+    Parte do índice persistido (`ler_base()` -> (dados, offset)) uma única
+    vez e, a cada consulta, aplica só as linhas acrescentadas ao log desde a
+    anterior (escritas de todos os workers), em vez de reler o índice
+    inteiro a cada versão nova do ranking.
+    """
+
+    def __init__(self, log, ler_base):
+        self.log = log
+        self.ler_base = ler_base
+        self._lock = threading.Lock()
+        self._indice = None
+        self._offset = 0
+        self._identidade = None
+
+    def _atualizar(self):
+        # Um log substituído (rename) ganha novo inode: o índice é recarregado
+        try:
+            identidade = os.stat(self.log.caminho).st_ino
+        except OSError:
+            identidade = None
+        if self._indice is None or identidade != self._identidade or self._offset > self.log.tamanho():
+            dados, offset = self.ler_base()
+            if offset > self.log.tamanho():
+                # Base de outro log (ex.: log apagado): recalcula do início
+                dados, offset = None, 0
+            self._indice, self._offset, self._identidade = IndiceParticipantes(dados), offset, identidade
+        for registro, self._offset in self.log.ler(self._offset):
+            self._indice.adicionar(registro)
+
+    def consultar(self, funcao):
+        """Resultado de `funcao(indice)` sobre o índice atualizado (o índice não deve escapar)"""
+        with self._lock:
+            self._atualizar()
+            return funcao(self._indice)
+
+    def persistir(self, gravar):
+        """Chama `gravar(dados, offset)` com o índice atualizado até o fim do log"""
+        with self._lock:
+            self._atualizar()
+            gravar(self._indice.para_dict(), self._offset)
+
+
+class ParticipantesAcompanhados:
+    """Consultas de participantes sobre um `_IndiceAcompanhado` (atributo `_participantes`)"""
+
+    consulta_participante_indexada = True
+
+    def participantes(self):
+        return self._participantes.consultar(lambda indice: IndiceParticipantes(indice.para_dict()))
+
+    def participante(self, nome):
+        return self._participantes.consultar(lambda indice: indice.obter(nome))
+
+    def melhores(self, k=LIMITE_RANKING):
+        return self._participantes.consultar(lambda indice: indice.melhores(k))
+
+
+class JSONRankingStore(ParticipantesAcompanhados, RankingStore):
+    """Adaptador legado: ranking completo em um arquivo JSON
+
+    Mantido para compatibilidade. As escritas são serializadas com um lock
+    de arquivo entre processos (quando disponível), mas continuam
+    reescrevendo o arquivo inteiro a cada resultado (de forma atômica, via
+    arquivo temporário + rename). O índice de participantes não é reescrito:
+    cada resultado é acrescentado a um log, e a base `*_participantes.json`
+    é regravada a cada `COMPACTAR_PARTICIPANTES_A_CADA` resultados.
+    """
+
+    # Resultados acrescentados ao log de participantes (por worker) entre duas gravações da base
+    COMPACTAR_PARTICIPANTES_A_CADA = 1000
+
+    # pagina/posicao (da interface comum) percorrem só o top-K do arquivo
+    historico_completo = False
+
+    def __init__(self, caminho='ranking.json', backup='ranking_backup.json', limite=LIMITE_RANKING):
+        self.caminho = caminho
+        self.backup = backup
+        self.limite = limite
+        # O arquivo guarda só o top-K; as estatísticas de todos os resultados ficam ao lado
+        self.caminho_agregados = os.path.splitext(caminho)[0] + '_agregados.json'
+        self.caminho_participantes = os.path.splitext(caminho)[0] + '_participantes.json'
+        self.log_participantes = historico.LogAppend(os.path.splitext(caminho)[0] + '_participantes.log',
+                                                     fsync_a_cada=1)
+        self._participantes = _IndiceAcompanhado(self.log_participantes, self._ler_base_participantes)
+        self._desde_compactacao = 0
+        # Todos os quiz_ids já gravados, um por linha (só acrescentado) com o resumo do resultado:
+        # ignora repetições e permite buscar resultados que já saíram do top-K
+        self.caminho_quiz_ids = os.path.splitext(caminho)[0] + '_quiz_ids.txt'
+        self._quiz_ids = {}
+        self._offset_ids = 0
+        self._identidade_ids = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _bloqueio(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.caminho + '.lock', 'a') as arquivo_lock:
+                fcntl.flock(arquivo_lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(arquivo_lock, fcntl.LOCK_UN)
+
+    def _ler(self):
+        try:
+            if os.path.exists(self.caminho):
+                with open(self.caminho, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Erro ao carregar ranking: {e}")
+        return []
+
+    def _gravar(self, dados):
+        conteudo = json.dumps(dados, ensure_ascii=False, indent=2).encode('utf-8')
+        # Backup do arquivo existente: um hard link preserva a versão anterior sem copiá-la
+        if os.path.exists(self.caminho):
+            temporario = f'{self.backup}.{os.getpid()}.tmp'
+            try:
+                os.link(self.caminho, temporario)
+                os.replace(temporario, self.backup)
+            except OSError:
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+                shutil.copy2(self.caminho, self.backup)
+        # Temporário + rename: leitores (outros workers, o cache) nunca veem o arquivo pela metade
+        historico.gravar_atomico(self.caminho, conteudo)
+
+    def _ler_agregados(self, ranking=None):
+        try:
+            with open(self.caminho_agregados, 'r', encoding='utf-8') as f:
+                return Agregados(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Erro ao carregar estatísticas do ranking: {e}")
+        # Ranking de versões anteriores: parte dos resultados ainda presentes no arquivo
+        return Agregados.de_resultados(self._ler() if ranking is None else ranking)
+
+    def _gravar_agregados(self, agregados):
+        historico.gravar_atomico(self.caminho_agregados, json.dumps(agregados.para_dict()).encode('utf-8'))
+
+    def _ler_base_participantes(self, ranking=None):
+        """(índice persistido, offset do log de participantes a partir do qual aplicar)"""
+        dados = None
+        try:
+            with open(self.caminho_participantes, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Erro ao carregar índice de participantes: {e}")
+        if isinstance(dados, dict) and isinstance(dados.get('offset'), int):
+            if dados['offset'] <= self.log_participantes.tamanho():
+                return dados.get('participantes'), dados['offset']
+            # Base além do fim do log (substituir interrompido): vale o que está no ranking
+            dados = None
+        if dados is None:
+            # Ranking de versões anteriores: parte dos resultados ainda presentes no arquivo
+            return IndiceParticipantes.de_resultados(self._ler() if ranking is None else ranking).para_dict(), 0
+        # Formato anterior: o índice completo, ainda sem log
+        return dados, 0
+
+    def _gravar_base_participantes(self, participantes, offset):
+        conteudo = json.dumps({'offset': offset, 'participantes': participantes}, ensure_ascii=False)
+        historico.gravar_atomico(self.caminho_participantes, conteudo.encode('utf-8'))
+
+    def _registrar_participantes(self, novos, ranking):
+        # Chamado com o lock: nenhum outro worker acrescenta ao log entre a leitura e a gravação da base
+        if not os.path.exists(self.log_participantes.caminho):
+            # Primeira gravação (ou índice de versões anteriores): o índice atual vira a base do log
+            self._gravar_base_participantes(self._ler_base_participantes(ranking)[0], 0)
+        self.log_participantes.registrar_lote(novos)
+        self._desde_compactacao += len(novos)
+        if self._desde_compactacao >= self.COMPACTAR_PARTICIPANTES_A_CADA:
+            self._participantes.persistir(self._gravar_base_participantes)
+            self._desde_compactacao = 0
+
+    # Campos do resultado guardados no arquivo de quiz_ids (o bastante para repetir /finalizar_quiz)
+    CAMPOS_RESUMO = ('quiz_id', 'participante', 'pontuacao', 'acertos', 'total_perguntas', 'data_hora',
+                     'duracao_segundos')
+
+    def _atualizar_quiz_ids(self, ranking=None):
+        """Lê só as linhas do arquivo de quiz_ids acrescentadas desde a última leitura
+
+        Chamado com `self._lock`. Sem o arquivo (ranking de versões
+        anteriores), ele é criado a partir de `ranking`, o que exige também
+        o lock de arquivo; sem `ranking`, nada é lido.
+        """
+        try:
+            st = os.stat(self.caminho_quiz_ids)
+        except FileNotFoundError:
+            if ranking is None:
+                return
+            # Ranking de versões anteriores: só os quiz_ids do top-K são conhecidos
+            self._gravar_quiz_ids(ranking)
+            st = os.stat(self.caminho_quiz_ids)
+        if st.st_ino != self._identidade_ids or st.st_size < self._offset_ids:
+            # Arquivo substituído (substituir): recomeça do início
+            self._quiz_ids, self._offset_ids, self._identidade_ids = {}, 0, st.st_ino
+        with open(self.caminho_quiz_ids, 'rb') as f:
+            f.seek(self._offset_ids)
+            trecho = f.read()
+        # Só linhas completas; um trecho sem quebra de linha fica para a próxima leitura
+        fim = trecho.rfind(b'\n') + 1
+        for linha in trecho[:fim].split(b'\n'):
+            if linha:
+                # "quiz_id<TAB>resumo JSON" (linhas de versões anteriores têm só o quiz_id)
+                quiz_id, _, resumo = linha.decode('utf-8').partition('\t')
+                self._quiz_ids[quiz_id] = resumo or None
+        self._offset_ids += fim
+
+    def _linhas_quiz_ids(self, resultados):
+        linhas = []
+        for resultado in resultados:
+            if resultado.get('quiz_id'):
+                resumo = {campo: resultado[campo] for campo in self.CAMPOS_RESUMO if campo in resultado}
+                linhas.append(f"{resultado['quiz_id']}\t{json.dumps(resumo, ensure_ascii=False)}\n")
+        return ''.join(linhas).encode('utf-8')
+
+    def _gravar_quiz_ids(self, resultados):
+        historico.gravar_atomico(self.caminho_quiz_ids, self._linhas_quiz_ids(resultados))
+
+    def _acrescentar_quiz_ids(self, resultados):
+        with open(self.caminho_quiz_ids, 'ab') as f:
+            f.write(self._linhas_quiz_ids(resultados))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def buscar(self, quiz_id):
+        """Resultado completo, se ainda estiver no top-K; senão o resumo guardado com o quiz_id"""
+        for resultado in self._ler():
+            if resultado.get('quiz_id') == quiz_id:
+                return resultado
+        with self._lock:
+            self._atualizar_quiz_ids()
+            resumo = self._quiz_ids.get(quiz_id)
+        return json.loads(resumo) if resumo else None
+
+    def adicionar(self, resultado):
+        return self.adicionar_lote((resultado,)) == 1
+
+    def adicionar_lote(self, resultados):
+        # Uma leitura e uma reescrita do arquivo para o lote inteiro
+        with self._bloqueio():
+            ranking = self._ler()
+            # O arquivo guarda só o top-K; a verificação usa os quiz_ids de todos os resultados
+            self._atualizar_quiz_ids(ranking)
+            novos, ids = [], set()
+            for resultado in resultados:
+                quiz_id = resultado.get('quiz_id')
+                if quiz_id and (quiz_id in self._quiz_ids or quiz_id in ids):
+                    continue
+                ids.add(quiz_id)
+                novos.append(resultado)
+            if not novos:
+                return 0
+
+            # Gravadas antes do ranking: quando a versão (mtime) muda, já estão atualizadas
+            agregados = self._ler_agregados(ranking)
+            placar = Placar(self.limite, ranking)
+            for resultado in novos:
+                agregados.adicionar(resultado)
+                placar.inserir(resultado)
+            self._gravar_agregados(agregados)
+            self._registrar_participantes(novos, ranking)
+            # Como as estatísticas: registrado antes do ranking, uma regravação após queda não conta duas vezes
+            self._acrescentar_quiz_ids(novos)
+            self._gravar(placar.itens())
+        return len(novos)
+
+    def listar(self, limite=LIMITE_RANKING):
+        ranking = self._ler()
+        return ranking if limite is None else ranking[:limite]
+
+    def substituir(self, dados):
+        with self._bloqueio():
+            self._gravar_agregados(Agregados.de_resultados(dados))
+            # Log vazio antes da base: uma queda no meio deixa a base antiga apontando além do
+            # fim do log, e o índice é recalculado do ranking em vez de contar o log duas vezes
+            self.log_participantes.fechar()
+            historico.gravar_atomico(self.log_participantes.caminho, b'')
+            self._gravar_base_participantes(IndiceParticipantes.de_resultados(dados).para_dict(), 0)
+            self._desde_compactacao = 0
+            self._gravar_quiz_ids(dados)
+            # O arquivo fica sempre na ordem do ranking (listar e pagina dependem disso)
+            self._gravar(sorted(dados, key=chave_ordenacao))
+
+    def agregados(self):
+        return self._ler_agregados()
+
+    def versao(self):
+        try:
+            st = os.stat(self.caminho)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+
+class LogRankingStore(ParticipantesAcompanhados, RankingStore):
+    """Ranking sobre um log append-only de resultados (histórico completo)
+
+    Gravar um resultado é apenas acrescentar uma linha ao log. As leituras
+    partem do último snapshot compactado e aplicam só o trecho novo do log;
+    uma thread em segundo plano (ou `python historico.py compactar`)
+    atualiza o snapshot periodicamente.
+    """
+
+    def __init__(self, caminho_log='resultados.log', caminho_snapshot='ranking_snapshot.json',
+                 limite=LIMITE_RANKING, fsync_a_cada=50, fsync_intervalo=1.0, compactar_a_cada=None):
+        self.log = historico.LogAppend(caminho_log, fsync_a_cada, fsync_intervalo)
+        self.caminho_snapshot = caminho_snapshot
+        self.limite = limite
+        # Todos os quiz_ids do log (deste e dos outros workers), para ignorar repetições
+        self._lock = threading.Lock()
+        self._quiz_ids = set()
+        self._offset_ids = None
+        self._identidade_ids = None
+        self._participantes = _IndiceAcompanhado(self.log, self._ler_base_participantes)
+        if compactar_a_cada:
+            threading.Thread(target=self._compactar_periodicamente, args=(compactar_a_cada,),
+                             name='compactacao-ranking', daemon=True).start()
+
+    def _compactar_periodicamente(self, intervalo):
+        while True:
+            time.sleep(intervalo)
+            try:
+                self.compactar()
+            except Exception as e:
+                logger.error(f"Erro na compactação do ranking: {e}")
+
+    def compactar(self):
+        return historico.compactar(self.log.caminho, self.caminho_snapshot, self.limite)
+
+    def _identidade(self):
+        # Um log substituído (rename) ganha novo inode: leituras incrementais recomeçam
+        try:
+            return os.stat(self.log.caminho).st_ino
+        except OSError:
+            return None
+
+    def _atualizar_quiz_ids(self):
+        """Acompanha o fim do log (escritas de todos os workers) e guarda os quiz_ids gravados
+
+        No primeiro uso (ou com o log substituído) parte dos quiz_ids do
+        snapshot e lê apenas o trecho do log posterior a ele.
+        """
+        identidade = self._identidade()
+        if (self._offset_ids is None or identidade != self._identidade_ids
+                or self._offset_ids > self.log.tamanho()):
+            snapshot = historico.ler_snapshot(self.caminho_snapshot)
+            if snapshot.get('quiz_ids') is None or snapshot['offset'] > self.log.tamanho():
+                # Snapshot de uma versão anterior ou de outro log: lê o log inteiro
+                self._quiz_ids, self._offset_ids = set(), 0
+            else:
+                self._quiz_ids, self._offset_ids = set(snapshot['quiz_ids']), snapshot['offset']
+            self._identidade_ids = identidade
+        for registro, self._offset_ids in self.log.ler(self._offset_ids):
+            if registro.get('quiz_id'):
+                self._quiz_ids.add(registro['quiz_id'])
+
+    def _filtrar_novos(self, resultados):
+        # Roda com o log travado: nenhum outro worker grava entre a verificação e a escrita
+        self._atualizar_quiz_ids()
+        novos, ids = [], set()
+        for resultado in resultados:
+            quiz_id = resultado.get('quiz_id')
+            if quiz_id and (quiz_id in self._quiz_ids or quiz_id in ids):
+                continue
+            ids.add(quiz_id)
+            novos.append(resultado)
+        return novos
+
+    def adicionar(self, resultado):
+        return self.adicionar_lote((resultado,)) == 1
+
+    def adicionar_lote(self, resultados):
+        with self._lock:
+            novos = self.log.registrar_lote(list(resultados), filtrar=self._filtrar_novos)
+            self._quiz_ids.update(r['quiz_id'] for r in novos if r.get('quiz_id'))
+        return len(novos)
+
+    def listar(self, limite=LIMITE_RANKING):
+        if limite is None:
+            # Histórico completo, direto do log
+            return sorted((registro for registro, _ in self.log.ler()), key=chave_ordenacao)
+        return self.carregar_placar(limite)[0]
+
+    def carregar_placar(self, k=LIMITE_RANKING):
+        identidade = self._identidade()
+        snapshot = historico.ler_snapshot(self.caminho_snapshot)
+        placar = Placar(k, snapshot['ranking'])
+        offset = snapshot['offset']
+        if offset > self.log.tamanho():
+            # Snapshot de outro log (ex.: log apagado); reconstrói do zero
+            placar, offset = Placar(k), 0
+        for registro, offset in self.log.ler(offset):
+            placar.inserir(registro)
+        return placar.itens(), (identidade, offset)
+
+    def agregados(self):
+        snapshot = historico.ler_snapshot(self.caminho_snapshot)
+        offset = snapshot['offset']
+        if snapshot.get('agregados') is None or offset > self.log.tamanho():
+            # Snapshot sem estatísticas (versão anterior) ou de outro log: recalcula do início
+            agregados, offset = Agregados(), 0
+        else:
+            agregados = Agregados(snapshot['agregados'])
+        for registro, _ in self.log.ler(offset):
+            agregados.adicionar(registro)
+        return agregados
+
+    def _ler_base_participantes(self):
+        snapshot = historico.ler_snapshot(self.caminho_snapshot)
+        if snapshot.get('participantes') is None:
+            # Snapshot sem o índice (versão anterior): recalcula do início do log
+            return None, 0
+        return snapshot['participantes'], snapshot['offset']
+
+    def alteracoes_desde(self, cursor):
+        if cursor is None or cursor[0] != self._identidade():
+            return None
+        offset = cursor[1]
+        novos = []
+        for registro, offset in self.log.ler(offset):
+            novos.append(registro)
+        return novos, (cursor[0], offset)
+
+    def substituir(self, dados):
+        self.log.fechar()
+        conteudo = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in dados)
+        historico.gravar_atomico(self.log.caminho, conteudo.encode('utf-8'))
+        if os.path.exists(self.caminho_snapshot):
+            os.remove(self.caminho_snapshot)
+
+    def versao(self):
+        try:
+            st = os.stat(self.log.caminho)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size)
+
+
+class EscritaAdiada:
+    """Write-behind: resultados confirmados da memória e gravados em lote no ranking
+
+    `adicionar` apenas acrescenta o resultado a um journal local (uma linha,
+    sem reescrever nada) e o guarda na memória; uma thread grava os
+    pendentes no armazenamento a cada `lote` resultados ou `intervalo`
+    segundos, com um único `adicionar_lote`. Cada worker tem seu próprio
+    journal, em segmentos: o segmento só é apagado depois que o lote foi
+    gravado. Na inicialização, segmentos de processos que não existem mais
+    (queda) são tomados por um rename (só um worker consegue) e regravados;
+    todos os armazenamentos ignoram quiz_ids já gravados (SQLite e log pela
+    tabela/log inteiros, JSON pelo arquivo de quiz_ids), então regravar um
+    lote já persistido não duplica nada.
+
+    As leituras (ranking, estatísticas) continuam no armazenamento e só
+    enxergam um resultado depois da gravação do lote.
+    """
+
+    def __init__(self, store, journal, lote=50, intervalo=0.2, fsync_a_cada=50, fsync_intervalo=1.0):
+        self.store = store
+        self.lote = lote
+        self.intervalo = intervalo
+        self.fsync_a_cada = fsync_a_cada
+        self.fsync_intervalo = fsync_intervalo
+        # Chamado depois de cada lote gravado (ex.: acordar o ranking ao vivo)
+        self.ao_gravar = None
+        self._raiz, self._extensao = os.path.splitext(journal)
+        self._condicao = threading.Condition()
+        self._descarregando = threading.Lock()
+        self._pendentes = []
+        # quiz_ids já aceitos por este worker (pendentes ou gravados), para ignorar repetições
+        self._recentes = OrderedDict()
+        self._segmentos = []
+        self._sequencia = 0
+        self._recuperados = 0
+        self._segmento = None
+        self._recuperar()
+        threading.Thread(target=self._executar, name='escrita-ranking', daemon=True).start()
+        atexit.register(self.descarregar)
+
+    def __getattr__(self, nome):
+        # Leituras e demais operações vão direto ao armazenamento
+        return getattr(self.store, nome)
+
+    def _caminho_segmento(self, pid, sequencia):
+        return f'{self._raiz}.{pid}.{sequencia}{self._extensao}'
+
+    def _novo_segmento(self):
+        self._sequencia += 1
+        caminho = self._caminho_segmento(os.getpid(), self._sequencia)
+        self._segmento = historico.LogAppend(caminho, self.fsync_a_cada, self.fsync_intervalo)
+        self._segmentos.append(self._segmento)
+
+    def _recuperar(self):
+        """Regrava os journals deixados por processos encerrados sem descarregar"""
+        diretorio = os.path.dirname(os.path.abspath(self._raiz))
+        prefixo = os.path.basename(self._raiz) + '.'
+        for nome in sorted(os.listdir(diretorio)):
+            partes = nome[len(prefixo):].split('.') if nome.startswith(prefixo) else []
+            if len(partes) != 3 or not partes[0].isdigit() or '.' + partes[2] != self._extensao:
+                continue
+            pid = int(partes[0])
+            if pid != os.getpid() and _processo_ativo(pid):
+                continue
+            # Toma o segmento para este processo: o rename é atômico, então dois workers
+            # nunca regravam o mesmo journal; se este cair no meio, o segmento tomado
+            # fica com o pid dele e é recuperado como os demais
+            self._recuperados += 1
+            caminho = self._caminho_segmento(os.getpid(), f'r{self._recuperados}-{partes[0]}-{partes[1]}')
+            try:
+                os.rename(os.path.join(diretorio, nome), caminho)
+            except FileNotFoundError:
+                # Outro worker tomou o mesmo journal
+                continue
+            try:
+                resultados = [registro for registro, _ in historico.LogAppend(caminho).ler()]
+                gravados = self.store.adicionar_lote(resultados) if resultados else 0
+                os.remove(caminho)
+            except Exception as e:
+                logger.error(f"Erro ao recuperar o journal {nome}: {e}")
+                continue
+            logger.info(f"Journal {nome} recuperado: {gravados} de {len(resultados)} resultados gravados")
+
+    # Quantidade de quiz_ids lembrados para detectar repetições
+    RECENTES = 10000
+
+    def adicionar(self, resultado):
+        quiz_id = resultado.get('quiz_id')
+        with self._condicao:
+            if quiz_id and quiz_id in self._recentes:
+                return False
+            if self._segmento is None:
+                self._novo_segmento()
+            self._segmento.registrar(resultado)
+            self._pendentes.append(resultado)
+            if quiz_id:
+                self._recentes[quiz_id] = None
+                while len(self._recentes) > self.RECENTES:
+                    self._recentes.popitem(last=False)
+            if len(self._pendentes) >= self.lote:
+                self._condicao.notify()
+        return True
+
+    def buscar(self, quiz_id):
+        with self._condicao:
+            for resultado in self._pendentes:
+                if resultado.get('quiz_id') == quiz_id:
+                    return resultado
+        return self.store.buscar(quiz_id)
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: len(self._pendentes) >= self.lote, timeout=self.intervalo)
+            try:
+                self.descarregar()
+            except Exception as e:
+                # Os pendentes e o journal são mantidos; a próxima rodada tenta de novo
+                logger.error(f"Erro ao gravar lote do ranking: {e}")
+
+    def descarregar(self):
+        """Grava no armazenamento todos os resultados pendentes"""
+        with self._descarregando:
+            with self._condicao:
+                if not self._pendentes:
+                    return 0
+                lote, segmentos = list(self._pendentes), list(self._segmentos)
+                # Resultados novos vão para outro segmento enquanto este lote é gravado
+                self._segmento = None
+            gravados = self.store.adicionar_lote(lote)
+            with self._condicao:
+                del self._pendentes[:len(lote)]
+                for segmento in segmentos:
+                    self._segmentos.remove(segmento)
+            for segmento in segmentos:
+                segmento.fechar()
+                os.remove(segmento.caminho)
+        if self.ao_gravar is not None:
+            self.ao_gravar()
+        logger.debug('Lote do ranking gravado resultados=%d gravados=%d', len(lote), gravados)
+        return gravados
+
+
+def _processo_ativo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Sem permissão para sinalizar: o processo existe
+        return True
+    return True
+
+
+def caminho_particionado(caminho, slug=None):
+    """Caminho do arquivo de ranking de um quiz (ranking.db -> ranking_<slug>.db)"""
+    if not slug:
+        return caminho
+    raiz, extensao = os.path.splitext(caminho)
+    return f'{raiz}_{slug}{extensao}'
+
+
+def criar_ranking_store(backend=None, slug=None):
+    """Cria o backend de ranking configurado via variáveis de ambiente
+
+    Cada quiz (slug) tem seus próprios arquivos; sem slug são usados os
+    nomes originais (ranking.db, ranking.json...).
+    """
+    backend = backend or os.environ.get('RANKING_BACKEND', 'sqlite')
+    store = _criar_backend(backend, slug)
+    if os.environ.get('RANKING_ESCRITA_ADIADA', '0') == '1':
+        store = EscritaAdiada(
+            store,
+            caminho_particionado(os.environ.get('RANKING_JOURNAL', 'ranking_journal.log'), slug),
+            lote=int(os.environ.get('RANKING_LOTE', 50)),
+            intervalo=int(os.environ.get('RANKING_LOTE_MS', 200)) / 1000,
+            fsync_a_cada=int(os.environ.get('RANKING_JOURNAL_FSYNC_LOTE', 50)),
+            fsync_intervalo=int(os.environ.get('RANKING_JOURNAL_FSYNC_MS', 1000)) / 1000
+        )
+    return store
+
+
+def _criar_backend(backend, slug):
+    arquivo_json = caminho_particionado(os.environ.get('RANKING_ARQUIVO', 'ranking.json'), slug)
+
+    if backend == 'sqlite':
+        return SQLiteRankingStore(
+            caminho_particionado(os.environ.get('RANKING_DB', 'ranking.db'), slug),
+            importar_de=arquivo_json
+        )
+    if backend == 'json':
+        return JSONRankingStore(arquivo_json, backup=caminho_particionado('ranking_backup.json', slug))
+    if backend == 'log':
+        return LogRankingStore(
+            caminho_particionado(os.environ.get('RANKING_LOG', 'resultados.log'), slug),
+            caminho_particionado(os.environ.get('RANKING_SNAPSHOT', 'ranking_snapshot.json'), slug),
+            fsync_a_cada=int(os.environ.get('RANKING_LOG_FSYNC_LOTE', 50)),
+            fsync_intervalo=int(os.environ.get('RANKING_LOG_FSYNC_MS', 1000)) / 1000,
+            compactar_a_cada=int(os.environ.get('RANKING_COMPACTAR_S', 300))
+        )
+    raise ValueError(f"Backend de ranking desconhecido: {backend}")
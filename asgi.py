@@ -0,0 +1,475 @@
+"""
+Modo de execução assíncrono (ASGI) do Quiz
+
+As rotas de maior tráfego (iniciar_quiz, pergunta, responder, proximo,
+finalizar_quiz, api/ranking e o stream SSE do ranking) são atendidas
+diretamente no event loop: o acesso ao armazenamento (sessões e ranking em
+SQLite) roda em um pool de threads, então uma gravação lenta em disco não
+bloqueia as demais conexões, e cada espectador do ranking ao vivo custa só
+uma corrotina, não uma thread. As demais rotas (páginas HTML, estáticos,
+monitoramento) são repassadas à aplicação Flask.
+
+A lógica do quiz e o cookie de sessão são os mesmos do app Flask, então os
+dois modos podem atender o mesmo evento. Para executar:
+
+    pip install -r requirements_asgi.txt
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.http import dump_cookie, parse_cookie
+
+import app as quiz_flask
+import metricas
+from estado_quiz import relogio
+from transmissao import formatar_evento
+
+logger = logging.getLogger(__name__)
+
+# Threads para o I/O do armazenamento (SQLite); as conexões em si não ocupam threads
+THREADS_IO = int(os.environ.get('ASGI_THREADS_IO', 32))
+
+# Limite do corpo das requisições JSON atendidas no modo assíncrono
+TAMANHO_MAXIMO_CORPO = 64 * 1024
+
+# Intervalo (segundos) dos comentários que mantêm o stream SSE vivo
+INTERVALO_PING = 15
+
+_ROTA_QUIZ = re.compile(r'^(?:/q/(?P<slug>[^/]+))?/(?P<acao>iniciar_quiz|pergunta|responder|proximo|finalizar_quiz)$')
+_ROTA_RANKING = re.compile(r'^/api(?:/q/(?P<slug>[^/]+))?/ranking(?:/(?P<sufixo>stream|stats))?$')
+
+# Nomes de endpoint iguais aos do Flask, para as métricas dos dois modos coincidirem
+_ENDPOINTS = {
+    'iniciar_quiz': 'iniciar_quiz',
+    'pergunta': 'obter_pergunta',
+    'responder': 'responder_pergunta',
+    'proximo': 'proximo',
+    'finalizar_quiz': 'finalizar_quiz'
+}
+
+_METODOS = {
+    'iniciar_quiz': 'POST',
+    'pergunta': 'GET',
+    'responder': 'POST',
+    'proximo': 'POST',
+    'finalizar_quiz': 'POST'
+}
+
+
+class SessaoASGI(dict):
+    """Sessão decodificada do cookie do Flask, com controle de alteração"""
+
+    def __init__(self, dados=None):
+        super().__init__(dados or {})
+        self.modificada = False
+
+    def __setitem__(self, chave, valor):
+        super().__setitem__(chave, valor)
+        self.modificada = True
+
+    def clear(self):
+        super().clear()
+        self.modificada = True
+
+
+class FilaAssincrona:
+    """Fila do stream SSE alimentada pela thread do TransmissorRanking
+
+    Os eventos são entregues ao event loop com call_soon_threadsafe; a
+    contagem de pendentes reproduz o limite de uma queue.Queue, para que
+    clientes lentos sejam desconectados como no modo WSGI.
+    """
+
+    def __init__(self, loop, tamanho):
+        self._loop = loop
+        self._tamanho = tamanho
+        self._fila = asyncio.Queue()
+        self._lock = threading.Lock()
+        self._pendentes = 0
+
+    def put_nowait(self, evento):
+        # None (encerrar o stream) sempre é aceito
+        with self._lock:
+            if evento is not None and self._pendentes >= self._tamanho:
+                raise queue.Full
+            self._pendentes += 1
+        self._loop.call_soon_threadsafe(self._fila.put_nowait, evento)
+
+    def get_nowait(self):
+        # Os eventos já enviados ao event loop não são descartados
+        raise queue.Empty
+
+    def encerrar(self):
+        """Chamado no próprio event loop quando o cliente desconecta"""
+        with self._lock:
+            self._pendentes += 1
+        self._fila.put_nowait(None)
+
+    async def obter(self, timeout):
+        evento = await asyncio.wait_for(self._fila.get(), timeout)
+        with self._lock:
+            self._pendentes -= 1
+        return evento
+
+
+# Handlers síncronos: rodam no pool de threads e retornam (status, corpo, headers)
+
+def _iniciar_quiz(quiz, sessao, data):
+    if not data:
+        return 400, {'erro': 'Dados não fornecidos'}, {}
+
+    participante = str(data.get('participante', '')).strip()
+    erro = quiz_flask.validar_participante(participante)
+    if erro:
+        return 400, {'erro': erro}, {}
+
+    quiz_id, fila = quiz_flask.admitir_quiz(quiz, data, sessao)
+    if fila is not None:
+        corpo, headers = fila
+        return 503, corpo, headers
+
+    quiz_flask.iniciar_estado(quiz, participante, sessao, quiz_id)
+    return 200, {'sucesso': True}, {}
+
+
+def _pergunta(quiz, sessao, data, etags=''):
+    estado = quiz_flask.carregar_estado(quiz, sessao)
+    if estado is None:
+        return 401, {'erro': 'Sessão não iniciada'}, {}
+    quiz_flask.exigir_online(estado)
+
+    if estado.pergunta_atual >= len(quiz.catalogo):
+        return 200, {'quiz_finalizado': True}, {}
+
+    # Buscar a pergunta de novo não reinicia o relógio
+    if estado.emitir(relogio()):
+        quiz_flask.salvar_estado(estado, sessao)
+
+    pergunta = quiz.catalogo[estado.pergunta_atual]
+    headers = {'ETag': f'"{pergunta.etag}"', 'Cache-Control': 'private, no-cache'}
+    if f'"{pergunta.etag}"' in etags or etags.strip() == '*':
+        return 304, b'', headers
+    return 200, pergunta.payload, headers
+
+
+def _responder(quiz, sessao, data):
+    estado = quiz_flask.carregar_estado(quiz, sessao)
+    if estado is None:
+        return 401, {'erro': 'Sessão não iniciada'}, {}
+    if not data:
+        return 400, {'erro': 'Dados não fornecidos'}, {}
+
+    resultado = quiz_flask.corrigir_resposta(quiz, estado, data.get('resposta'))
+    quiz_flask.salvar_estado(estado, sessao)
+    return 200, resultado, {}
+
+
+def _proximo(quiz, sessao, data):
+    estado = quiz_flask.carregar_estado(quiz, sessao)
+    if estado is None:
+        return 401, {'erro': 'Sessão não iniciada'}, {}
+
+    resultado, pergunta = quiz_flask.avancar_quiz(quiz, estado, data or {})
+    quiz_flask.salvar_estado(estado, sessao)
+    if pergunta is None:
+        return 200, resultado, {}
+    return 200, quiz_flask.json_com_payload(resultado, 'proxima', pergunta.payload), {}
+
+
+def _finalizar_quiz(quiz, sessao, data):
+    estado = quiz_flask.carregar_estado(quiz, sessao)
+    if estado is None:
+        anterior = quiz_flask.resultado_anterior(quiz, sessao)
+        if anterior is not None:
+            return 200, anterior, {}
+        return 401, {'erro': 'Sessão não iniciada'}, {}
+
+    resultado = quiz_flask.registrar_resultado(quiz, estado)
+    quiz_flask.encerrar_estado(estado, sessao)
+    return 200, resultado, {}
+
+
+_HANDLERS = {
+    'iniciar_quiz': _iniciar_quiz,
+    'pergunta': _pergunta,
+    'responder': _responder,
+    'proximo': _proximo,
+    'finalizar_quiz': _finalizar_quiz
+}
+
+# Grupo de limite de requisições de cada rota de escrita (mesmos baldes do Flask)
+_LIMITES = {
+    'iniciar_quiz': 'iniciar',
+    'responder': 'escrita',
+    'proximo': 'escrita',
+    'finalizar_quiz': 'escrita'
+}
+
+
+def _atender(acao, ip, argumentos):
+    grupo = _LIMITES.get(acao)
+    if grupo is not None:
+        espera = quiz_flask.verificar_limite(grupo, ip, argumentos[1], argumentos[2])
+        if espera is not None:
+            corpo, headers = quiz_flask.resposta_limitada(espera)
+            return 429, corpo, headers
+    return _HANDLERS[acao](*argumentos)
+
+
+class AplicacaoASGI:
+    """Aplicação ASGI: rotas do quiz no event loop, o restante delegado ao Flask"""
+
+    def __init__(self, app_flask, threads_io=THREADS_IO):
+        self.flask = app_flask
+        self.wsgi = WSGIMiddleware(app_flask)
+        self.executor = ThreadPoolExecutor(max_workers=threads_io, thread_name_prefix='quiz-io')
+        self.serializador = app_flask.session_interface.get_signing_serializer(app_flask)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._ciclo_de_vida(receive, send)
+            return
+        if scope['type'] == 'http':
+            caminho = scope['path']
+            rota = _ROTA_QUIZ.match(caminho)
+            if rota and scope['method'] == _METODOS[rota['acao']]:
+                await self._medir(_ENDPOINTS[rota['acao']], scope, send,
+                                  lambda enviar: self._rota_quiz(rota['slug'], rota['acao'], scope, receive, enviar))
+                return
+            rota = _ROTA_RANKING.match(caminho)
+            if rota and scope['method'] == 'GET':
+                if rota['sufixo'] == 'stream':
+                    await self._stream_ranking(rota['slug'], receive, send)
+                elif rota['sufixo'] == 'stats':
+                    await self._medir('api_ranking_stats', scope, send,
+                                      lambda enviar: self._api_ranking(rota['slug'], enviar, estatisticas=True))
+                else:
+                    await self._medir('api_ranking', scope, send,
+                                      lambda enviar: self._api_ranking(rota['slug'], enviar, scope=scope))
+                return
+        await self.wsgi(scope, receive, send)
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _medir(self, endpoint, scope, send, atender):
+        """Registra a latência da rota atendida no event loop (mesma métrica do after_request)"""
+        inicio = time.perf_counter()
+        status = []
+
+        async def enviar(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                status.append(mensagem['status'])
+            await send(mensagem)
+
+        try:
+            await atender(enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            metricas.REQUISICOES.observar(duracao, endpoint, scope['method'], str(status[0] if status else 500))
+            controle = quiz_flask.controle_admissao
+            if controle is not None and endpoint in quiz_flask.ROTAS_EM_ANDAMENTO:
+                amostras = controle.observar(duracao)
+                if amostras:
+                    # O ajuste grava no SQLite: fora do event loop
+                    self.executor.submit(controle.reavaliar, amostras)
+
+    async def _em_thread(self, funcao, *args):
+        """Executa o I/O bloqueante (SQLite, arquivos) fora do event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, funcao, *args)
+
+    async def _rota_quiz(self, slug, acao, scope, receive, send):
+        quiz = quiz_flask.obter_quiz(slug)
+        if quiz is None:
+            await self._responder(send, 404, {'erro': 'Quiz não encontrado'})
+            return
+
+        corpo = await self._ler_corpo(receive)
+        if corpo is None:
+            await self._responder(send, 413, {'erro': 'Requisição muito grande'})
+            return
+        try:
+            data = quiz_flask.app.json.loads(corpo) if corpo else None
+        except ValueError:
+            data = None
+
+        headers = _headers(scope)
+        sessao = self._abrir_sessao(headers.get('cookie', ''))
+        argumentos = [quiz, sessao, data]
+        if acao == 'pergunta':
+            argumentos.append(headers.get('if-none-match', ''))
+        ip = quiz_flask.ip_cliente((scope.get('client') or ('',))[0], headers.get('x-forwarded-for', ''))
+        try:
+            status, resposta, extras = await self._em_thread(_atender, acao, ip, argumentos)
+        except quiz_flask.RespostaInvalida as e:
+            status, resposta, extras = e.status, {'erro': str(e)}, {}
+        except Exception as e:
+            logger.error(f"Erro na rota {acao} (ASGI): {e}")
+            status, resposta, extras = 500, {'erro': 'Erro interno do servidor'}, {}
+
+        if sessao.modificada:
+            extras['Set-Cookie'] = self._cookie_sessao(sessao)
+        await self._responder(send, status, resposta, extras, headers.get('accept-encoding', ''))
+
+    async def _api_ranking(self, slug, send, estatisticas=False, scope=None):
+        quiz = quiz_flask.obter_quiz(slug)
+        if quiz is None:
+            await self._responder(send, 404, {'erro': 'Quiz não encontrado'})
+            return
+        parametros = dict(parse_qsl(scope['query_string'].decode('latin-1'))) if scope else {}
+        accept_encoding = _headers(scope).get('accept-encoding', '') if scope else ''
+        extras = {}
+        try:
+            if any(parametro in parametros for parametro in quiz_flask.PARAMETROS_PAGINACAO):
+                corpo = await self._em_thread(quiz_flask.consultar_ranking, quiz, parametros)
+            elif estatisticas:
+                corpo = await self._em_thread(quiz.ranking_cache.obter_agregados)
+            else:
+                corpo, extras = await self._em_thread(quiz_flask.ranking_json, quiz, accept_encoding,
+                                                      quiz_flask.modo_ranking(parametros.get('modo')))
+        except quiz_flask.RespostaInvalida as e:
+            await self._responder(send, e.status, {'erro': str(e)})
+            return
+        except Exception as e:
+            logger.error(f"Erro ao obter ranking via API (ASGI): {e}")
+            await self._responder(send, 500, {'erro': 'Erro interno do servidor'})
+            return
+        await self._responder(send, 200, corpo, extras, accept_encoding)
+
+    async def _stream_ranking(self, slug, receive, send):
+        """Stream SSE: mesmo protocolo do app Flask, sem uma thread por espectador"""
+        quiz = quiz_flask.obter_quiz(slug)
+        if quiz is None:
+            await self._responder(send, 404, {'erro': 'Quiz não encontrado'})
+            return
+        transmissor = quiz.transmissor
+        fila = FilaAssincrona(asyncio.get_running_loop(), transmissor.tamanho_fila)
+        fila, snapshot = await self._em_thread(transmissor.assinar, fila)
+
+        async def vigiar_desconexao():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            fila.encerrar()
+
+        vigia = asyncio.create_task(vigiar_desconexao())
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': _cabecalhos({
+                    'Content-Type': 'text/event-stream; charset=utf-8',
+                    'Cache-Control': 'no-cache',
+                    'X-Accel-Buffering': 'no'
+                })
+            })
+            await _enviar_parte(send, 'retry: 3000\n\n')
+            await _enviar_parte(send, formatar_evento('snapshot', snapshot))
+            while True:
+                try:
+                    evento = await fila.obter(INTERVALO_PING)
+                except asyncio.TimeoutError:
+                    # Mantém a conexão viva através de proxies
+                    evento = ': ping\n\n'
+                if evento is None:
+                    break
+                await _enviar_parte(send, evento)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            vigia.cancel()
+            transmissor.cancelar(fila)
+
+    async def _ler_corpo(self, receive):
+        """Corpo completo da requisição, ou None se exceder o limite"""
+        partes = []
+        tamanho = 0
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'http.disconnect':
+                break
+            parte = mensagem.get('body', b'')
+            tamanho += len(parte)
+            if tamanho > TAMANHO_MAXIMO_CORPO:
+                return None
+            partes.append(parte)
+            if not mensagem.get('more_body'):
+                break
+        return b''.join(partes)
+
+    def _abrir_sessao(self, cookies):
+        """Lê o cookie de sessão assinado pelo Flask (mesma chave e formato)"""
+        valor = parse_cookie(cookies).get(self.flask.config['SESSION_COOKIE_NAME'])
+        if not valor:
+            return SessaoASGI()
+        vida = int(self.flask.permanent_session_lifetime.total_seconds())
+        try:
+            return SessaoASGI(self.serializador.loads(valor, max_age=vida))
+        except Exception:
+            return SessaoASGI()
+
+    def _cookie_sessao(self, sessao):
+        """Header Set-Cookie equivalente ao gerado pelo Flask"""
+        config = self.flask.config
+        nome = config['SESSION_COOKIE_NAME']
+        caminho = config['SESSION_COOKIE_PATH'] or config['APPLICATION_ROOT'] or '/'
+        if not sessao:
+            return dump_cookie(nome, '', expires=0, max_age=0, path=caminho,
+                               domain=config['SESSION_COOKIE_DOMAIN'])
+        expira = None
+        if sessao.get('_permanent'):
+            expira = datetime.now(timezone.utc) + self.flask.permanent_session_lifetime
+        return dump_cookie(
+            nome, self.serializador.dumps(dict(sessao)), expires=expira, path=caminho,
+            domain=config['SESSION_COOKIE_DOMAIN'], httponly=config['SESSION_COOKIE_HTTPONLY'],
+            secure=config['SESSION_COOKIE_SECURE'], samesite=config['SESSION_COOKIE_SAMESITE']
+        )
+
+    async def _responder(self, send, status, corpo, headers=None, accept_encoding=''):
+        if isinstance(corpo, dict):
+            corpo = quiz_flask.app.json.dumps(corpo).encode('utf-8')
+        cabecalhos = dict(headers or {})
+        if 'Content-Encoding' not in cabecalhos:
+            corpo, compressao = quiz_flask.comprimir_json(corpo, accept_encoding)
+            cabecalhos.update(compressao)
+            etag = cabecalhos.get('ETag')
+            if 'Content-Encoding' in compressao and etag and not etag.startswith('W/'):
+                cabecalhos['ETag'] = f'W/{etag}'
+        cabecalhos.setdefault('Content-Type', 'application/json')
+        cabecalhos['Content-Length'] = str(len(corpo))
+        await send({'type': 'http.response.start', 'status': status, 'headers': _cabecalhos(cabecalhos)})
+        await send({'type': 'http.response.body', 'body': corpo})
+
+
+def _headers(scope):
+    return {nome.decode('latin-1'): valor.decode('latin-1') for nome, valor in scope['headers']}
+
+
+def _cabecalhos(headers):
+    """Headers no formato ASGI, incluindo os de segurança do app Flask"""
+    todos = dict(quiz_flask.HEADERS_SEGURANCA, **headers)
+    return [(nome.lower().encode('latin-1'), valor.encode('latin-1')) for nome, valor in todos.items()]
+
+
+async def _enviar_parte(send, texto):
+    await send({'type': 'http.response.body', 'body': texto.encode('utf-8'), 'more_body': True})
+
+
+app = AplicacaoASGI(quiz_flask.criar_app())
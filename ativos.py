@@ -0,0 +1,120 @@
+"""
+Arquivos estáticos (CSS/JS) com nome versionado e compressão prévia
+
+Na inicialização cada arquivo de `static/` é lido uma vez, recebe no nome um
+trecho do hash do conteúdo (base.css -> base.3f2a9c1d0b4e.css) e é
+comprimido com gzip e, se o pacote `brotli` estiver instalado, com brotli.
+Como o nome muda sempre que o conteúdo muda, o navegador pode guardar o
+arquivo por um ano sem revalidar; os templates obtêm a URL atual com
+`ativo('css/base.css')`.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, apenas gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Arquivos menores que isso não compensam a compressão
+TAMANHO_MINIMO_COMPRESSAO = 256
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+# Nome sem versão (links antigos, ferramentas): sempre revalida
+CACHE_REVALIDAR = 'public, max-age=0, must-revalidate'
+
+
+class Ativo:
+    """Um arquivo estático com suas versões comprimidas"""
+
+    __slots__ = ('nome', 'versionado', 'tipo', 'etag', 'corpos')
+
+    def __init__(self, nome, conteudo):
+        digest = hashlib.sha256(conteudo).hexdigest()
+        raiz, extensao = os.path.splitext(nome)
+        self.nome = nome
+        self.versionado = f'{raiz}.{digest[:12]}{extensao}'
+        self.tipo = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+        self.etag = digest[:16]
+        # Codificação ('br', 'gzip', 'identity') -> bytes
+        self.corpos = {'identity': conteudo}
+        if extensao in EXTENSOES_COMPRIMIVEIS and len(conteudo) >= TAMANHO_MINIMO_COMPRESSAO:
+            self.corpos['gzip'] = gzip.compress(conteudo, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.corpos['br'] = brotli.compress(conteudo, quality=11)
+
+    def codificacao_para(self, accept_encoding):
+        """Menor versão que o cliente aceita (identity se nenhuma comprimida servir)"""
+        aceitas = parse_accept_header(accept_encoding)
+        melhor = 'identity'
+        for codificacao, corpo in self.corpos.items():
+            if aceitas[codificacao] > 0 and len(corpo) < len(self.corpos[melhor]):
+                melhor = codificacao
+        return melhor
+
+
+def aceita_codificacao(accept_encoding, codificacao):
+    """Se o header Accept-Encoding aceita a codificação (respeitando q=0)"""
+    return parse_accept_header(accept_encoding)[codificacao] > 0
+
+
+class Ativos:
+    """Índice dos arquivos de um diretório estático, por nome original e versionado"""
+
+    def __init__(self, diretorio, prefixo='/static'):
+        self.diretorio = diretorio
+        self.prefixo = prefixo
+        self._lock = threading.Lock()
+        self._por_nome = None
+        self._por_versionado = {}
+
+    def carregar(self):
+        """Lê, versiona e comprime todos os arquivos do diretório"""
+        por_nome = {}
+        por_versionado = {}
+        if os.path.isdir(self.diretorio):
+            for raiz, _, arquivos in os.walk(self.diretorio):
+                for arquivo in sorted(arquivos):
+                    caminho = os.path.join(raiz, arquivo)
+                    nome = os.path.relpath(caminho, self.diretorio).replace(os.sep, '/')
+                    with open(caminho, 'rb') as f:
+                        ativo = Ativo(nome, f.read())
+                    por_nome[nome] = ativo
+                    por_versionado[ativo.versionado] = ativo
+        with self._lock:
+            self._por_nome = por_nome
+            self._por_versionado = por_versionado
+        logger.info(f"{len(por_nome)} arquivos estáticos versionados"
+                    f"{' (gzip e brotli)' if brotli is not None else ' (gzip)'}")
+        return self
+
+    def _indice(self):
+        if self._por_nome is None:
+            with self._lock:
+                if self._por_nome is not None:
+                    return self._por_nome
+            self.carregar()
+        return self._por_nome
+
+    def url(self, nome):
+        """URL versionada de um arquivo (a original, se ele não existir)"""
+        ativo = self._indice().get(nome)
+        return f"{self.prefixo}/{ativo.versionado if ativo else nome}"
+
+    def obter(self, caminho):
+        """(ativo, imutável) para um caminho pedido; (None, False) se não existir"""
+        ativo = self._indice().get(caminho)
+        if ativo is not None:
+            return ativo, False
+        ativo = self._por_versionado.get(caminho)
+        return ativo, ativo is not None
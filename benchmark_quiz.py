@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+Benchmark do fluxo completo do Quiz
+
+Simula N participantes percorrendo iniciar_quiz → 10×(pergunta, responder)
+→ finalizar_quiz e mede a latência de cada rota (p50/p95/p99), a vazão e a
+disputa nas gravações do ranking. Roda em um diretório temporário, então o
+ranking e as sessões reais não são tocados.
+
+Modos:
+    cliente   test client do Flask, no mesmo processo (sem rede)
+    gunicorn  sobe um gunicorn local (mesma configuração do deploy) e usa HTTP
+    url       usa HTTP contra um servidor já em execução (--url)
+
+Exemplos:
+    python benchmark_quiz.py --jogadores 200 --concorrencia 20
+    python benchmark_quiz.py --modo gunicorn --workers 2 --saida atual.json
+    python benchmark_quiz.py --modo gunicorn --comparar base.json
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+DIRETORIO_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Nomes válidos para iniciar_quiz (apenas letras, nome e sobrenome)
+_LETRAS = 'abcdefghijklmnopqrstuvwxyz'
+
+# Latências comparadas com --comparar (menor é melhor)
+_METRICAS_COMPARADAS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+# Linha do formato texto do Prometheus: nome{rótulos} valor
+_LINHA_METRICA = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+_ROTULO_METRICA = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def nome_participante(i):
+    """Nome único e válido para o i-ésimo participante simulado"""
+    sufixo = ''
+    while True:
+        i, resto = divmod(i, len(_LETRAS))
+        sufixo = _LETRAS[resto] + sufixo
+        if i == 0:
+            break
+    return f'Jogador Bench{sufixo}'
+
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo método do posto mais próximo"""
+    if not valores_ordenados:
+        return None
+    posto = max(1, -(-len(valores_ordenados) * p // 100))
+    return valores_ordenados[int(posto) - 1]
+
+
+def resumir(latencias_ms, erros=0):
+    """p50/p95/p99, média e máximo de uma lista de latências em ms"""
+    ordenadas = sorted(latencias_ms)
+    return {
+        'n': len(ordenadas),
+        'erros': erros,
+        'p50_ms': _arredondar(percentil(ordenadas, 50)),
+        'p95_ms': _arredondar(percentil(ordenadas, 95)),
+        'p99_ms': _arredondar(percentil(ordenadas, 99)),
+        'media_ms': _arredondar(sum(ordenadas) / len(ordenadas)) if ordenadas else None,
+        'max_ms': _arredondar(ordenadas[-1]) if ordenadas else None
+    }
+
+
+def _arredondar(valor):
+    return None if valor is None else round(valor, 3)
+
+
+class Medicoes:
+    """Latências por rota, compartilhadas pelas threads dos participantes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}
+        self.erros = {}
+        self.resumos = {}
+
+    def registrar(self, rota, segundos, ok=True):
+        with self._lock:
+            self.latencias.setdefault(rota, []).append(segundos * 1000)
+            if not ok:
+                self.erros[rota] = self.erros.get(rota, 0) + 1
+
+    def registrar_resumo(self, rota, resumo):
+        """Resumo já calculado fora daqui (ex.: a partir do histograma do /metrics)"""
+        with self._lock:
+            self.resumos[rota] = resumo
+
+    def resumo(self):
+        with self._lock:
+            resumos = {rota: resumir(valores, self.erros.get(rota, 0)) for rota, valores in self.latencias.items()}
+            resumos.update(self.resumos)
+            return dict(sorted(resumos.items()))
+
+
+class ClienteFlask:
+    """Participante usando o test client do Flask (cookie de sessão próprio)"""
+
+    def __init__(self, app):
+        self._cliente = app.test_client()
+
+    def get(self, caminho):
+        resposta = self._cliente.get(caminho)
+        return resposta.status_code, resposta.get_json(silent=True)
+
+    def post(self, caminho, dados):
+        resposta = self._cliente.post(caminho, json=dados)
+        return resposta.status_code, resposta.get_json(silent=True)
+
+
+class ClienteHTTP:
+    """Participante falando HTTP de verdade (um cookie jar por participante)"""
+
+    def __init__(self, url_base):
+        self.url_base = url_base.rstrip('/')
+        self._abridor = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def _enviar(self, requisicao):
+        try:
+            with self._abridor.open(requisicao, timeout=30) as resposta:
+                return resposta.status, _json_ou_none(resposta.read())
+        except urllib.error.HTTPError as e:
+            return e.code, _json_ou_none(e.read())
+
+    def get(self, caminho):
+        return self._enviar(urllib.request.Request(self.url_base + caminho))
+
+    def post(self, caminho, dados):
+        return self._enviar(urllib.request.Request(
+            self.url_base + caminho,
+            data=json.dumps(dados).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        ))
+
+
+def _json_ou_none(corpo):
+    try:
+        return json.loads(corpo)
+    except ValueError:
+        return None
+
+
+def jogar(cliente, indice, medicoes, prefixo='', pausa=0.0, semente=None):
+    """Percorre o quiz completo como um participante; True se terminou sem erros"""
+    aleatorio = random.Random(semente)
+
+    def chamar(rota, funcao, *args):
+        inicio = time.perf_counter()
+        try:
+            status, dados = funcao(*args)
+        except Exception:
+            medicoes.registrar(rota, time.perf_counter() - inicio, ok=False)
+            return None
+        ok = status == 200
+        medicoes.registrar(rota, time.perf_counter() - inicio, ok=ok)
+        return dados if ok else None
+
+    if chamar('iniciar_quiz', cliente.post, prefixo + '/iniciar_quiz',
+              {'participante': nome_participante(indice)}) is None:
+        return False
+
+    while True:
+        pergunta = chamar('pergunta', cliente.get, prefixo + '/pergunta')
+        if pergunta is None:
+            return False
+        if pergunta.get('quiz_finalizado'):
+            break
+        if pausa:
+            time.sleep(pausa)
+        resposta = aleatorio.randrange(len(pergunta['alternativas']))
+        if chamar('responder', cliente.post, prefixo + '/responder', {'resposta': resposta}) is None:
+            return False
+
+    return chamar('finalizar_quiz', cliente.post, prefixo + '/finalizar_quiz', {}) is not None
+
+
+def executar(criar_cliente, args, medicoes):
+    """Roda os participantes com a concorrência pedida; retorna (duração, concluídos)"""
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        futuros = [
+            executor.submit(jogar, criar_cliente(), i, medicoes, args.prefixo, args.pausa_ms / 1000,
+                            None if args.semente is None else args.semente + i)
+            for i in range(args.jogadores)
+        ]
+        concluidos = sum(1 for futuro in futuros if futuro.result())
+    return time.perf_counter() - inicio, concluidos
+
+
+def medir_escritas(store, medicoes):
+    """Cronometra cada gravação no ranking (tempo de espera pelo lock incluso)"""
+    adicionar_original = store.adicionar
+
+    def adicionar(resultado):
+        inicio = time.perf_counter()
+        try:
+            return adicionar_original(resultado)
+        finally:
+            medicoes.registrar('escrita_ranking', time.perf_counter() - inicio)
+
+    store.adicionar = adicionar
+
+
+def coletar_escritas(url, workers=None, sem_novidade=20, maximo=200):
+    """Histograma das gravações no ranking de cada worker, lido do /metrics
+
+    As métricas são por worker e cada coleta é atendida por um deles:
+    repete a coleta até ver `workers` workers distintos (ou, sem esse
+    número, até `sem_novidade` coletas seguidas sem worker novo).
+    Retorna {pid: ({limite: quantidade acumulada}, soma, total)}.
+    """
+    cabecalhos = {}
+    if os.environ.get('METRICAS_TOKEN'):
+        cabecalhos['Authorization'] = f"Bearer {os.environ['METRICAS_TOKEN']}"
+    por_worker, seguidas = {}, 0
+    for _ in range(maximo):
+        requisicao = urllib.request.Request(url.rstrip('/') + '/metrics', headers=cabecalhos)
+        with urllib.request.urlopen(requisicao, timeout=10) as resposta:
+            texto = resposta.read().decode('utf-8')
+        pid, faixas, soma, total = None, {}, 0.0, 0
+        for linha in texto.splitlines():
+            encontrado = _LINHA_METRICA.match(linha)
+            if not encontrado:
+                continue
+            nome, valor = encontrado.group(1), float(encontrado.group(3))
+            rotulos = dict(_ROTULO_METRICA.findall(encontrado.group(2) or ''))
+            if nome == 'quiz_worker_pid':
+                pid = int(valor)
+            elif rotulos.get('operacao') != 'adicionar':
+                continue
+            elif nome == 'quiz_ranking_operacao_segundos_bucket':
+                # Somado entre os quizzes (rótulo "quiz")
+                limite = float(rotulos['le'])
+                faixas[limite] = faixas.get(limite, 0) + int(valor)
+            elif nome == 'quiz_ranking_operacao_segundos_sum':
+                soma += valor
+            elif nome == 'quiz_ranking_operacao_segundos_count':
+                total += int(valor)
+        seguidas = 0 if pid not in por_worker else seguidas + 1
+        por_worker[pid] = (faixas, soma, total)
+        if len(por_worker) == workers or (workers is None and seguidas >= sem_novidade):
+            break
+    return por_worker
+
+
+def resumir_histograma(antes, depois):
+    """Resumo das gravações feitas entre duas coletas (percentis pelo limite superior de cada faixa)"""
+    faixas, soma, total = {}, 0.0, 0
+    for pid, (faixas_depois, soma_depois, total_depois) in depois.items():
+        faixas_antes, soma_antes, total_antes = antes.get(pid, ({}, 0.0, 0))
+        for limite, quantidade in faixas_depois.items():
+            faixas[limite] = faixas.get(limite, 0) + quantidade - faixas_antes.get(limite, 0)
+        soma += soma_depois - soma_antes
+        total += total_depois - total_antes
+
+    def percentil_faixas(p):
+        posto = max(1, -(-total * p // 100))
+        for limite in sorted(faixas):
+            if faixas[limite] >= posto:
+                # Acima da última faixa finita não há limite: valor desconhecido
+                return None if limite == float('inf') else limite * 1000
+        return None
+
+    return {
+        'n': total,
+        'erros': 0,
+        'p50_ms': _arredondar(percentil_faixas(50)) if total else None,
+        'p95_ms': _arredondar(percentil_faixas(95)) if total else None,
+        'p99_ms': _arredondar(percentil_faixas(99)) if total else None,
+        'media_ms': _arredondar(soma / total * 1000) if total else None,
+        'max_ms': None,
+        # Percentis com a resolução das faixas do histograma, não medições individuais
+        'fonte': 'metrics'
+    }
+
+
+def medir_escritas_servidor(url, medicoes, workers=None):
+    """Coleta inicial do /metrics; a função devolvida registra as gravações feitas desde então"""
+    try:
+        antes = coletar_escritas(url, workers)
+    except (urllib.error.URLError, OSError) as e:
+        print(f'Aviso: /metrics indisponível ({e}); gravações no ranking não medidas')
+        return lambda: None
+
+    def concluir():
+        try:
+            depois = coletar_escritas(url, workers)
+        except (urllib.error.URLError, OSError) as e:
+            print(f'Aviso: /metrics indisponível ({e}); gravações no ranking não medidas')
+            return
+        medicoes.registrar_resumo('escrita_ranking', resumir_histograma(antes, depois))
+
+    return concluir
+
+
+def contar_resultados():
+    """Resultados gravados no ranking do diretório atual (todas as posições)"""
+    from armazenamento import criar_ranking_store
+    return len(criar_ranking_store().listar(None))
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def aguardar_servidor(url, processo, timeout=30):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError('gunicorn encerrou durante a inicialização')
+        try:
+            urllib.request.urlopen(url + '/api/quizzes', timeout=1).close()
+            return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn não respondeu a tempo')
+
+
+def benchmark_cliente(args, medicoes):
+    sys.path.insert(0, DIRETORIO_APP)
+    import app as quiz_app
+    from armazenamento import EscritaAdiada
+
+    quiz = quiz_app.obter_quiz(args.prefixo.rsplit('/', 1)[-1] if args.prefixo else None)
+    medir_escritas(quiz.ranking_store, medicoes)
+    antes = len(quiz.ranking_store.listar(None))
+    app_flask = quiz_app.criar_app()
+    duracao, concluidos = executar(lambda: ClienteFlask(app_flask), args, medicoes)
+    if isinstance(quiz.ranking_store, EscritaAdiada):
+        # Com escrita adiada, conta também os resultados ainda na memória
+        quiz.ranking_store.descarregar()
+    return duracao, concluidos, len(quiz.ranking_store.listar(None)) - antes
+
+
+def benchmark_gunicorn(args, medicoes):
+    porta = porta_livre()
+    url = f'http://127.0.0.1:{porta}'
+    comando = [
+        sys.executable, '-m', 'gunicorn', 'app:criar_app()',
+        '--pythonpath', DIRETORIO_APP,
+        '--bind', f'127.0.0.1:{porta}',
+        '--workers', str(args.workers),
+        '--worker-class', 'gthread',
+        '--threads', str(args.threads),
+        '--log-level', 'warning'
+    ]
+    processo = subprocess.Popen(comando, cwd=os.getcwd())
+    try:
+        aguardar_servidor(url, processo)
+        antes = contar_resultados()
+        # Disputa nas gravações do ranking, medida dentro de cada worker
+        concluir = medir_escritas_servidor(url, medicoes, args.workers)
+        duracao, concluidos = executar(lambda: ClienteHTTP(url), args, medicoes)
+        concluir()
+        return duracao, concluidos, contar_resultados() - antes
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+
+
+def benchmark_url(args, medicoes):
+    concluir = medir_escritas_servidor(args.url, medicoes)
+    duracao, concluidos = executar(lambda: ClienteHTTP(args.url), args, medicoes)
+    concluir()
+    # O armazenamento do servidor remoto não é acessível daqui
+    return duracao, concluidos, None
+
+
+def revisao_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRETORIO_APP,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def comparar(atual, base, tolerancia):
+    """Imprime as diferenças em relação a um resultado anterior; retorna as regressões"""
+    regressoes = []
+    print(f"\nComparação com {base['meta'].get('data')} ({base['meta'].get('revisao') or 'sem revisão'}):")
+    if base['meta'].get('modo') != atual['meta']['modo']:
+        print(f"  Atenção: modos diferentes ({base['meta'].get('modo')} × {atual['meta']['modo']})")
+    for rota, metricas in atual['rotas'].items():
+        anteriores = base['rotas'].get(rota)
+        if not anteriores:
+            continue
+        if anteriores.get('fonte') != metricas.get('fonte'):
+            # Tempos medidos no cliente × faixas do histograma do /metrics: não comparáveis
+            print(f'  {rota:<16} medições de origens diferentes, não comparadas')
+            continue
+        for nome in _METRICAS_COMPARADAS:
+            novo, antigo = metricas.get(nome), anteriores.get(nome)
+            if not novo or not antigo:
+                continue
+            variacao = (novo - antigo) / antigo
+            marcador = ''
+            if variacao > tolerancia:
+                marcador = '  <-- regressão'
+                regressoes.append(f'{rota}.{nome}')
+            print(f'  {rota:<16} {nome:<7} {antigo:>9.2f} → {novo:>9.2f} ms ({variacao:+.0%}){marcador}')
+
+    novo, antigo = atual['jogadores_por_s'], base.get('jogadores_por_s')
+    if antigo:
+        variacao = (novo - antigo) / antigo
+        marcador = ''
+        if variacao < -tolerancia:
+            marcador = '  <-- regressão'
+            regressoes.append('jogadores_por_s')
+        print(f'  {"vazão":<24} {antigo:>9.2f} → {novo:>9.2f} jogadores/s ({variacao:+.0%}){marcador}')
+    return regressoes
+
+
+def imprimir(resultado):
+    meta = resultado['meta']
+    print(f"\nModo {meta['modo']}: {meta['jogadores']} participantes, concorrência {meta['concorrencia']}")
+    print(f"Duração: {resultado['duracao_s']:.2f}s | {resultado['jogadores_por_s']:.2f} participantes/s"
+          f" | {resultado['requisicoes_por_s']:.1f} requisições/s")
+    print(f"Concluídos: {resultado['concluidos']}/{meta['jogadores']}"
+          + (f" | resultados gravados: {resultado['resultados_gravados']}"
+             if resultado['resultados_gravados'] is not None else ''))
+    print(f"\n  {'rota':<16} {'n':>6} {'erros':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for rota, m in resultado['rotas'].items():
+        valores = ''.join(' ' + ('-' if m[nome] is None else f'{m[nome]:.2f}').rjust(9)
+                          for nome in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms'))
+        origem = '  (faixas do /metrics)' if m.get('fonte') == 'metrics' else ''
+        print(f"  {rota:<16} {m['n']:>6} {m['erros']:>6}{valores}{origem}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do fluxo completo do Quiz')
+    parser.add_argument('--modo', choices=('cliente', 'gunicorn', 'url'), default='cliente')
+    parser.add_argument('--jogadores', type=int, default=100, help='participantes simulados')
+    parser.add_argument('--concorrencia', type=int, default=10, help='participantes simultâneos')
+    parser.add_argument('--pausa-ms', type=float, default=0, help='tempo de "leitura" antes de cada resposta')
+    parser.add_argument('--prefixo', default='', help='prefixo do quiz, ex.: /q/meu-quiz')
+    parser.add_argument('--semente', type=int, default=None, help='semente das respostas aleatórias')
+    parser.add_argument('--workers', type=int, default=2, help='workers do gunicorn')
+    parser.add_argument('--threads', type=int, default=50, help='threads por worker do gunicorn')
+    parser.add_argument('--url', help='servidor já em execução (modo url)')
+    parser.add_argument('--saida', help='grava o resultado em JSON')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help='piora relativa tolerada antes de acusar regressão (padrão 0.2)')
+    args = parser.parse_args()
+    if args.modo == 'url' and not args.url:
+        parser.error('--url é obrigatório no modo url')
+
+    medicoes = Medicoes()
+    saida = os.path.abspath(args.saida) if args.saida else None
+    comparacao = os.path.abspath(args.comparar) if args.comparar else None
+
+    # Ranking e sessões isolados em um diretório temporário
+    with tempfile.TemporaryDirectory(prefix='benchmark_quiz_') as diretorio:
+        os.chdir(diretorio)
+        os.environ.setdefault('SECRET_KEY', 'benchmark')
+        # Todos os jogadores simulados saem do mesmo IP: o limite de requisições distorceria a medição
+        os.environ.setdefault('LIMITE_BACKEND', 'desligado')
+        # A sala de espera recusaria parte dos jogadores simultâneos (mede-se a capacidade bruta)
+        os.environ.setdefault('ADMISSAO_BACKEND', 'desligado')
+        executor = {'cliente': benchmark_cliente, 'gunicorn': benchmark_gunicorn, 'url': benchmark_url}[args.modo]
+        duracao, concluidos, gravados = executor(args, medicoes)
+        os.chdir(DIRETORIO_APP)
+
+    rotas = medicoes.resumo()
+    total_requisicoes = sum(m['n'] for rota, m in rotas.items() if rota != 'escrita_ranking')
+    resultado = {
+        'meta': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'revisao': revisao_git(),
+            'python': platform.python_version(),
+            'modo': args.modo,
+            'jogadores': args.jogadores,
+            'concorrencia': args.concorrencia,
+            'pausa_ms': args.pausa_ms,
+            'workers': args.workers if args.modo == 'gunicorn' else None,
+            'threads': args.threads if args.modo == 'gunicorn' else None
+        },
+        'duracao_s': round(duracao, 3),
+        'concluidos': concluidos,
+        'jogadores_por_s': round(concluidos / duracao, 3) if duracao else 0.0,
+        'requisicoes_por_s': round(total_requisicoes / duracao, 3) if duracao else 0.0,
+        # Diferença entre quizzes concluídos e linhas novas no ranking = gravações perdidas
+        'resultados_gravados': gravados,
+        'rotas': rotas
+    }
+    imprimir(resultado)
+
+    if saida:
+        with open(saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f'\nResultado salvo em {saida}')
+
+    falhou = concluidos < args.jogadores or (gravados is not None and gravados != concluidos)
+    if comparacao:
+        with open(comparacao, encoding='utf-8') as f:
+            falhou = bool(comparar(resultado, json.load(f), args.tolerancia)) or falhou
+    return 1 if falhou else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
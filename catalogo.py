@@ -0,0 +1,76 @@
+"""
+Catálogo imutável de perguntas do Quiz
+
+As perguntas são carregadas uma única vez de um arquivo JSON. Para cada
+pergunta, o payload enviado ao cliente (sem a resposta correta) já fica
+serializado em bytes, junto com seu ETag, de modo que servir uma pergunta
+não exige cópia de dicionário nem nova serialização.
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+
+from estado_quiz import MAXIMO_ALTERNATIVAS
+
+Pergunta = namedtuple('Pergunta', ['texto', 'alternativas', 'resposta_correta', 'payload', 'etag'])
+
+
+def serializar(dados):
+    """Serialização JSON compacta e estável usada nos payloads pré-montados"""
+    return json.dumps(dados, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def calcular_etag(conteudo):
+    return hashlib.sha1(conteudo).hexdigest()[:20]
+
+
+class CatalogoPerguntas:
+    """Sequência somente leitura de perguntas com payloads prontos para o cliente"""
+
+    def __init__(self, perguntas, extras=None):
+        total = len(perguntas)
+        if not total:
+            raise ValueError("O catálogo precisa ter ao menos uma pergunta")
+
+        itens = []
+        for i, dados in enumerate(perguntas):
+            for campo in ('pergunta', 'alternativas', 'resposta_correta'):
+                if campo not in dados:
+                    raise ValueError(f"Pergunta {i + 1} não tem o campo '{campo}'")
+            alternativas = tuple(dados['alternativas'])
+            if len(alternativas) < 2:
+                raise ValueError(f"Pergunta {i + 1} precisa de ao menos 2 alternativas")
+            if len(alternativas) > MAXIMO_ALTERNATIVAS:
+                raise ValueError(f"Pergunta {i + 1} tem mais de {MAXIMO_ALTERNATIVAS} alternativas")
+            if not 0 <= dados['resposta_correta'] < len(alternativas):
+                raise ValueError(f"Pergunta {i + 1} tem resposta_correta inválida")
+
+            # Payload do cliente: nunca inclui a resposta correta
+            payload = serializar(dict(
+                extras or {},
+                pergunta=dados['pergunta'],
+                alternativas=list(alternativas),
+                numero=i + 1,
+                total=total
+            ))
+            itens.append(Pergunta(dados['pergunta'], alternativas, dados['resposta_correta'],
+                                  payload, calcular_etag(payload)))
+        self._perguntas = tuple(itens)
+
+        # Modo offline: catálogo inteiro (sem respostas) em um único payload
+        self.payload_completo = serializar(dict(
+            extras or {},
+            perguntas=[{'pergunta': p.texto, 'alternativas': list(p.alternativas)} for p in itens],
+            total=total
+        ))
+        self.etag_completo = calcular_etag(self.payload_completo)
+
+    def __len__(self):
+        return len(self._perguntas)
+
+    def __getitem__(self, indice):
+        return self._perguntas[indice]
+
+    def __iter__(self):
+        return iter(self._perguntas)
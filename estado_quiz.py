@@ -0,0 +1,137 @@
+"""
+Estado de um quiz em andamento, com codificação compacta
+
+O estado viaja no cookie assinado da sessão, então cada byte é enviado e
+verificado (HMAC) em toda requisição. Em vez de uma lista de dicionários
+por resposta, as escolhas ficam em uma string (um caractere por pergunta),
+os acertos em uma máscara de bits e as latências em milissegundos. Os
+detalhes de cada resposta (pontos, resposta correta) são reconstruídos a
+partir do catálogo quando necessário.
+"""
+
+import time
+import uuid
+
+# 2: instantes em horário de parede (a versão 1 guardava time.monotonic())
+VERSAO_CODIFICACAO = 2
+
+# Um caractere por escolha: '0' = sem resposta (tempo esgotado), '1' = alternativa 0...
+_DIGITOS = '0123456789abcdefghijklmnopqrstuvwxyz'
+# Maior quantidade de alternativas que cabe na codificação das escolhas
+MAXIMO_ALTERNATIVAS = len(_DIGITOS) - 1
+
+
+def relogio():
+    """Instante (segundos) usado no início do quiz e na entrega de cada pergunta
+
+    Horário de parede, e não time.monotonic(): o estado sobrevive a
+    reinícios do host (sessoes.db) e passa por workers de outras máquinas,
+    onde o relógio monotônico tem outra origem.
+    """
+    return time.time()
+
+
+class EstadoQuiz:
+    """Progresso de um participante em um quiz"""
+
+    __slots__ = ('slug', 'participante', 'quiz_id', 'pontuacao', 'escolhas', 'acertos',
+                 'latencias_ms', 'inicio', 'emitida_em', 'offline')
+
+    def __init__(self, slug, participante, quiz_id, inicio, pontuacao=0, escolhas='',
+                 acertos=0, latencias_ms=None, emitida_em=None, offline=False):
+        self.slug = slug
+        self.participante = participante
+        self.quiz_id = quiz_id
+        self.inicio = inicio
+        self.pontuacao = pontuacao
+        self.escolhas = escolhas
+        self.acertos = acertos
+        self.latencias_ms = latencias_ms if latencias_ms is not None else []
+        self.emitida_em = emitida_em
+        # Catálogo inteiro já entregue: só /submeter_lote pode responder
+        self.offline = offline
+
+    @classmethod
+    def novo(cls, slug, participante, agora, quiz_id=None):
+        return cls(slug, participante, quiz_id or str(uuid.uuid4()), agora)
+
+    @property
+    def pergunta_atual(self):
+        """Índice da pergunta em andamento (= quantidade de respostas dadas)"""
+        return len(self.escolhas)
+
+    @property
+    def total_acertos(self):
+        return bin(self.acertos).count('1')
+
+    def emitir(self, agora):
+        """Marca o momento em que a pergunta atual foi entregue; False se já estava marcada"""
+        if self.emitida_em is not None:
+            return False
+        self.emitida_em = agora
+        return True
+
+    def entrar_offline(self, agora):
+        """Passa ao modo offline (marcando a entrega, se preciso); retorna se o estado mudou"""
+        emitida = self.emitir(agora)
+        if self.offline:
+            return emitida
+        self.offline = True
+        return True
+
+    def registrar(self, resposta, acertou, pontos, latencia_ms):
+        """Registra a resposta da pergunta atual e avança para a próxima"""
+        if acertou:
+            self.acertos |= 1 << self.pergunta_atual
+        self.escolhas += _DIGITOS[resposta + 1]
+        self.latencias_ms.append(latencia_ms)
+        self.pontuacao += pontos
+        self.emitida_em = None
+
+    def respostas(self, quiz):
+        """Reconstrói a lista detalhada de respostas a partir do catálogo do quiz"""
+        detalhes = []
+        for i, caractere in enumerate(self.escolhas):
+            pergunta = quiz.catalogo[i]
+            acertou = bool(self.acertos >> i & 1)
+            tempo_resposta = self.latencias_ms[i] / 1000
+            detalhes.append({
+                'pergunta': i,
+                'resposta_usuario': _DIGITOS.index(caractere) - 1,
+                'resposta_correta': pergunta.resposta_correta,
+                'acertou': acertou,
+                'pontos': quiz.calcular_pontos(quiz.tempo_por_pergunta - tempo_resposta) if acertou else 0,
+                'tempo_resposta': tempo_resposta
+            })
+        return detalhes
+
+    def codificar(self):
+        """Representação compacta (chaves curtas) para a sessão"""
+        dados = {
+            'v': VERSAO_CODIFICACAO,
+            's': self.slug,
+            'n': self.participante,
+            'i': self.quiz_id,
+            'c': round(self.inicio, 3),
+            'p': self.pontuacao,
+            'r': self.escolhas,
+            'a': self.acertos,
+            't': self.latencias_ms
+        }
+        if self.emitida_em is not None:
+            dados['m'] = round(self.emitida_em, 3)
+        if self.offline:
+            dados['o'] = 1
+        return dados
+
+    @classmethod
+    def decodificar(cls, dados):
+        """Reconstrói o estado; None se ausente ou em formato desconhecido"""
+        if not isinstance(dados, dict) or dados.get('v') != VERSAO_CODIFICACAO:
+            return None
+        try:
+            return cls(dados['s'], dados['n'], dados['i'], dados['c'], pontuacao=dados['p'],
+                       escolhas=dados['r'], acertos=dados['a'], latencias_ms=list(dados['t']),
+                       emitida_em=dados.get('m'), offline=bool(dados.get('o')))
+        except KeyError:
+            return None
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Log append-only de resultados do Quiz
+
+Cada resultado é gravado como uma linha JSON no fim do arquivo (custo O(1)
+por quiz, sem reescrever nada). O fsync é feito em lote, a cada N registros
+ou T segundos. A compactação reconstrói o snapshot do placar a partir do
+log, e o log em si preserva o histórico completo para relatórios.
+
+Uso pela linha de comando:
+    python historico.py compactar [--log resultados.log] [--snapshot ranking_snapshot.json]
+    python historico.py exportar [--log resultados.log] [--saida resultados.csv]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from agregados import Agregados
+from participantes import IndiceParticipantes
+from placar import Placar
+
+try:
+    import fcntl
+except ImportError:  # Windows (desenvolvimento local)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def bloqueio_arquivo(arquivo):
+    """Lock exclusivo entre processos (no-op onde fcntl não existe)"""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(arquivo, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+# umask do processo, lida uma vez na importação (os.umask só consulta alterando o valor)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def gravar_atomico(caminho, conteudo):
+    """Grava um arquivo via arquivo temporário + rename (leitores nunca veem escrita parcial)"""
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix='.' + os.path.basename(caminho) + '.')
+    try:
+        # mkstemp cria com 0600; o arquivo final mantém o modo do anterior ou segue a umask, como um open()
+        try:
+            modo = os.stat(caminho).st_mode & 0o777
+        except FileNotFoundError:
+            modo = 0o666 & ~_UMASK
+        if hasattr(os, 'fchmod'):  # ausente no Windows
+            os.fchmod(fd, modo)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+class LogAppend:
+    """Arquivo de registros JSON, um por linha, com fsync em lote
+
+    As escritas vão direto para o kernel (visíveis aos outros workers
+    imediatamente); apenas o fsync é agrupado para não pagar uma ida ao
+    disco por resultado.
+    """
+
+    def __init__(self, caminho, fsync_a_cada=50, fsync_intervalo=1.0):
+        self.caminho = caminho
+        self.fsync_a_cada = fsync_a_cada
+        self.fsync_intervalo = fsync_intervalo
+        self._lock = threading.Lock()
+        self._fd = None
+        self._pendentes = 0
+        self._ultimo_fsync = time.monotonic()
+        self._sincronizador = None
+
+    def _abrir(self):
+        if self._fd is not None and os.fstat(self._fd).st_nlink == 0:
+            # O log foi substituído por outro processo (rename): reabre o novo arquivo
+            os.close(self._fd)
+            self._fd = None
+        if self._fd is None:
+            self._fd = os.open(self.caminho, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def registrar(self, registro):
+        """Acrescenta um registro ao fim do log"""
+        self.registrar_lote((registro,))
+
+    def registrar_lote(self, registros, filtrar=None):
+        """Acrescenta vários registros com uma única escrita (nunca intercalados com outro worker)
+
+        `filtrar(registros)`, se informado, roda com o log travado (entre
+        threads e processos) e devolve os registros a gravar: uma verificação
+        feita nele e a escrita são atômicas. Retorna os registros gravados.
+        """
+        with self._lock:
+            fd = self._abrir()
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if filtrar is not None:
+                    registros = filtrar(registros)
+                conteudo = ''.join(json.dumps(registro, ensure_ascii=False) + '\n'
+                                   for registro in registros).encode('utf-8')
+                if conteudo:
+                    os.write(fd, conteudo)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            if not conteudo:
+                return registros
+            self._pendentes += len(registros)
+            if (self._pendentes >= self.fsync_a_cada
+                    or time.monotonic() - self._ultimo_fsync >= self.fsync_intervalo):
+                self._sincronizar()
+            else:
+                self._agendar_sincronizacao()
+        return registros
+
+    def _sincronizar(self):
+        if self._fd is not None and self._pendentes:
+            os.fsync(self._fd)
+        self._pendentes = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def _agendar_sincronizacao(self):
+        # Garante o fsync dos últimos registros mesmo sem novas escritas
+        if self._sincronizador is None or not self._sincronizador.is_alive():
+            self._sincronizador = threading.Timer(self.fsync_intervalo, self.sincronizar)
+            self._sincronizador.daemon = True
+            self._sincronizador.start()
+
+    def sincronizar(self):
+        """Força o fsync dos registros pendentes"""
+        with self._lock:
+            self._sincronizar()
+
+    def fechar(self):
+        with self._lock:
+            self._sincronizar()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def tamanho(self):
+        try:
+            return os.path.getsize(self.caminho)
+        except OSError:
+            return 0
+
+    def ler(self, desde=0):
+        """Gera (registro, offset_fim) a partir do offset, em streaming
+
+        Uma última linha incompleta (escrita em andamento) é ignorada; o
+        offset retornado aponta sempre para o fim de uma linha completa.
+        """
+        try:
+            f = open(self.caminho, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(desde)
+            offset = desde
+            for linha in f:
+                if not linha.endswith(b'\n'):
+                    break
+                offset += len(linha)
+                try:
+                    yield json.loads(linha), offset
+                except json.JSONDecodeError as e:
+                    logger.error(f"Linha inválida no log {self.caminho} (offset {offset}): {e}")
+
+
+def ler_snapshot(caminho):
+    """Lê o snapshot do placar ({'offset', 'ranking', 'total', 'agregados', 'participantes', 'quiz_ids'})"""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error(f"Erro ao ler snapshot {caminho}: {e}")
+    return {'offset': 0, 'ranking': [], 'total': 0}
+
+
+def compactar(caminho_log, caminho_snapshot, k):
+    """Reconstrói o snapshot do placar a partir do log
+
+    Parte do snapshot anterior e processa apenas o trecho novo do log.
+    Retorna o snapshot gravado.
+    """
+    with open(caminho_snapshot + '.lock', 'a') as arquivo_lock, bloqueio_arquivo(arquivo_lock):
+        snapshot = ler_snapshot(caminho_snapshot)
+        reconstruir = any(snapshot.get(chave) is None for chave in ('agregados', 'participantes', 'quiz_ids'))
+        if reconstruir:
+            # Snapshot de uma versão anterior (sem estatísticas, índice ou quiz_ids): reconstrói desde o início do log
+            snapshot = {'offset': 0, 'ranking': [], 'total': 0, 'agregados': None, 'participantes': None,
+                        'quiz_ids': []}
+        placar = Placar(k, snapshot['ranking'])
+        agregados = Agregados(snapshot['agregados'])
+        participantes = IndiceParticipantes(snapshot['participantes'])
+        quiz_ids = snapshot['quiz_ids']
+        offset, total = snapshot['offset'], snapshot['total']
+        for registro, offset in LogAppend(caminho_log).ler(offset):
+            placar.inserir(registro)
+            agregados.adicionar(registro)
+            participantes.adicionar(registro)
+            if registro.get('quiz_id'):
+                quiz_ids.append(registro['quiz_id'])
+            total += 1
+
+        # quiz_ids: ponto de partida da verificação de repetições (sem reler o log inteiro)
+        novo = {'offset': offset, 'ranking': placar.itens(), 'total': total, 'agregados': agregados.para_dict(),
+                'participantes': participantes.para_dict(), 'quiz_ids': quiz_ids}
+        if offset != snapshot['offset'] or reconstruir:
+            gravar_atomico(caminho_snapshot, json.dumps(novo, ensure_ascii=False).encode('utf-8'))
+        return novo
+
+
+def exportar_csv(caminho_log, saida):
+    """Exporta o histórico completo do log para CSV"""
+    campos = ['data_hora', 'participante', 'pontuacao', 'acertos', 'total_perguntas', 'quiz_id']
+    total = 0
+    with open(saida, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=campos, extrasaction='ignore')
+        escritor.writeheader()
+        for registro, _ in LogAppend(caminho_log).ler():
+            escritor.writerow(registro)
+            total += 1
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manutenção do log de resultados do Quiz')
+    parser.add_argument('comando', choices=['compactar', 'exportar'])
+    parser.add_argument('--log', default=os.environ.get('RANKING_LOG', 'resultados.log'))
+    parser.add_argument('--snapshot', default=os.environ.get('RANKING_SNAPSHOT', 'ranking_snapshot.json'))
+    parser.add_argument('--k', type=int, default=int(os.environ.get('RANKING_TOP_K', 100)))
+    parser.add_argument('--saida', default='resultados.csv')
+    args = parser.parse_args(argv)
+
+    if args.comando == 'compactar':
+        inicio = time.perf_counter()
+        snapshot = compactar(args.log, args.snapshot, args.k)
+        print(f"✅ Snapshot gravado em {args.snapshot}: {snapshot['total']} resultados no log, "
+              f"{len(snapshot['ranking'])} no placar ({time.perf_counter() - inicio:.2f}s)")
+    else:
+        total = exportar_csv(args.log, args.saida)
+        print(f"✅ {total} resultados exportados para {args.saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Limite de requisições (token bucket) para as rotas de escrita do Quiz
+
+Cada chave (IP ou quiz em andamento) tem um balde com `rajada` fichas que
+se recarrega a `taxa` fichas por segundo; cada requisição consome uma. Há
+dois backends: memória (um único worker) e SQLite, compartilhado pelos
+workers do host, para que o limite não seja multiplicado pelo número de
+processos do gunicorn.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from armazenamento import BancoSQLite
+
+logger = logging.getLogger(__name__)
+
+
+class Balde:
+    """Parâmetros de um token bucket: capacidade (rajada) e recarga (fichas/s)"""
+
+    __slots__ = ('rajada', 'taxa')
+
+    def __init__(self, rajada, taxa):
+        self.rajada = rajada
+        self.taxa = taxa
+
+    def consumir(self, fichas, atualizado, agora):
+        """Recarrega e tenta consumir uma ficha: (permitido, fichas restantes, espera em s)"""
+        fichas = min(self.rajada, fichas + (agora - atualizado) * self.taxa)
+        if fichas >= 1:
+            return True, fichas - 1, 0.0
+        return False, fichas, (1 - fichas) / self.taxa
+
+
+class LimiteTaxa:
+    """Interface comum dos backends de limite"""
+
+    def permitir(self, chave, balde):
+        """(permitido, segundos até a próxima ficha) para a chave"""
+        raise NotImplementedError
+
+
+class MemoriaLimiteTaxa(LimiteTaxa):
+    """Baldes em memória (LRU limitado; apenas um worker)"""
+
+    def __init__(self, capacidade=10000):
+        self.capacidade = capacidade
+        self._lock = threading.Lock()
+        self._baldes = OrderedDict()
+
+    def permitir(self, chave, balde):
+        agora = time.monotonic()
+        with self._lock:
+            fichas, atualizado = self._baldes.get(chave, (balde.rajada, agora))
+            permitido, fichas, espera = balde.consumir(fichas, atualizado, agora)
+            self._baldes[chave] = (fichas, agora)
+            self._baldes.move_to_end(chave)
+            while len(self._baldes) > self.capacidade:
+                self._baldes.popitem(last=False)
+        return permitido, espera
+
+
+class SQLiteLimiteTaxa(BancoSQLite, LimiteTaxa):
+    """Baldes em SQLite (WAL), compartilhados pelos workers do host"""
+
+    # A cada N consultas, remove os baldes parados há mais de LIMPEZA_S (já estariam cheios)
+    LIMPEZA_A_CADA = 1000
+    LIMPEZA_S = 3600
+
+    def __init__(self, caminho):
+        super().__init__(caminho)
+        self._consultas = 0
+        with self._transacao() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS baldes (
+                    chave TEXT PRIMARY KEY,
+                    fichas REAL NOT NULL,
+                    atualizado REAL NOT NULL
+                )
+            ''')
+
+    def permitir(self, chave, balde):
+        agora = time.time()
+        with self._transacao() as conn:
+            linha = conn.execute('SELECT fichas, atualizado FROM baldes WHERE chave = ?', (chave,)).fetchone()
+            fichas, atualizado = linha if linha else (balde.rajada, agora)
+            permitido, fichas, espera = balde.consumir(fichas, atualizado, agora)
+            conn.execute(
+                'INSERT INTO baldes (chave, fichas, atualizado) VALUES (?, ?, ?) '
+                'ON CONFLICT (chave) DO UPDATE SET fichas = excluded.fichas, atualizado = excluded.atualizado',
+                (chave, fichas, agora)
+            )
+        self._consultas += 1
+        if self._consultas % self.LIMPEZA_A_CADA == 0:
+            self._conexao().execute('DELETE FROM baldes WHERE atualizado < ?', (agora - self.LIMPEZA_S,))
+        return permitido, espera
+
+
+def criar_limite_taxa(backend=None):
+    """Cria o backend de limite configurado; None desliga o limite"""
+    backend = backend or os.environ.get('LIMITE_BACKEND', 'sqlite')
+    if backend == 'desligado':
+        return None
+    if backend == 'memoria':
+        return MemoriaLimiteTaxa(capacidade=int(os.environ.get('LIMITE_CAPACIDADE', 10000)))
+    if backend == 'sqlite':
+        return SQLiteLimiteTaxa(os.environ.get('LIMITE_DB', 'limites.db'))
+    raise ValueError(f"Backend de limite desconhecido: {backend}")
@@ -0,0 +1,236 @@
+"""
+Métricas do Quiz no formato texto do Prometheus
+
+Registro mínimo (sem dependências) de contadores, histogramas e medidores
+calculados na hora da coleta. Cada processo mantém suas próprias métricas:
+com vários workers do gunicorn, cada coleta de /metrics reflete o worker
+que atendeu a requisição (use o rótulo `instance` do Prometheus ou colete
+com um único worker para agregar).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Limites (segundos) dos histogramas de latência
+LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _formatar_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def cabecalho(self):
+        return [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}']
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores = {}
+
+    def incrementar(self, *valores_rotulos, valor=1):
+        with self._lock:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + valor
+
+    def linhas(self):
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [f'{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}'
+                for chave, valor in itens]
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(limites)
+        self._series = {}
+
+    def observar(self, valor, *valores_rotulos):
+        # Contagem por faixa (não cumulativa); a soma cumulativa é feita na coleta
+        faixa = bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][faixa] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def cronometrar(self, *valores_rotulos):
+        """Gerenciador de contexto que observa a duração do bloco"""
+        return _Cronometro(self, valores_rotulos)
+
+    def linhas(self):
+        with self._lock:
+            series = sorted((chave, (list(faixas), soma, total))
+                            for chave, (faixas, soma, total) in self._series.items())
+        linhas = []
+        for chave, (faixas, soma, total) in series:
+            acumulado = 0
+            for limite, quantidade in zip(self.limites + (float('inf'),), faixas):
+                acumulado += quantidade
+                rotulos = _formatar_rotulos(self.rotulos, chave, f'le="{_formatar_numero(limite)}"')
+                linhas.append(f'{self.nome}_bucket{rotulos} {acumulado}')
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f'{self.nome}_sum{rotulos} {_formatar_numero(soma)}')
+            linhas.append(f'{self.nome}_count{rotulos} {total}')
+        return linhas
+
+
+class _Cronometro:
+    def __init__(self, histograma, valores_rotulos):
+        self.histograma = histograma
+        self.valores_rotulos = valores_rotulos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self.histograma.observar(time.perf_counter() - self.inicio, *self.valores_rotulos)
+        return False
+
+
+class Medidor(Contador):
+    """Valor definido explicitamente (ex.: durações medidas uma única vez)"""
+    tipo = 'gauge'
+
+    def definir(self, valor, *valores_rotulos):
+        with self._lock:
+            self._valores[valores_rotulos] = valor
+
+
+class MedidorColetado(Metrica):
+    """Medidor (ou contador) cujo valor é lido de funções na hora da coleta"""
+
+    def __init__(self, nome, ajuda, rotulos=(), tipo='gauge'):
+        super().__init__(nome, ajuda, rotulos)
+        self.tipo = tipo
+        self._fontes = []
+
+    def adicionar_fonte(self, funcao, *valores_rotulos):
+        with self._lock:
+            self._fontes.append((valores_rotulos, funcao))
+
+    def linhas(self):
+        with self._lock:
+            fontes = list(self._fontes)
+        linhas = []
+        for chave, funcao in fontes:
+            try:
+                valor = funcao()
+            except Exception:
+                # Uma fonte indisponível não derruba a coleta das demais
+                continue
+            linhas.append(f'{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}')
+        return linhas
+
+
+class Registro:
+    """Conjunto de métricas expostas em /metrics"""
+
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        linhas = []
+        for metrica in self._metricas:
+            corpo = metrica.linhas()
+            if corpo:
+                linhas.extend(metrica.cabecalho())
+                linhas.extend(corpo)
+        return '\n'.join(linhas) + '\n'
+
+
+def instrumentar(objeto, metodos, histograma, *valores_rotulos):
+    """Substitui métodos da instância por versões cronometradas (rótulo = nome do método)"""
+    for nome in metodos:
+        original = getattr(objeto, nome)
+
+        def cronometrado(*args, _original=original, _nome=nome, **kwargs):
+            with histograma.cronometrar(*valores_rotulos, _nome):
+                return _original(*args, **kwargs)
+
+        setattr(objeto, nome, cronometrado)
+
+
+registro = Registro()
+
+REQUISICOES = registro.registrar(Histograma(
+    'quiz_requisicao_segundos', 'Latência das requisições por endpoint',
+    ('endpoint', 'metodo', 'status')
+))
+RANKING_OPERACOES = registro.registrar(Histograma(
+    'quiz_ranking_operacao_segundos', 'Duração das operações no armazenamento do ranking',
+    ('quiz', 'operacao')
+))
+QUIZZES_INICIADOS = registro.registrar(Contador(
+    'quiz_iniciados_total', 'Quizzes iniciados', ('quiz',)
+))
+QUIZZES_FINALIZADOS = registro.registrar(Contador(
+    'quiz_finalizados_total', 'Quizzes finalizados e gravados no ranking', ('quiz',)
+))
+REQUISICOES_LIMITADAS = registro.registrar(Contador(
+    'quiz_requisicoes_limitadas_total', 'Requisições recusadas pelo limite de taxa (429)', ('grupo',)
+))
+CACHE_ACERTOS = registro.registrar(MedidorColetado(
+    'quiz_ranking_cache_acertos_total', 'Leituras do ranking atendidas pelo cache', ('quiz',), tipo='counter'
+))
+CACHE_FALHAS = registro.registrar(MedidorColetado(
+    'quiz_ranking_cache_falhas_total', 'Leituras do ranking que recarregaram o placar', ('quiz',), tipo='counter'
+))
+SESSOES_ATIVAS = registro.registrar(MedidorColetado(
+    'quiz_sessoes_ativas', 'Quizzes em andamento (sessões não expiradas)'
+))
+ESPECTADORES = registro.registrar(MedidorColetado(
+    'quiz_ranking_espectadores', 'Conexões abertas no ranking ao vivo', ('quiz',)
+))
+ADMISSAO_LIMITE = registro.registrar(MedidorColetado(
+    'quiz_admissao_limite', 'Limite atual de quizzes em andamento (ajustado pela latência)'
+))
+ADMISSAO_FILA = registro.registrar(MedidorColetado(
+    'quiz_admissao_fila', 'Tickets aguardando na sala de espera'
+))
+INICIOS_ENFILEIRADOS = registro.registrar(Contador(
+    'quiz_inicios_enfileirados_total', 'Inícios de quiz enviados para a sala de espera (503)', ('quiz',)
+))
+INICIALIZACAO = registro.registrar(Medidor(
+    'quiz_inicializacao_segundos', 'Duração de cada etapa do aquecimento do worker', ('etapa',)
+))
+WORKER = registro.registrar(MedidorColetado(
+    'quiz_worker_pid', 'PID do worker que atendeu esta coleta (separa as métricas de cada worker)'
+))
+WORKER.adicionar_fonte(os.getpid)
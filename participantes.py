@@ -0,0 +1,75 @@
+"""
+Índice de participantes pelo nome normalizado
+
+O ranking guarda uma linha por tentativa, e um mesmo participante pode
+jogar várias vezes. O índice agrupa as tentativas pelo nome sem acentos,
+maiúsculas ou espaços repetidos ("José  Silva" e "jose silva" são a mesma
+pessoa) e é atualizado a cada resultado gravado: a consulta de um
+participante é um acesso ao dicionário, e o ranking com a melhor tentativa
+de cada um sai do índice, sem deduplicar a lista inteira a cada requisição.
+"""
+
+import unicodedata
+
+from placar import Placar, chave_ordenacao
+
+
+def normalizar_nome(nome):
+    """Chave do participante: sem acentos, sem diferença de maiúsculas e com espaços simples"""
+    decomposto = unicodedata.normalize('NFKD', nome or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.casefold().split())
+
+
+class IndiceParticipantes:
+    """Quantidade de tentativas e melhor resultado de cada participante"""
+
+    __slots__ = ('_participantes',)
+
+    def __init__(self, dados=None):
+        # Nome normalizado -> [tentativas, melhor resultado]
+        self._participantes = {
+            nome: [entrada['tentativas'], entrada['melhor']] for nome, entrada in (dados or {}).items()
+        }
+
+    @classmethod
+    def de_resultados(cls, resultados):
+        indice = cls()
+        for resultado in resultados:
+            indice.adicionar(resultado)
+        return indice
+
+    def adicionar(self, resultado):
+        """Conta uma tentativa; retorna True se ela passou a ser a melhor do participante"""
+        nome = normalizar_nome(resultado.get('participante'))
+        entrada = self._participantes.get(nome)
+        if entrada is None:
+            self._participantes[nome] = [1, resultado]
+            return True
+        entrada[0] += 1
+        # Em empate total, a tentativa mais antiga continua sendo a melhor
+        if chave_ordenacao(resultado) < chave_ordenacao(entrada[1]):
+            entrada[1] = resultado
+            return True
+        return False
+
+    def obter(self, nome):
+        """{'tentativas', 'melhor'} do participante, ou None"""
+        entrada = self._participantes.get(normalizar_nome(nome))
+        if entrada is None:
+            return None
+        return {'tentativas': entrada[0], 'melhor': entrada[1]}
+
+    def melhores(self, k):
+        """Ranking com a melhor tentativa de cada participante (top-K)"""
+        return Placar(k, (entrada[1] for entrada in self._participantes.values())).itens()
+
+    def para_dict(self):
+        """Forma persistida (JSON)"""
+        return {
+            nome: {'tentativas': tentativas, 'melhor': melhor}
+            for nome, (tentativas, melhor) in self._participantes.items()
+        }
+
+    def __len__(self):
+        return len(self._participantes)
@@ -0,0 +1,73 @@
+"""
+Placar (leaderboard) com os K melhores resultados
+
+Mantém os resultados ordenados de forma incremental: cada inserção faz uma
+busca binária (O(log K) comparações) na lista de chaves, em vez de reordenar
+o ranking inteiro a cada quiz finalizado.
+"""
+
+from bisect import bisect_right
+
+# Duração atribuída a resultados antigos, gravados antes da medição no servidor
+SEM_DURACAO = 1e9
+
+
+def duracao(resultado):
+    """Duração do quiz em segundos (SEM_DURACAO quando não medida)"""
+    valor = resultado.get('duracao_segundos')
+    return SEM_DURACAO if valor is None else valor
+
+
+def chave_ordenacao(resultado):
+    """Chave de desempate determinística do ranking
+
+    Maior pontuação primeiro, depois mais acertos, depois o quiz mais
+    rápido e, por fim, quem terminou antes.
+    """
+    return (
+        -resultado.get('pontuacao', 0),
+        -resultado.get('acertos', 0),
+        duracao(resultado),
+        resultado.get('data_hora') or '',
+    )
+
+
+class Placar:
+    """Lista ordenada e limitada aos K melhores resultados"""
+
+    def __init__(self, k=100, resultados=()):
+        if k is not None and k <= 0:
+            raise ValueError("k deve ser positivo")
+        self.k = k
+        self._chaves = []
+        self._itens = []
+        for resultado in resultados:
+            self.inserir(resultado)
+
+    def inserir(self, resultado):
+        """Insere um resultado e retorna sua posição (0 = primeiro)
+
+        Retorna None quando o resultado não entra no top-K.
+        """
+        chave = chave_ordenacao(resultado)
+        # bisect_right: em empate total, quem chegou antes fica na frente
+        posicao = bisect_right(self._chaves, chave)
+        if self.k is not None and posicao >= self.k:
+            return None
+
+        self._chaves.insert(posicao, chave)
+        self._itens.insert(posicao, resultado)
+        if self.k is not None and len(self._itens) > self.k:
+            self._chaves.pop()
+            self._itens.pop()
+        return posicao
+
+    def itens(self):
+        """Cópia da lista ordenada de resultados"""
+        return list(self._itens)
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __iter__(self):
+        return iter(self._itens)
@@ -0,0 +1,122 @@
+"""
+Publicação do ranking em arquivos estáticos
+
+Em eventos grandes quase todo o tráfego é leitura do ranking. O publicador
+grava em um diretório o mesmo conteúdo de /api/ranking (ranking.json) e da
+página /ranking (ranking.html), com cópias .gz, para que um proxy na frente
+do app (nginx, CDN) sirva essas leituras sem passar pelo Python.
+
+Cada arquivo é gravado por arquivo temporário + rename: quem lê vê a versão
+anterior ou a nova, nunca uma escrita pela metade. Por último vai o
+versao.json, com o hash do conteúdo publicado. Finalizações próximas são
+agrupadas em uma única publicação; vários workers podem publicar o mesmo
+diretório (um lock de arquivo serializa as gravações e conteúdo repetido não
+é regravado).
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from historico import gravar_atomico
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFESTO = 'versao.json'
+
+
+class PublicadorRanking:
+    """Grava o snapshot estático do ranking quando ele muda"""
+
+    # Sem notificações, verifica a versão periodicamente (resultados gravados por outros workers)
+    VERIFICAR_A_CADA = 5.0
+
+    def __init__(self, diretorio, gerar, intervalo=0.5):
+        """`gerar()` retorna {nome do arquivo: bytes}; `intervalo` é o mínimo entre duas publicações"""
+        self.diretorio = diretorio
+        self.gerar = gerar
+        self.intervalo = intervalo
+        self._acordar = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.publicacoes = 0
+
+    def notificar(self):
+        """Pede uma publicação (chamado quando este worker grava resultados); inicia a thread se preciso"""
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._executar, name='publicacao-ranking', daemon=True)
+                    self._thread.start()
+        self._acordar.set()
+
+    def _executar(self):
+        while True:
+            self._acordar.wait(self.VERIFICAR_A_CADA)
+            self._acordar.clear()
+            try:
+                self.publicar()
+            except Exception as e:
+                logger.error(f"Erro ao publicar o ranking em {self.diretorio}: {e}")
+            # As finalizações que chegarem enquanto isso saem juntas na próxima publicação
+            time.sleep(self.intervalo)
+
+    @contextmanager
+    def _bloqueio(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.diretorio, '.lock'), 'a') as arquivo_lock:
+                fcntl.flock(arquivo_lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(arquivo_lock, fcntl.LOCK_UN)
+
+    def _versao_publicada(self):
+        try:
+            with open(os.path.join(self.diretorio, MANIFESTO), 'r', encoding='utf-8') as f:
+                return json.load(f).get('versao')
+        except (OSError, ValueError):
+            return None
+
+    def publicar(self):
+        """Grava o snapshot atual se ele for diferente do publicado; retorna se gravou"""
+        os.makedirs(self.diretorio, exist_ok=True)
+        # O conteúdo é gerado dentro do lock: o último a gravar tem sempre a versão mais nova
+        with self._bloqueio():
+            arquivos = self.gerar()
+            digest = hashlib.sha256()
+            for nome in sorted(arquivos):
+                digest.update(nome.encode('utf-8'))
+                digest.update(arquivos[nome])
+            versao = digest.hexdigest()[:20]
+            if versao == self._versao_publicada():
+                return False
+
+            for nome, conteudo in arquivos.items():
+                caminho = os.path.join(self.diretorio, nome)
+                gravar_atomico(caminho + '.gz', gzip.compress(conteudo, compresslevel=9, mtime=0))
+                gravar_atomico(caminho, conteudo)
+            manifesto = {
+                'versao': versao,
+                'publicado_em': datetime.now().isoformat(timespec='seconds'),
+                'arquivos': sorted(arquivos)
+            }
+            gravar_atomico(os.path.join(self.diretorio, MANIFESTO),
+                           json.dumps(manifesto, ensure_ascii=False).encode('utf-8'))
+        self.publicacoes += 1
+        logger.debug('Ranking publicado diretorio=%s versao=%s', self.diretorio, versao)
+        return True
@@ -0,0 +1,92 @@
+"""
+Bancos de quizzes: vários quizzes independentes, identificados por slug
+
+Cada quiz é um arquivo `quizzes/<slug>.json` com título, configuração do
+timer/pontuação e a lista de perguntas. Os quizzes são carregados sob
+demanda na primeira requisição e mantidos em memória; cada um recebe seu
+próprio ranking (arquivos separados), para que um evento movimentado não
+dispute escrita com outro.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+
+from catalogo import CatalogoPerguntas
+
+logger = logging.getLogger(__name__)
+
+SLUG_VALIDO = re.compile(r'^[a-z0-9][a-z0-9_-]{0,49}$')
+
+
+class Quiz:
+    """Um quiz: catálogo de perguntas e regras de tempo/pontuação"""
+
+    def __init__(self, slug, titulo, catalogo, tempo_por_pergunta=60, pontos_por_segundo=1.5,
+                 pontos_minimos=10):
+        self.slug = slug
+        self.titulo = titulo
+        self.catalogo = catalogo
+        self.tempo_por_pergunta = tempo_por_pergunta
+        self.pontos_por_segundo = pontos_por_segundo
+        self.pontos_minimos = pontos_minimos
+
+    @classmethod
+    def de_arquivo(cls, slug, caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        tempo = dados.get('tempo_por_pergunta', 60)
+        return cls(
+            slug,
+            dados.get('titulo', slug),
+            CatalogoPerguntas(dados['perguntas'], extras={'tempo_limite': tempo}),
+            tempo_por_pergunta=tempo,
+            pontos_por_segundo=dados.get('pontos_por_segundo', 1.5),
+            pontos_minimos=dados.get('pontos_minimos', 10)
+        )
+
+    def calcular_pontos(self, tempo_restante):
+        """Pontuação de uma resposta correta em função do tempo restante"""
+        tempo_restante = min(max(tempo_restante, 0), self.tempo_por_pergunta)
+        return max(self.pontos_minimos, int(tempo_restante * self.pontos_por_segundo))
+
+
+class BancoQuizzes:
+    """Registro de quizzes carregados sob demanda e mantidos em cache"""
+
+    def __init__(self, diretorio, preparar=None):
+        self.diretorio = diretorio
+        self.preparar = preparar
+        self._lock = threading.Lock()
+        self._quizzes = {}
+
+    def obter(self, slug):
+        """Retorna o quiz do slug (carregando na primeira vez) ou None"""
+        quiz = self._quizzes.get(slug)
+        if quiz is not None:
+            return quiz
+        if not slug or not SLUG_VALIDO.match(slug):
+            return None
+
+        caminho = os.path.join(self.diretorio, f'{slug}.json')
+        if not os.path.exists(caminho):
+            return None
+
+        with self._lock:
+            quiz = self._quizzes.get(slug)
+            if quiz is None:
+                quiz = Quiz.de_arquivo(slug, caminho)
+                if self.preparar:
+                    self.preparar(quiz)
+                self._quizzes[slug] = quiz
+                logger.info(f"Quiz '{slug}' carregado com {len(quiz.catalogo)} perguntas")
+        return quiz
+
+    def slugs(self):
+        """Slugs de todos os quizzes disponíveis no diretório"""
+        return sorted(
+            nome[:-5] for nome in os.listdir(self.diretorio)
+            if nome.endswith('.json') and SLUG_VALIDO.match(nome[:-5])
+        )
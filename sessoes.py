@@ -0,0 +1,158 @@
+"""
+Armazenamento de sessões do quiz no servidor
+
+Com um backend de sessões, o cookie guarda apenas o `quiz_id`, e o estado
+do quiz (EstadoQuiz.codificar()) fica no servidor. O cookie não cresce com
+o tamanho do quiz nem é reescrito a cada resposta. Há dois backends:
+memória (LRU com expiração, para desenvolvimento com um único worker) e
+SQLite (compartilhado pelos workers do gunicorn).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from armazenamento import BancoSQLite
+
+logger = logging.getLogger(__name__)
+
+
+class SessaoStore:
+    """Interface comum dos backends de sessão"""
+
+    def obter(self, chave):
+        """Dados da sessão, ou None se não existir ou tiver expirado"""
+        raise NotImplementedError
+
+    def salvar(self, chave, dados):
+        """Grava os dados e renova a expiração da sessão"""
+        raise NotImplementedError
+
+    def remover(self, chave):
+        raise NotImplementedError
+
+    def limpar_expiradas(self):
+        """Remove as sessões expiradas e retorna quantas foram removidas"""
+        raise NotImplementedError
+
+    def total_ativas(self):
+        raise NotImplementedError
+
+    def iniciar_limpeza(self, intervalo):
+        """Varredura periódica, em segundo plano, das sessões abandonadas"""
+        def executar():
+            while True:
+                time.sleep(intervalo)
+                try:
+                    removidas = self.limpar_expiradas()
+                    if removidas:
+                        logger.info(f"{removidas} sessões expiradas removidas")
+                except Exception as e:
+                    logger.error(f"Erro na limpeza de sessões: {e}")
+
+        threading.Thread(target=executar, name='limpeza-sessoes', daemon=True).start()
+
+
+class MemoriaSessaoStore(SessaoStore):
+    """Sessões em memória com política LRU e expiração (apenas um worker)"""
+
+    def __init__(self, ttl, capacidade=10000):
+        self.ttl = ttl
+        self.capacidade = capacidade
+        self._lock = threading.Lock()
+        self._sessoes = OrderedDict()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._sessoes.get(chave)
+            if item is None:
+                return None
+            dados, expira = item
+            if expira <= time.monotonic():
+                del self._sessoes[chave]
+                return None
+            self._sessoes.move_to_end(chave)
+            return dados
+
+    def salvar(self, chave, dados):
+        with self._lock:
+            self._sessoes[chave] = (dados, time.monotonic() + self.ttl)
+            self._sessoes.move_to_end(chave)
+            while len(self._sessoes) > self.capacidade:
+                self._sessoes.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._sessoes.pop(chave, None)
+
+    def limpar_expiradas(self):
+        agora = time.monotonic()
+        with self._lock:
+            expiradas = [chave for chave, (_, expira) in self._sessoes.items() if expira <= agora]
+            for chave in expiradas:
+                del self._sessoes[chave]
+        return len(expiradas)
+
+    def total_ativas(self):
+        with self._lock:
+            return len(self._sessoes)
+
+
+class SQLiteSessaoStore(BancoSQLite, SessaoStore):
+    """Sessões em SQLite (WAL), visíveis para todos os workers do host"""
+
+    def __init__(self, caminho, ttl):
+        super().__init__(caminho)
+        self.ttl = ttl
+        with self._transacao() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessoes (
+                    chave TEXT PRIMARY KEY,
+                    dados TEXT NOT NULL,
+                    expira REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessoes_expira ON sessoes (expira)')
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            'SELECT dados FROM sessoes WHERE chave = ? AND expira > ?', (chave, time.time())
+        ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def salvar(self, chave, dados):
+        # Instrução única: o SQLite já a executa como uma transação atômica
+        self._conexao().execute(
+            'INSERT INTO sessoes (chave, dados, expira) VALUES (?, ?, ?) '
+            'ON CONFLICT (chave) DO UPDATE SET dados = excluded.dados, expira = excluded.expira',
+            (chave, json.dumps(dados, ensure_ascii=False, separators=(',', ':')), time.time() + self.ttl)
+        )
+
+    def remover(self, chave):
+        self._conexao().execute('DELETE FROM sessoes WHERE chave = ?', (chave,))
+
+    def limpar_expiradas(self):
+        return self._conexao().execute('DELETE FROM sessoes WHERE expira <= ?', (time.time(),)).rowcount
+
+    def total_ativas(self):
+        return self._conexao().execute(
+            'SELECT COUNT(*) FROM sessoes WHERE expira > ?', (time.time(),)
+        ).fetchone()[0]
+
+
+def criar_sessao_store(ttl, backend=None):
+    """Cria o backend de sessões configurado; None mantém o estado no cookie"""
+    backend = backend or os.environ.get('SESSAO_BACKEND', 'sqlite')
+    if backend == 'cookie':
+        return None
+    if backend == 'memoria':
+        store = MemoriaSessaoStore(ttl, capacidade=int(os.environ.get('SESSAO_CAPACIDADE', 10000)))
+    elif backend == 'sqlite':
+        store = SQLiteSessaoStore(os.environ.get('SESSAO_DB', 'sessoes.db'), ttl)
+    else:
+        raise ValueError(f"Backend de sessão desconhecido: {backend}")
+    store.iniciar_limpeza(int(os.environ.get('SESSAO_LIMPEZA_S', 60)))
+    return store
@@ -0,0 +1,440 @@
+// Variáveis globais (valores do servidor vêm dos atributos data-* da tag <script>)
+const CONFIG = document.currentScript.dataset;
+const BASE_URL = CONFIG.baseUrl;
+let timerInterval;
+let tempoLimite = parseInt(CONFIG.tempoPorPergunta, 10);
+let tempoRestante = tempoLimite;
+let perguntaAtual = 0;
+let totalPerguntas = parseInt(CONFIG.totalPerguntas, 10);
+let quizFinalizado = false;
+
+// Aguardar carregamento completo da página
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('🎯 DOM carregado - Sistema de Quiz Medsenior');
+    
+    const inputParticipante = document.getElementById('participante-input');
+    const botaoIniciar = document.getElementById('iniciar-btn');
+    const botaoProxima = document.getElementById('proxima-btn');
+    const erroNome = document.getElementById('erro-nome');
+    
+    // Função para validar nome
+    function validarNome(nome) {
+        if (!nome || nome.trim() === '') {
+            return 'Nome é obrigatório';
+        }
+        
+        const nomeFormatado = nome.trim();
+        const palavras = nomeFormatado.split(/\s+/);
+        
+        if (palavras.length < 2) {
+            return 'Por favor, informe nome e sobrenome';
+        }
+        
+        if (nomeFormatado.length < 5) {
+            return 'Nome muito curto';
+        }
+        
+        if (nomeFormatado.length > 100) {
+            return 'Nome muito longo';
+        }
+        
+        // Verificar se contém apenas letras, espaços e acentos
+        if (!/^[a-zA-ZÀ-ÿ\s]+$/.test(nomeFormatado)) {
+            return 'Nome deve conter apenas letras';
+        }
+        
+        return null; // Nome válido
+    }
+    
+    // Função para atualizar estado do botão
+    function atualizarBotao() {
+        if (inputParticipante && botaoIniciar && erroNome) {
+            const participante = inputParticipante.value;
+            const erro = validarNome(participante);
+            
+            if (erro) {
+                botaoIniciar.disabled = true;
+                botaoIniciar.style.opacity = '0.6';
+                if (participante.trim() !== '') {
+                    erroNome.textContent = erro;
+                    erroNome.style.display = 'block';
+                } else {
+                    erroNome.style.display = 'none';
+                }
+                console.log('❌ Botão desabilitado:', erro);
+            } else {
+                botaoIniciar.disabled = false;
+                botaoIniciar.style.opacity = '1';
+                erroNome.style.display = 'none';
+                console.log('✅ Botão habilitado para:', participante);
+            }
+        }
+    }
+    
+    // Event listeners
+    if (inputParticipante) {
+        inputParticipante.addEventListener('input', atualizarBotao);
+        inputParticipante.addEventListener('blur', atualizarBotao);
+        
+        // Permitir apenas letras, espaços e acentos
+        inputParticipante.addEventListener('keypress', function(e) {
+            const char = String.fromCharCode(e.which);
+            if (!/[a-zA-ZÀ-ÿ\s]/.test(char)) {
+                e.preventDefault();
+            }
+        });
+        
+        // Submeter com Enter
+        inputParticipante.addEventListener('keypress', function(e) {
+            if (e.key === 'Enter' && !botaoIniciar.disabled) {
+                botaoIniciar.click();
+            }
+        });
+    }
+    
+    if (botaoIniciar) {
+        botaoIniciar.addEventListener('click', function(e) {
+            e.preventDefault();
+            console.log('🚀 Iniciando quiz...');
+            
+            const participante = inputParticipante ? inputParticipante.value.trim() : '';
+            const erro = validarNome(participante);
+            
+            if (erro) {
+                erroNome.textContent = erro;
+                erroNome.style.display = 'block';
+                inputParticipante.focus();
+                return;
+            }
+            
+            iniciarQuiz(participante);
+        });
+    }
+    
+    if (botaoProxima) {
+        botaoProxima.addEventListener('click', function() {
+            if (quizFinalizado) {
+                finalizarQuiz();
+            } else {
+                carregarPergunta();
+            }
+        });
+    }
+    
+    // Verificar estado inicial
+    setTimeout(atualizarBotao, 100);
+});
+
+function iniciarQuiz(participante, ticket) {
+    console.log('🎯 Iniciando quiz para:', participante);
+    
+    fetch(BASE_URL + '/iniciar_quiz', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+        body: JSON.stringify({
+            participante: participante,
+            ticket: ticket
+        })
+    })
+    .then(response => {
+        console.log('📡 Status da resposta:', response.status);
+        if (response.status === 503) {
+            // Sala de espera: a resposta traz o ticket e a posição na fila
+            return response.json();
+        }
+        if (!response.ok) {
+            // Mostra a mensagem do servidor (nome inválido, limite de requisições...)
+            return response.json()
+                .catch(() => ({}))
+                .then(data => {
+                    throw new Error(data.erro || `Erro HTTP: ${response.status}`);
+                });
+        }
+        return response.json();
+    })
+    .then(data => {
+        console.log('📦 Resposta do servidor:', data);
+        if (data.fila) {
+            aguardarFila(participante, data);
+            return;
+        }
+        if (data.erro) {
+            throw new Error(data.erro);
+        }
+        if (data.sucesso) {
+            document.getElementById('inicio-quiz').style.display = 'none';
+            document.getElementById('quiz-area').style.display = 'block';
+            carregarPergunta();
+        }
+    })
+    .catch(error => {
+        console.error('❌ Erro ao iniciar quiz:', error);
+        const erroNome = document.getElementById('erro-nome');
+        erroNome.textContent = error.message;
+        erroNome.style.display = 'block';
+        // Re-habilitar o botão em caso de erro
+        document.getElementById('iniciar-btn').disabled = false;
+    });
+}
+
+function aguardarFila(participante, fila) {
+    // Consulta /fila (leve, sem sessão) até haver vaga e então inicia com o mesmo ticket
+    const aviso = document.getElementById('erro-nome');
+    if (fila.posicao) {
+        aviso.textContent = `${fila.mensagem || 'Aguarde um instante.'} Sua posição na fila: ${fila.posicao}.`;
+        aviso.style.display = 'block';
+    }
+    setTimeout(function() {
+        fetch(BASE_URL + '/fila?ticket=' + encodeURIComponent(fila.ticket), { credentials: 'include' })
+        .then(response => response.json())
+        .then(data => {
+            if (data.liberado) {
+                aviso.style.display = 'none';
+                iniciarQuiz(participante, fila.ticket);
+            } else {
+                aguardarFila(participante, Object.assign({}, fila, data));
+            }
+        })
+        .catch(() => aguardarFila(participante, fila));
+    }, (fila.retry_after || 2) * 1000);
+}
+
+function carregarPergunta() {
+    // Sem resposta no corpo: /proximo apenas entrega a pergunta atual
+    fetch(BASE_URL + '/proximo', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+        body: JSON.stringify({})
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`Erro HTTP: ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (data.erro) {
+            throw new Error(data.erro);
+        }
+        
+        if (data.quiz_finalizado) {
+            finalizarQuiz();
+            return;
+        }
+        
+        exibirPergunta(data.proxima);
+    })
+    .catch(error => {
+        console.error('❌ Erro ao carregar pergunta:', error);
+        alert('Erro ao carregar pergunta!');
+    });
+}
+
+function exibirPergunta(data) {
+    console.log('❓ Pergunta carregada:', data);
+    document.getElementById('resultado').style.display = 'none';
+    document.getElementById('alternativas').innerHTML = '';
+    
+    perguntaAtual = data.numero;
+    totalPerguntas = data.total;
+    tempoLimite = data.tempo_limite || tempoLimite;
+    
+    document.getElementById('pergunta-numero').textContent = `Pergunta ${data.numero} de ${data.total}`;
+    document.getElementById('pergunta-texto').textContent = data.pergunta;
+    
+    // Atualizar barra de progresso
+    const progresso = ((data.numero - 1) / data.total) * 100;
+    document.getElementById('progress-bar').style.width = progresso + '%';
+    
+    // Criar alternativas
+    const alternativasDiv = document.getElementById('alternativas');
+    data.alternativas.forEach((alternativa, index) => {
+        const btn = document.createElement('button');
+        btn.className = 'option-button';
+        btn.setAttribute('data-resposta', index);
+        
+        const letra = String.fromCharCode(65 + index);
+        btn.innerHTML = `
+            <span class="option-letter">${letra}</span>
+            ${alternativa}
+        `;
+        
+        btn.addEventListener('click', function() {
+            const resposta = parseInt(this.getAttribute('data-resposta'));
+            responderPergunta(resposta);
+        });
+        
+        alternativasDiv.appendChild(btn);
+    });
+    
+    // Iniciar timer
+    iniciarTimer();
+}
+
+function iniciarTimer() {
+    tempoRestante = tempoLimite;
+    const timerElement = document.getElementById('timer');
+    timerElement.textContent = tempoRestante;
+    timerElement.classList.remove('warning');
+    
+    timerInterval = setInterval(function() {
+        tempoRestante--;
+        timerElement.textContent = tempoRestante;
+        
+        if (tempoRestante <= 10) {
+            timerElement.classList.add('warning');
+        }
+        
+        if (tempoRestante <= 0) {
+            clearInterval(timerInterval);
+            responderPergunta(-1);
+        }
+    }, 1000);
+}
+
+function responderPergunta(resposta) {
+    clearInterval(timerInterval);
+    
+    // Desabilitar botões
+    const botoes = document.querySelectorAll('.option-button');
+    botoes.forEach(btn => btn.disabled = true);
+    
+    // Uma única requisição corrige a resposta e já traz a próxima pergunta
+    fetch(BASE_URL + '/proximo', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+        body: JSON.stringify({
+            resposta: resposta
+        })
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`Erro HTTP: ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (data.erro) {
+            throw new Error(data.erro);
+        }
+        
+        // Atualizar pontuação com animação
+        const pontuacaoElement = document.getElementById('pontuacao-atual');
+        pontuacaoElement.style.transform = 'scale(1.2)';
+        setTimeout(() => {
+            pontuacaoElement.textContent = data.pontuacao_total;
+            pontuacaoElement.style.transform = 'scale(1)';
+        }, 200);
+        
+        // Mostrar resultado
+        mostrarResultado(data, resposta);
+        
+        // O relógio da próxima pergunta começa no servidor após exibir_em_ms
+        if (data.proxima) {
+            setTimeout(() => exibirPergunta(data.proxima), data.exibir_em_ms);
+        }
+    })
+    .catch(error => {
+        console.error('❌ Erro ao responder:', error);
+        alert('Erro ao enviar resposta: ' + error.message);
+        // Re-habilitar botões em caso de erro
+        const botoes = document.querySelectorAll('.option-button');
+        botoes.forEach(btn => btn.disabled = false);
+    });
+}
+
+function mostrarResultado(data, respostaUsuario) {
+    // Destacar alternativas
+    const botoes = document.querySelectorAll('.option-button');
+    botoes.forEach((btn, index) => {
+        if (index === data.resposta_correta) {
+            btn.classList.add('correct');
+        } else if (index === respostaUsuario && !data.acertou) {
+            btn.classList.add('incorrect');
+        }
+    });
+    
+    // Mostrar mensagem de resultado
+    let mensagem = '';
+    let classe = '';
+    
+    if (data.acertou) {
+        mensagem = `
+            <div style="text-align: center;">
+                <i class="fas fa-check-circle" style="font-size: 2rem; margin-bottom: 1rem;"></i>
+                <h5 style="margin-bottom: 1rem;">Correto! 🎉</h5>
+                <p style="font-size: 1.2rem; margin: 0;">Você ganhou <strong>${data.pontos_ganhos} pontos!</strong></p>
+            </div>
+        `;
+        classe = 'alert-success';
+    } else {
+        mensagem = `
+            <div style="text-align: center;">
+                <i class="fas fa-times-circle" style="font-size: 2rem; margin-bottom: 1rem;"></i>
+                <h5 style="margin-bottom: 1rem;">Incorreto 😔</h5>
+                <p style="font-size: 1.2rem; margin: 0;">A resposta correta é: <strong>${data.alternativa_correta}</strong></p>
+            </div>
+        `;
+        classe = 'alert-danger';
+    }
+    
+    const resultadoTexto = document.getElementById('resultado-texto');
+    resultadoTexto.innerHTML = mensagem;
+    resultadoTexto.className = 'result-alert ' + classe;
+    document.getElementById('resultado').style.display = 'block';
+    
+    // A próxima pergunta avança sozinha; o botão só aparece para finalizar
+    const proximaBtn = document.getElementById('proxima-btn');
+    if (data.quiz_finalizado) {
+        proximaBtn.innerHTML = '<i class="fas fa-flag-checkered me-2"></i> Finalizar Quiz';
+        proximaBtn.style.display = '';
+        quizFinalizado = true;
+    } else {
+        proximaBtn.style.display = 'none';
+    }
+}
+
+function finalizarQuiz() {
+    fetch(BASE_URL + '/finalizar_quiz', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+        body: JSON.stringify({})
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`Erro HTTP: ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (data.erro) {
+            throw new Error(data.erro);
+        }
+        
+        document.getElementById('quiz-area').style.display = 'none';
+        document.getElementById('pontuacao-final').textContent = data.pontuacao_final;
+        document.getElementById('acertos-texto').textContent = `${data.acertos} acertos de ${data.total_perguntas} perguntas`;
+        document.getElementById('quiz-finalizado').style.display = 'block';
+        
+        // Atualizar barra de progresso para 100%
+        document.getElementById('progress-bar').style.width = '100%';
+        
+        console.log('🏆 Quiz finalizado com sucesso!');
+    })
+    .catch(error => {
+        console.error('❌ Erro ao finalizar:', error);
+        alert('Erro ao finalizar quiz: ' + error.message);
+    });
+}
@@ -0,0 +1,118 @@
+// Ranking ao vivo: recebe um snapshot inicial e depois apenas as alterações
+(function() {
+    // URL da API do quiz: atributo data-api-url da tag <script>
+    const API_URL = document.currentScript.dataset.apiUrl;
+    // 'melhores': só a melhor tentativa de cada participante (os deltas do stream são de todas)
+    const MELHORES = document.currentScript.dataset.modo === 'melhores';
+    if (!window.EventSource) {
+        return;
+    }
+    
+    const tabela = document.querySelector('.ranking-table');
+    let itens = [];
+    
+    function escapar(texto) {
+        const div = document.createElement('div');
+        div.textContent = texto == null ? '' : String(texto);
+        return div.innerHTML;
+    }
+    
+    function renderizarItem(item) {
+        const r = item.resultado;
+        const classes = {1: 'first-place', 2: 'second-place', 3: 'third-place'};
+        const icones = {1: 'fa-crown', 2: 'fa-medal', 3: 'fa-award'};
+        const badge = icones[item.posicao] ? `<i class="fas ${icones[item.posicao]}"></i>` : item.posicao;
+        const percentual = r.acertos > 0 ? ` (${(r.acertos / r.total_perguntas * 100).toFixed(1)}%)` : '';
+        return `
+            <div class="ranking-item ${classes[item.posicao] || ''}">
+                <div class="position-badge">${badge}</div>
+                <div class="participant-info">
+                    <div class="participant-name">${escapar(r.participante)}</div>
+                    <div class="participant-stats">${r.acertos}/${r.total_perguntas} acertos${percentual}</div>
+                </div>
+                <div class="score-display">
+                    <div class="score-value">${r.pontuacao}</div>
+                    <div class="score-label">pontos</div>
+                </div>
+            </div>
+        `;
+    }
+    
+    function renderizar() {
+        if (tabela) {
+            tabela.innerHTML = itens.map(renderizarItem).join('');
+        }
+    }
+    
+    function atualizarEstatisticas() {
+        // Números já calculados pelo servidor (cobrem todos os resultados, não só o top-K)
+        fetch(API_URL + '/ranking/stats')
+            .then(resposta => resposta.ok ? resposta.json() : null)
+            .then(stats => {
+                if (!stats) {
+                    return;
+                }
+                const valores = {
+                    'stat-participantes': stats.participantes,
+                    'stat-maior-pontuacao': stats.maior_pontuacao,
+                    'stat-taxa-acerto': stats.taxa_acerto.toFixed(1) + '%',
+                    'stat-media-pontuacao': stats.media_pontuacao.toFixed(0)
+                };
+                Object.entries(valores).forEach(([id, valor]) => {
+                    const elemento = document.getElementById(id);
+                    if (elemento) {
+                        elemento.textContent = valor;
+                    }
+                });
+            })
+            .catch(() => {});
+    }
+    
+    const fonte = new EventSource(API_URL + '/ranking/stream');
+    
+    function atualizarMelhores() {
+        // Lista já deduplicada pelo servidor, calculada uma vez por versão do ranking
+        fetch(API_URL + '/ranking?modo=melhores')
+            .then(resposta => resposta.ok ? resposta.json() : null)
+            .then(resultados => {
+                if (!resultados) {
+                    return;
+                }
+                itens = resultados.map((resultado, i) => ({posicao: i + 1, resultado: resultado}));
+                renderizar();
+            })
+            .catch(() => {});
+    }
+    
+    fonte.addEventListener('snapshot', function(e) {
+        if (!MELHORES) {
+            itens = JSON.parse(e.data);
+            renderizar();
+        }
+    });
+    
+    fonte.addEventListener('delta', function(e) {
+        if (!tabela) {
+            // Primeiro resultado: a página ainda está no estado "sem resultados"
+            location.reload();
+            return;
+        }
+        if (MELHORES) {
+            // O delta só avisa que o ranking mudou
+            atualizarMelhores();
+            atualizarEstatisticas();
+            return;
+        }
+        const delta = JSON.parse(e.data);
+        const descartados = new Set(delta.removidos.concat(delta.novos.map(n => n.id)));
+        itens = itens.filter(item => !descartados.has(item.id));
+        itens.forEach(item => {
+            if (item.id in delta.movidos) {
+                item.posicao = delta.movidos[item.id];
+            }
+        });
+        itens = itens.concat(delta.novos).sort((a, b) => a.posicao - b.posicao);
+        renderizar();
+        atualizarEstatisticas();
+    });
+})();
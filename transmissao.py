@@ -0,0 +1,128 @@
+"""
+Transmissão do ranking ao vivo via Server-Sent Events
+
+Uma única thread por worker observa a versão do ranking (consulta barata ao
+armazenamento compartilhado, então resultados gravados por outros workers
+também são percebidos) e, quando ela muda, calcula apenas as diferenças em
+relação ao placar anterior. O evento é serializado uma vez e entregue a
+todas as conexões abertas, de modo que cada espectador custa só um
+`queue.put` por atualização.
+"""
+
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def identificador(resultado):
+    """Identidade estável de um resultado no placar"""
+    return resultado.get('quiz_id') or f"{resultado.get('participante')}|{resultado.get('data_hora')}"
+
+
+def formatar_evento(nome, dados):
+    """Serializa um evento no formato text/event-stream"""
+    return f"event: {nome}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+def calcular_delta(anterior, atual):
+    """Diferenças entre dois placares ordenados (posições começam em 1)"""
+    posicoes_anteriores = {identificador(r): i for i, r in enumerate(anterior, 1)}
+    novos, movidos = [], {}
+    ids_atuais = set()
+    for posicao, resultado in enumerate(atual, 1):
+        rid = identificador(resultado)
+        ids_atuais.add(rid)
+        if rid not in posicoes_anteriores:
+            novos.append({'id': rid, 'posicao': posicao, 'resultado': resultado})
+        elif posicoes_anteriores[rid] != posicao:
+            movidos[rid] = posicao
+    removidos = [rid for rid in posicoes_anteriores if rid not in ids_atuais]
+    return {'novos': novos, 'movidos': movidos, 'removidos': removidos}
+
+
+class TransmissorRanking:
+    """Distribui deltas do ranking para os assinantes do stream SSE"""
+
+    def __init__(self, obter_ranking, intervalo=1.0, tamanho_fila=50):
+        self.obter_ranking = obter_ranking
+        self.intervalo = intervalo
+        self.tamanho_fila = tamanho_fila
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._assinantes = set()
+        self._ultimo = None
+        self._thread = None
+
+    def assinar(self, fila=None):
+        """Registra um assinante e retorna (fila, snapshot inicial)
+
+        O snapshot é o mesmo placar usado como base do próximo delta, então
+        o cliente pode aplicar os deltas seguintes sem lacunas. A fila pode
+        ser fornecida pelo chamador (qualquer objeto com put_nowait/get_nowait
+        que sinalize queue.Full), como no modo ASGI.
+        """
+        if fila is None:
+            fila = queue.Queue(maxsize=self.tamanho_fila)
+        with self._lock:
+            if self._ultimo is None:
+                self._ultimo = self.obter_ranking()
+            self._assinantes.add(fila)
+            snapshot = [{'id': identificador(r), 'posicao': i, 'resultado': r}
+                        for i, r in enumerate(self._ultimo, 1)]
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name='transmissao-ranking', daemon=True)
+                self._thread.start()
+        return fila, snapshot
+
+    def cancelar(self, fila):
+        with self._lock:
+            self._assinantes.discard(fila)
+
+    def notificar(self):
+        """Antecipa a verificação (chamado quando este worker grava um resultado)"""
+        self._acordar.set()
+
+    def total_assinantes(self):
+        with self._lock:
+            return len(self._assinantes)
+
+    def _executar(self):
+        while True:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            try:
+                self._verificar()
+            except Exception as e:
+                logger.error(f"Erro na transmissão do ranking: {e}")
+
+    def _verificar(self):
+        with self._lock:
+            if not self._assinantes:
+                # Sem espectadores: a base é refeita no próximo assinar()
+                self._ultimo = None
+                return
+            anterior = self._ultimo
+        atual = self.obter_ranking()
+        if atual is anterior:
+            return
+
+        delta = calcular_delta(anterior, atual)
+        with self._lock:
+            self._ultimo = atual
+            if not any(delta.values()):
+                return
+            evento = formatar_evento('delta', delta)
+            for fila in list(self._assinantes):
+                try:
+                    fila.put_nowait(evento)
+                except queue.Full:
+                    # Cliente lento demais: encerra o stream; ao reconectar recebe um snapshot novo
+                    self._assinantes.discard(fila)
+                    try:
+                        fila.get_nowait()
+                    except queue.Empty:
+                        pass
+                    fila.put_nowait(None)
@@ -30,7 +30,7 @@ def check_render_yaml():
         'type: web',
         'runtime: python3',
         'buildCommand: pip install -r requirements_deploy.txt',
-        'gunicorn app:app',
+        "gunicorn 'app:criar_app()'",
         'SECRET_KEY'
     ]
     
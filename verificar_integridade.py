@@ -29,7 +29,9 @@ def test_app_creation():
     print("🔍 Testando criação do app...")
     try:
         import app
-        print("✅ App Flask criado com sucesso")
+        # Mesma fábrica usada pelo servidor: inclui o aquecimento (quizzes, ranking, templates)
+        app.criar_app()
+        print("✅ App Flask criado e aquecido com sucesso")
         return True
     except Exception as e:
         print(f"❌ Erro ao criar app: {e}")
@@ -42,33 +44,26 @@ def test_quiz_data():
     try:
         import app
         
-        # Verificar se existem participantes
-        if not app.PARTICIPANTES:
-            print("❌ Lista de participantes está vazia")
-            return False
-        print(f"✅ {len(app.PARTICIPANTES)} participantes carregados")
-        
-        # Verificar se existem perguntas
-        if not app.PERGUNTAS:
+        # O catálogo já valida os campos obrigatórios ao carregar o arquivo
+        if not len(app.PERGUNTAS):
             print("❌ Lista de perguntas está vazia")
             return False
         print(f"✅ {len(app.PERGUNTAS)} perguntas carregadas")
         
         # Verificar estrutura das perguntas
         for i, pergunta in enumerate(app.PERGUNTAS):
-            required_keys = ['pergunta', 'alternativas', 'resposta_correta']
-            for key in required_keys:
-                if key not in pergunta:
-                    print(f"❌ Pergunta {i+1} não tem o campo '{key}'")
-                    return False
-            
-            if len(pergunta['alternativas']) != 5:
-                print(f"❌ Pergunta {i+1} não tem exatamente 5 alternativas")
+            if len(pergunta.alternativas) < 2:
+                print(f"❌ Pergunta {i+1} tem menos de 2 alternativas")
                 return False
             
-            if not (0 <= pergunta['resposta_correta'] < 5):
+            if not (0 <= pergunta.resposta_correta < len(pergunta.alternativas)):
                 print(f"❌ Pergunta {i+1} tem resposta_correta inválida")
                 return False
+            
+            # O payload enviado ao cliente nunca pode conter a resposta
+            if b'resposta_correta' in pergunta.payload:
+                print(f"❌ Pergunta {i+1} expõe a resposta correta no payload")
+                return False
         
         print("✅ Estrutura dos dados do quiz está correta")
         return True
@@ -78,21 +73,33 @@ def test_quiz_data():
         return False
 
 def test_ranking_file():
-    """Testa se o arquivo de ranking pode ser lido/escrito"""
+    """Testa se o ranking pode ser lido e gravado"""
     print("🔍 Testando sistema de ranking...")
     try:
+        import tempfile
         import app
+        from armazenamento import criar_ranking_store
         
         # Testar carregamento
         ranking = app.carregar_ranking()
         print(f"✅ Ranking carregado: {len(ranking)} registros")
         
-        # Testar salvamento (backup)
-        test_data = [{"test": "data"}]
-        app.salvar_ranking(test_data)
-        
-        # Restaurar dados originais
-        app.salvar_ranking(ranking)
+        # Testar gravação em um armazenamento temporário (o ranking real não é alterado)
+        diretorio_atual = os.getcwd()
+        with tempfile.TemporaryDirectory() as diretorio:
+            os.chdir(diretorio)
+            try:
+                store = criar_ranking_store()
+                store.adicionar({'participante': 'Teste Integridade', 'pontuacao': 1, 'acertos': 1,
+                                 'data_hora': '2000-01-01T00:00:00', 'quiz_id': 'teste'})
+                # Com RANKING_ESCRITA_ADIADA=1 o resultado fica pendente até o lote ser gravado
+                if hasattr(store, 'descarregar'):
+                    store.descarregar()
+                if len(store.listar()) != 1:
+                    print("❌ Resultado gravado não foi encontrado no ranking")
+                    return False
+            finally:
+                os.chdir(diretorio_atual)
         print("✅ Sistema de ranking funcionando")
         return True
         
@@ -100,6 +107,64 @@ def test_ranking_file():
         print(f"❌ Erro no sistema de ranking: {e}")
         return False
 
+def test_finalizar_repetido_fora_do_top_k():
+    """Testa que uma repetição de /finalizar_quiz encontra um resultado que saiu do top-K"""
+    print("🔍 Testando repetição de /finalizar_quiz fora do top-K...")
+    try:
+        import tempfile
+        import types
+        import app
+        from armazenamento import JSONRankingStore
+        
+        with tempfile.TemporaryDirectory() as diretorio:
+            # O backend JSON guarda só o top-K no arquivo principal
+            store = JSONRankingStore(os.path.join(diretorio, 'ranking.json'),
+                                     os.path.join(diretorio, 'ranking_backup.json'), limite=1)
+            for quiz_id, pontuacao in (('primeiro', 10), ('segundo', 20), ('terceiro', 30)):
+                store.adicionar({'participante': 'Teste Integridade', 'pontuacao': pontuacao, 'acertos': 1,
+                                 'total_perguntas': 10, 'data_hora': '2000-01-01T00:00:00', 'quiz_id': quiz_id})
+            resumo = app.resultado_anterior(types.SimpleNamespace(ranking_store=store), {'quiz_id': 'primeiro'})
+            if resumo is None or resumo['pontuacao_final'] != 10:
+                print("❌ Resultado fora do top-K não foi encontrado na repetição")
+                return False
+        
+        print("✅ Repetição devolve o resultado gravado")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Erro ao testar repetição de /finalizar_quiz: {e}")
+        return False
+
+def test_resposta_antes_da_exibicao():
+    """Testa que a próxima pergunta não aceita resposta antes de ser exibida"""
+    print("🔍 Testando resposta imediata após /proximo...")
+    try:
+        import app
+        
+        quiz = app.quiz_padrao
+        cliente = app.app.test_client()
+        resposta = cliente.post('/iniciar_quiz', json={'participante': 'Teste Integridade'})
+        if resposta.status_code != 200:
+            print(f"❌ /iniciar_quiz respondeu {resposta.status_code}")
+            return False
+        cliente.post('/proximo', json={})
+        
+        # A primeira resposta já traz a segunda pergunta, exibida só após ATRASO_EXIBICAO
+        certas = [pergunta.resposta_correta for pergunta in quiz.catalogo]
+        cliente.post('/proximo', json={'resposta': certas[0]})
+        resposta = cliente.post('/proximo', json={'resposta': certas[1]})
+        maximo = quiz.calcular_pontos(quiz.tempo_por_pergunta)
+        if resposta.status_code == 200 and resposta.get_json()['pontos_ganhos'] >= maximo:
+            print("❌ Resposta enviada antes da exibição recebeu a pontuação máxima")
+            return False
+        
+        print(f"✅ Resposta antecipada recusada ({resposta.status_code})")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Erro ao testar resposta antecipada: {e}")
+        return False
+
 def test_routes():
     """Testa se as rotas estão definidas"""
     print("🔍 Testando rotas...")
@@ -111,6 +176,7 @@ def test_routes():
             '/iniciar_quiz',
             '/pergunta',
             '/responder',
+            '/proximo',
             '/finalizar_quiz',
             '/ranking',
             '/api/ranking'
@@ -141,6 +207,8 @@ def main():
         test_app_creation,
         test_quiz_data,
         test_ranking_file,
+        test_finalizar_repetido_fora_do_top_k,
+        test_resposta_antes_da_exibicao,
         test_routes
     ]
     